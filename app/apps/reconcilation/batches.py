@@ -0,0 +1,173 @@
+import json
+import logging
+import posixpath
+import re
+import shutil
+import zipfile
+from collections import namedtuple
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from rest_framework import serializers, status
+from rest_framework.utils.encoders import JSONEncoder
+from .columnar import COLUMNAR_FORMATS, Sink, convert_to_columnar
+from .compressed import DECOMPRESSION_ERRORS, max_decompressed_bytes
+from .executor import mapped
+from .serializers.reconcilation import FileSerializers
+from .summary import convert_to_summary
+from .utils import convert_to_csv, convert_to_html, convert_to_json, convert_to_ndjson
+
+logger = logging.getLogger(__name__)
+
+SIDES = ('source', 'target')
+
+# Where each report format goes inside a batch archive.
+REPORT_FILES = {
+  'csv': 'reconciliation.csv',
+  'html': 'reconciliation.html',
+  'json': 'reconciliation.json',
+  'ndjson': 'reconciliation.ndjson',
+  'summary': 'summary.json',
+  'arrow': 'reconciliation.arrows',
+  'parquet': 'reconciliation.parquet',
+}
+
+# Pair names become paths inside the returned archive, so each part must be
+# a plain file name.
+PAIR_NAME = re.compile(r'[A-Za-z0-9_-][A-Za-z0-9_.-]*(/[A-Za-z0-9_-][A-Za-z0-9_.-]*)*')
+
+def max_pairs():
+  return getattr(settings, "RECONCILIATION_BATCH_MAX_PAIRS", 1000)
+
+# `source` and `target` are uploaded files, or members of `archive` when the
+# batch came as a zip archive. Either may be None for an incomplete pair.
+Pair = namedtuple("Pair", ["name", "source", "target", "archive"])
+
+# What reconciling one pair gave: the rendered report, or the errors.
+Outcome = namedtuple("Outcome", ["name", "status", "content", "errors"])
+
+def upload_pairs(files):
+  """Pairs sent as multipart files named source.<name> and target.<name>."""
+  sides = {}
+  for field, file in files.items():
+    side, _, name = field.partition('.')
+    if side in SIDES and name:
+      sides.setdefault(name, {})[side] = file
+  return [Pair(name, found.get('source'), found.get('target'), None) for name, found in sides.items()]
+
+def archive_pairs(archive):
+  """
+  Pairs held by a zip archive: every directory with a source.* and a
+  target.* file is a pair named after the directory.
+  """
+  sides = {}
+  for info in archive.infolist():
+    if info.is_dir():
+      continue
+    directory, name = posixpath.split(info.filename)
+    side = name.split('.', 1)[0].lower()
+    if side in SIDES:
+      sides.setdefault(directory, {})[side] = info
+  return [Pair(name, found.get('source'), found.get('target'), archive) for name, found in sides.items()]
+
+def extract(archive, info):
+  """
+  An uploaded file with the bytes of an archive member, held in memory up
+  to FILE_UPLOAD_MAX_MEMORY_SIZE and spooled to a temporary file past it.
+  """
+  name = posixpath.basename(info.filename)
+  if info.file_size > max_decompressed_bytes():
+    raise serializers.ValidationError({"error": f"{name} holds more than {max_decompressed_bytes()} bytes once decompressed"})
+  try:
+    if info.file_size <= settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+      return SimpleUploadedFile(name, archive.read(info))
+    file = TemporaryUploadedFile(name, 'application/octet-stream', info.file_size, None)
+    with archive.open(info) as member:
+      shutil.copyfileobj(member, file)
+  except DECOMPRESSION_ERRORS:
+    raise serializers.ValidationError({"error": f"Could not decompress {name}"})
+  file.seek(0)
+  return file
+
+def report(result, format, matches=None):
+  """The report of `result` in `format`, as chunks of bytes."""
+  if format == 'csv':
+    return convert_to_csv(result, matches)
+  if format == 'html':
+    return convert_to_html(result, matches=matches)
+  if format in COLUMNAR_FORMATS:
+    return convert_to_columnar(result, format)
+  if format == 'summary':
+    return convert_to_summary(result, matches)
+  if format == 'ndjson':
+    return convert_to_ndjson(result, matches)
+  return convert_to_json(result, matches)
+
+def reconcile_pair(pair, options):
+  """
+  Reconciles and renders one pair with the batch's `options`. Every failure
+  becomes the outcome of its own pair, so the rest of the batch goes on.
+  """
+  extracted = []
+  try:
+    if not PAIR_NAME.fullmatch(pair.name):
+      raise serializers.ValidationError({"error": "Unsupported pair name. Pair names are paths of letters, digits, \"_\", \"-\" and \".\""})
+    data = dict(options)
+    for side in SIDES:
+      file = getattr(pair, side)
+      if file is None:
+        raise serializers.ValidationError({side: [f"The pair has no {side} file"]})
+      if pair.archive is not None:
+        file = extract(pair.archive, file)
+        extracted.append(file)
+      data[side] = file
+
+    serializer = FileSerializers(data=data)
+    if not serializer.is_valid():
+      return Outcome(pair.name, status.HTTP_422_UNPROCESSABLE_ENTITY, None, serializer.errors)
+    content = b"".join(report(serializer.validated_data, data['format'], serializer.probable_matches))
+    return Outcome(pair.name, status.HTTP_200_OK, content, None)
+  except serializers.ValidationError as exc:
+    return Outcome(pair.name, status.HTTP_422_UNPROCESSABLE_ENTITY, None, exc.detail)
+  except Exception as exc:
+    logger.exception("Reconciling batch pair %s failed", pair.name)
+    return Outcome(pair.name, status.HTTP_500_INTERNAL_SERVER_ERROR, None, {"error": [f"reconciliation failed: {exc}"]})
+  finally:
+    for file in extracted:
+      file.close()
+
+def reconcile_pairs(pairs, options):
+  """The outcome of each pair, in order, reconciled on the shared executor."""
+  return mapped(lambda pair: reconcile_pair(pair, options), pairs)
+
+def encode(value):
+  return json.dumps(value, cls=JSONEncoder, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def ndjson_lines(outcomes):
+  """One JSON line per pair, holding its JSON report or summary, or its errors."""
+  for outcome in outcomes:
+    head = f'{{"pair":{json.dumps(outcome.name)},"status":{outcome.status},'.encode('utf-8')
+    if outcome.content is not None:
+      yield head + b'"report":' + outcome.content + b'}\n'
+    else:
+      yield head + b'"errors":' + encode(outcome.errors) + b'}\n'
+
+def zip_archive(outcomes, format):
+  """
+  A zip archive streamed one pair at a time: each report at
+  <pair>/reconciliation.<ext>, then manifest.json with the status of every
+  pair and the errors of those that failed.
+  """
+  sink = Sink()
+  manifest = []
+  with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+    for outcome in outcomes:
+      entry = {"pair": outcome.name, "status": outcome.status}
+      if outcome.content is not None:
+        entry["report"] = f"{outcome.name}/{REPORT_FILES[format]}"
+        archive.writestr(entry["report"], outcome.content)
+      else:
+        entry["errors"] = outcome.errors
+      manifest.append(entry)
+      yield sink.drain()
+    archive.writestr("manifest.json", encode(manifest))
+  yield sink.drain()
@@ -0,0 +1,136 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from .engine import ENGINE_VERSION
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def cache_key(source, target, **options):
+  """
+  Hashes both uploads, the engine version and any option that changes the
+  result. Files are read in chunks and rewound afterwards.
+  """
+  digest = hashlib.sha256(f"engine={ENGINE_VERSION}".encode())
+  for name in sorted(options):
+    digest.update(f";{name}={options[name]}".encode())
+  for file in (source, target):
+    digest.update(b";file=")
+    file.seek(0)
+    for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+      digest.update(chunk)
+    file.seek(0)
+  return digest.hexdigest()
+
+class ResultCache:
+  """
+  Two-tier LRU cache of reconciliation results. The hot tier keeps recently
+  used results in process memory; the disk tier keeps pickled results in a
+  directory and evicts the least recently used files (by mtime) once the
+  directory grows past `max_bytes`.
+  """
+
+  def __init__(self, directory, max_bytes, hot_max_bytes):
+    self.directory = directory
+    self.max_bytes = max_bytes
+    self.hot_max_bytes = hot_max_bytes
+    self.hot = OrderedDict()
+    self.hot_bytes = 0
+    self.lock = threading.Lock()
+    self.stats = {"hot_hits": 0, "disk_hits": 0, "misses": 0}
+
+  def path(self, key):
+    return os.path.join(self.directory, f"{key}.pickle")
+
+  def get(self, key):
+    with self.lock:
+      if key in self.hot:
+        self.hot.move_to_end(key)
+        self.stats["hot_hits"] += 1
+        return self.hot[key][0]
+
+    try:
+      with open(self.path(key), "rb") as cache_file:
+        payload = cache_file.read()
+      os.utime(self.path(key))
+    except OSError:
+      with self.lock:
+        self.stats["misses"] += 1
+      return None
+
+    value = pickle.loads(payload)
+    with self.lock:
+      self.stats["disk_hits"] += 1
+      self.remember(key, value, len(payload))
+    return value
+
+  def set(self, key, value):
+    payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    with self.lock:
+      self.remember(key, value, len(payload))
+
+    if len(payload) > self.max_bytes:
+      return
+    os.makedirs(self.directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+    with os.fdopen(descriptor, "wb") as cache_file:
+      cache_file.write(payload)
+    os.replace(temporary, self.path(key))
+    self.evict()
+
+  def remember(self, key, value, size):
+    if size > self.hot_max_bytes:
+      return
+    if key in self.hot:
+      self.hot_bytes -= self.hot.pop(key)[1]
+    self.hot[key] = (value, size)
+    self.hot_bytes += size
+    while self.hot_bytes > self.hot_max_bytes:
+      self.hot_bytes -= self.hot.popitem(last=False)[1][1]
+
+  def evict(self):
+    entries = []
+    with os.scandir(self.directory) as scan:
+      for entry in scan:
+        if entry.name.endswith(".pickle"):
+          stat = entry.stat()
+          entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+      if total <= self.max_bytes:
+        break
+      try:
+        os.remove(path)
+      except FileNotFoundError:
+        pass
+      total -= size
+
+_cache = None
+
+def result_cache():
+  global _cache
+  if _cache is None:
+    _cache = ResultCache(
+      settings.RECONCILIATION_CACHE_DIR,
+      settings.RECONCILIATION_CACHE_MAX_BYTES,
+      settings.RECONCILIATION_CACHE_HOT_MAX_BYTES,
+    )
+  return _cache
+
+def cache_enabled():
+  return bool(getattr(settings, "RECONCILIATION_CACHE_DIR", None))
+
+def cache_stats():
+  return dict(result_cache().stats)
+
+@receiver(setting_changed)
+def reset_result_cache(setting, **kwargs):
+  global _cache
+  if setting.startswith("RECONCILIATION_CACHE"):
+    _cache = None
@@ -0,0 +1,273 @@
+import io
+import os
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from rest_framework import serializers
+from .compressed import compression, open_upload
+from .results import MISSING_IN_SOURCE, MISSING_IN_TARGET, SECTIONS, field_bit
+from .schemas import DEFAULT_SCHEMA
+from .validation import check_columns
+
+# pyarrow is optional. Without it uploads are CSV only, parsed by pandas,
+# and reports cannot be written as Arrow or Parquet.
+try:
+  import pyarrow as pa
+  from pyarrow import csv as pa_csv
+  from pyarrow import ipc
+  from pyarrow import parquet as pq
+except ImportError:
+  pa = None
+
+PARQUET_EXTENSIONS = ['.parquet']
+IPC_EXTENSIONS = ['.arrow', '.feather']
+COLUMNAR_EXTENSIONS = PARQUET_EXTENSIONS + IPC_EXTENSIONS
+COLUMNAR_FORMATS = ['arrow', 'parquet']
+
+# The strings pandas reads as missing values by default, so the Arrow CSV
+# reader finds the same empty cells.
+NA_VALUES = [
+  '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+  '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+]
+
+# Reports are written in record batches (Arrow) or row groups (Parquet) of
+# this many rows.
+BATCH_ROWS = 64 * 1024
+
+def arrow_available():
+  return pa is not None
+
+def arrow_csv_enabled():
+  return arrow_available() and getattr(settings, "RECONCILIATION_ARROW_CSV", True)
+
+def extension(file):
+  return os.path.splitext(file.name)[1].lower()
+
+def is_columnar(file):
+  return extension(file) in COLUMNAR_EXTENSIONS
+
+def arrow_source(file):
+  # Uploads spooled to disk are memory-mapped instead of read through the
+  # Python file object.
+  if hasattr(file, "temporary_file_path") and not compression(file):
+    return pa.memory_map(file.temporary_file_path())
+  return open_upload(file)
+
+def column_frame(table, start=0, schema=DEFAULT_SCHEMA):
+  """
+  Converts the schema's columns of an Arrow table to a frame indexed by
+  file position. Values are shaped the way the CSV reader would produce
+  them: text and dates as text, integer columns without gaps as int64,
+  number columns as int64 or float64, and anything else as text for
+  validation to report on.
+  """
+  columns = {}
+  for name in schema.columns:
+    column = table.column(name)
+    if pa.types.is_dictionary(column.type):
+      column = column.cast(column.type.value_type)
+
+    kind, declared = column.type, schema.types[name]
+    if declared == "integer" and pa.types.is_integer(kind) and not column.null_count:
+      column = column.cast(pa.int64())
+    elif declared == "number" and pa.types.is_integer(kind):
+      column = column.cast(pa.int64())
+    elif declared == "number" and (pa.types.is_floating(kind) or pa.types.is_decimal(kind)):
+      column = column.cast(pa.float64())
+    elif not pa.types.is_string(kind) and not pa.types.is_large_string(kind):
+      column = column.cast(pa.string())
+    columns[name] = column.to_pandas()
+
+  return pd.DataFrame(columns).set_axis(pd.RangeIndex(start, start + table.num_rows))
+
+class ColumnarFile:
+  """
+  A Parquet or Arrow IPC upload. The file's columns are checked on opening
+  and only the reconciled columns are ever read, without any text parsing.
+  """
+
+  def __init__(self, file, file_type, schema=DEFAULT_SCHEMA):
+    self.schema = schema
+    self.kind = 'parquet' if extension(file) in PARQUET_EXTENSIONS else 'ipc'
+    source = arrow_source(file)
+    try:
+      if self.kind == 'parquet':
+        self.reader = pq.ParquetFile(source)
+        self.names = self.reader.schema_arrow.names
+        self.num_rows = self.reader.metadata.num_rows
+      else:
+        try:
+          self.reader = ipc.open_file(source)
+        except pa.ArrowInvalid:
+          # Not the random-access file format; try the streaming one.
+          source.seek(0)
+          self.reader = ipc.open_stream(source)
+        self.names = self.reader.schema.names
+        # A stream has to be read to be counted.
+        self.num_rows = self.reader.count_rows() if isinstance(self.reader, ipc.RecordBatchFileReader) else None
+    except pa.ArrowInvalid:
+      raise serializers.ValidationError({"error": f"Could not read {file_type} file as {self.kind}"})
+    check_columns(self.names, file_type, schema)
+
+  def batches(self, rows):
+    columns = self.schema.columns
+    if self.kind == 'parquet':
+      yield from self.reader.iter_batches(batch_size=rows, columns=columns)
+    elif isinstance(self.reader, ipc.RecordBatchFileReader):
+      for index in range(self.reader.num_record_batches):
+        yield self.reader.get_batch(index).select(columns)
+    else:
+      for batch in self.reader:
+        yield batch.select(columns)
+
+  def frame(self):
+    if self.kind == 'parquet':
+      return column_frame(self.reader.read(columns=self.schema.columns), schema=self.schema)
+    return column_frame(self.reader.read_all().select(self.schema.columns), schema=self.schema)
+
+  def frames(self, rows):
+    """Yields frames of at most `rows` rows, indexed by position in the file."""
+    start = 0
+    for batch in self.batches(rows):
+      for offset in range(0, batch.num_rows, rows):
+        part = pa.Table.from_batches([batch.slice(offset, rows)])
+        yield column_frame(part, start, self.schema)
+        start += part.num_rows
+
+def read_csv_arrow(file, schema=DEFAULT_SCHEMA):
+  """
+  Parses the schema's columns of a CSV upload with pyarrow's multithreaded
+  reader. Returns None when the columns are typed in a way the pandas
+  reader could have read differently, such as integers written with a plus
+  sign, very large or empty integers, so the caller falls back to pandas
+  for those files.
+  """
+  try:
+    table = pa_csv.read_csv(arrow_source(file), convert_options=pa_csv.ConvertOptions(
+      column_types={name: pa.string() for name in schema.columns_of("text", "date")},
+      include_columns=schema.columns,
+      null_values=NA_VALUES,
+      strings_can_be_null=True,
+    ))
+  except pa.ArrowException:
+    # Missing columns included; pandas reads the file to report them.
+    return None
+
+  for name in schema.columns_of("integer"):
+    if table.column(name).type != pa.int64() or table.column(name).null_count:
+      return None
+
+  for name in schema.columns_of("number"):
+    number = table.column(name)
+    if number.type == pa.float64() and not number.null_count:
+      # pandas reads an integer column written as "+100" as int64, which
+      # Arrow reads as double; only a column with a fraction is surely a
+      # float one.
+      values = number.to_numpy()
+      if (np.floor(values) == values).all():
+        return None
+    elif number.type != pa.int64() and number.type != pa.float64():
+      return None
+
+  return column_frame(table, schema=schema)
+
+def read_upload(file, file_type, schema=DEFAULT_SCHEMA):
+  """
+  Reads the schema's columns of an upload into a frame, with the columns
+  checked. Parquet and Arrow IPC files are read by column. CSV files,
+  compressed or not, go through pyarrow's reader when it is installed and
+  pandas otherwise; either way other columns are skipped while parsing.
+  """
+  if is_columnar(file):
+    return ColumnarFile(file, file_type, schema).frame()
+
+  file_df = read_csv_arrow(file, schema) if arrow_csv_enabled() else None
+  if file_df is None:
+    file_df = pd.read_csv(open_upload(file), dtype=schema.dtypes(), usecols=schema.wanted)
+  check_columns(file_df.columns, file_type, schema)
+  return file_df
+
+class Sink(io.RawIOBase):
+  """
+  Write-only file that hands out what was written so far, so reports can be
+  streamed while pyarrow writes them. It keeps counting bytes across drains
+  since the Parquet writer records offsets with tell().
+  """
+
+  def __init__(self):
+    self.parts = []
+    self.position = 0
+
+  def writable(self):
+    return True
+
+  def write(self, data):
+    self.parts.append(bytes(data))
+    self.position += len(data)
+    return len(data)
+
+  def tell(self):
+    return self.position
+
+  def drain(self):
+    data = b"".join(self.parts)
+    self.parts = []
+    return data
+
+def key_fields(schema):
+  # A single key column is the record_id; a composite key gets a column per
+  # key column.
+  if len(schema.keys) == 1:
+    return [("record_id", schema.keys[0])]
+  return [(f"record_{name.lower()}", name) for name in schema.keys]
+
+def value_type(array, kind):
+  return pa.from_numpy_dtype(array.dtype) if kind in ("integer", "number") else pa.string()
+
+def result_schema(result):
+  """Arrow schema of a report: key columns, status, field mask, then source and target values."""
+  schema = result.schema
+  return pa.schema([
+    *((field, value_type(result.keys[name], schema.types[name])) for field, name in key_fields(schema)),
+    ("status", pa.dictionary(pa.int8(), pa.string())),
+    ("discrepant_fields", pa.from_numpy_dtype(result.fields.dtype)),
+    *((f"source_{name.lower()}", value_type(result.source[name], schema.types[name])) for name in schema.compare),
+    *((f"target_{name.lower()}", value_type(result.target[name], schema.types[name])) for name in schema.compare),
+  ], metadata={
+    "status": ",".join(SECTIONS),
+    "discrepant_fields": ",".join(f"{field_bit(index)}={name}" for index, name in enumerate(schema.compare)),
+  })
+
+def value_array(values, field, mask):
+  # Numbers of the side a record is missing from are masked out; text and
+  # dates are None there already.
+  if pa.types.is_string(field.type):
+    return pa.array(values, pa.string(), from_pandas=True)
+  return pa.array(values, field.type, mask=mask)
+
+def result_batch(result, arrow_schema, start, stop):
+  schema = result.schema
+  status = result.status[start:stop]
+  arrays = [pa.array(result.keys[name][start:stop], arrow_schema.field(field).type) for field, name in key_fields(schema)]
+  arrays.append(pa.DictionaryArray.from_arrays(pa.array(status.astype(np.int8)), pa.array(SECTIONS)))
+  arrays.append(pa.array(result.fields[start:stop], arrow_schema.field("discrepant_fields").type))
+  for prefix, side, absent in (("source", result.source, MISSING_IN_SOURCE), ("target", result.target, MISSING_IN_TARGET)):
+    for name in schema.compare:
+      arrays.append(value_array(side[name][start:stop], arrow_schema.field(f"{prefix}_{name.lower()}"), status == absent))
+  return pa.record_batch(arrays, schema=arrow_schema)
+
+def convert_to_columnar(result, format):
+  """
+  Streams the result as an Arrow IPC stream or a Parquet file with one row
+  per record. The side a missing record is absent from is left null.
+  """
+  schema = result_schema(result)
+  sink = Sink()
+  writer = ipc.new_stream(sink, schema) if format == 'arrow' else pq.ParquetWriter(sink, schema)
+  with writer:
+    for start in range(0, len(result), BATCH_ROWS):
+      batch = result_batch(result, schema, start, min(start + BATCH_ROWS, len(result)))
+      writer.write_table(pa.Table.from_batches([batch]))
+      yield sink.drain()
+  yield sink.drain()
@@ -0,0 +1,115 @@
+import bz2
+import gzip
+import io
+import lzma
+import zipfile
+import zlib
+from django.conf import settings
+from rest_framework import serializers
+
+COMPRESSED_EXTENSIONS = ['.csv.gz', '.csv.bz2', '.csv.xz', '.zip']
+
+# Used to size bzip2 and xz uploads, whose headers do not record how large
+# the CSV inside is.
+ESTIMATED_RATIO = 10
+
+READ_BUFFER = 1024 * 1024
+
+DECOMPRESSION_ERRORS = (OSError, EOFError, zlib.error, lzma.LZMAError, zipfile.BadZipFile)
+
+def max_decompressed_bytes():
+  return getattr(settings, "RECONCILIATION_MAX_DECOMPRESSED_BYTES", 2 * 1024 * 1024 * 1024)
+
+def compression(file):
+  """Returns the compressed extension of an upload, or None for a plain file."""
+  name = file.name.lower()
+  return next((ext for ext in COMPRESSED_EXTENSIONS if name.endswith(ext)), None)
+
+def zip_member(archive):
+  members = [info for info in archive.infolist() if not info.is_dir()]
+  if len(members) != 1 or not members[0].filename.lower().endswith('.csv'):
+    raise serializers.ValidationError('Zip uploads must hold exactly one .csv file')
+  return members[0]
+
+def check_archive(file):
+  """
+  Checks what can be checked without decompressing: a zip upload must hold
+  a single CSV file of an allowed size.
+  """
+  if compression(file) != '.zip':
+    return
+  file.seek(0)
+  try:
+    member = zip_member(zipfile.ZipFile(file))
+  except zipfile.BadZipFile:
+    raise serializers.ValidationError('Could not read zip upload')
+  if member.file_size > max_decompressed_bytes():
+    raise serializers.ValidationError(f'Zip upload holds more than {max_decompressed_bytes()} bytes once decompressed')
+
+def content_size(file):
+  """
+  The size of the CSV held by an upload, for sizing the work ahead. Exact
+  for zip files, exact modulo 4 GiB for gzip files and estimated for the
+  rest.
+  """
+  ext = compression(file)
+  if ext is None:
+    return file.size
+  if ext == '.zip':
+    file.seek(0)
+    return zip_member(zipfile.ZipFile(file)).file_size
+  if ext == '.csv.gz':
+    # gzip ends with the length of the uncompressed data.
+    file.seek(file.size - 4)
+    size = int.from_bytes(file.read(4), 'little')
+    file.seek(0)
+    return max(size, file.size)
+  return file.size * ESTIMATED_RATIO
+
+class Decompressed(io.RawIOBase):
+  """
+  Readable stream over the decompressed bytes of an upload. It stops with a
+  validation error once more than `limit` bytes come out or the data turns
+  out to be corrupt.
+  """
+
+  def __init__(self, stream, name, limit):
+    self.stream = stream
+    self.name = name
+    self.limit = limit
+    self.total = 0
+
+  def readable(self):
+    return True
+
+  def readinto(self, buffer):
+    try:
+      count = self.stream.readinto(buffer)
+    except DECOMPRESSION_ERRORS:
+      raise serializers.ValidationError({"error": f"Could not decompress {self.name}"})
+    self.total += count
+    if self.total > self.limit:
+      raise serializers.ValidationError({"error": f"{self.name} holds more than {self.limit} bytes once decompressed"})
+    return count
+
+def open_upload(file):
+  """
+  Returns a binary stream over the CSV bytes of an upload, from the start.
+  Compressed uploads are decompressed while they are read, so no
+  decompressed copy is ever held in memory or written to disk.
+  """
+  file.seek(0)
+  ext = compression(file)
+  if ext is None:
+    return file
+
+  if ext == '.zip':
+    archive = zipfile.ZipFile(file)
+    stream = archive.open(zip_member(archive))
+  elif ext == '.csv.gz':
+    stream = gzip.GzipFile(fileobj=file, mode='rb')
+  elif ext == '.csv.bz2':
+    stream = bz2.BZ2File(file, mode='rb')
+  else:
+    stream = lzma.LZMAFile(file, mode='rb')
+  return io.BufferedReader(Decompressed(stream, file.name, max_decompressed_bytes()), READ_BUFFER)
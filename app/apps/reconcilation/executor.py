@@ -0,0 +1,97 @@
+import asyncio
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+def executor_workers():
+  return getattr(settings, "RECONCILIATION_ASYNC_WORKERS", None) or os.cpu_count() or 1
+
+def max_pending():
+  return getattr(settings, "RECONCILIATION_ASYNC_MAX_PENDING", 512)
+
+class Saturated(Exception):
+  """Raised when RECONCILIATION_ASYNC_MAX_PENDING requests are already admitted."""
+
+_executor = None
+_pending = 0
+_lock = threading.Lock()
+
+def reconciliation_executor():
+  """
+  Thread pool the async upload endpoint runs parsing, reconciling and
+  rendering in, so the event loop only ever waits on it. Its size bounds how
+  many reconciliations run at once; the rest wait in its queue without
+  holding a thread.
+  """
+  global _executor
+  with _lock:
+    if _executor is None:
+      _executor = ThreadPoolExecutor(executor_workers(), thread_name_prefix="reconciliation")
+    return _executor
+
+@receiver(setting_changed)
+def reset_executor(setting, **kwargs):
+  global _executor
+  if setting == "RECONCILIATION_ASYNC_WORKERS" and _executor is not None:
+    _executor.shutdown(wait=False)
+    _executor = None
+
+@contextmanager
+def admitted():
+  """
+  Counts a request as pending while it is inside the block, raising
+  Saturated instead when the limit is reached.
+  """
+  global _pending
+  with _lock:
+    if _pending >= max_pending():
+      raise Saturated()
+    _pending += 1
+  try:
+    yield
+  finally:
+    with _lock:
+      _pending -= 1
+
+async def run(function, *args):
+  """Awaits `function(*args)` run on the reconciliation executor."""
+  return await asyncio.get_running_loop().run_in_executor(reconciliation_executor(), partial(function, *args))
+
+async def iterate(chunks):
+  """
+  Async iterator over a sync iterator whose every step runs on the
+  reconciliation executor, for rendering reports while they are sent.
+  """
+  chunks = iter(chunks)
+  while True:
+    chunk = await run(next, chunks, None)
+    if chunk is None:
+      return
+    yield chunk
+
+def mapped(function, items):
+  """
+  Yields `function(item)` for each of `items`, in order, each run on the
+  reconciliation executor. Only twice as many calls as there are workers are
+  submitted ahead of the one being waited for, so results do not pile up
+  faster than they are consumed.
+  """
+  executor = reconciliation_executor()
+  ahead = 2 * executor_workers()
+  futures = deque()
+  try:
+    for item in items:
+      futures.append(executor.submit(function, item))
+      if len(futures) >= ahead:
+        yield futures.popleft().result()
+    while futures:
+      yield futures.popleft().result()
+  finally:
+    for future in futures:
+      future.cancel()
@@ -0,0 +1,158 @@
+import math
+import os
+import pickle
+import tempfile
+import pandas as pd
+from django.conf import settings
+from pandas.api import types
+from rest_framework import serializers
+from .columnar import ColumnarFile, is_columnar
+from .compressed import content_size, open_upload
+from .engine import in_file_order, key_hashes, positioned_result
+from .schemas import DEFAULT_SCHEMA
+from .validation import check_columns, coerce_types, find_violations, max_errors, violation_detail
+
+# Rough ratio between the size of a CSV file and the memory needed to hold
+# it as a frame together with the normalized copies the engine compares.
+EXPANSION = 8
+
+SAMPLE_BYTES = 64 * 1024
+
+def memory_budget():
+  return getattr(settings, "RECONCILIATION_MEMORY_BUDGET", 256 * 1024 * 1024)
+
+def spill_dir():
+  return getattr(settings, "RECONCILIATION_SPILL_DIR", None)
+
+def fits_in_memory(*files, budget=None):
+  budget = memory_budget() if budget is None else budget
+  return sum(content_size(file) for file in files) * EXPANSION <= budget
+
+def partition_count(total_bytes, budget):
+  return max(1, math.ceil(total_bytes * EXPANSION / budget))
+
+def chunk_rows(file, budget):
+  # Sizes chunks from the average line length at the head of the file so a
+  # chunk takes a small slice of the budget whatever the row width.
+  sample = open_upload(file).read(SAMPLE_BYTES)
+  row_bytes = max(1, len(sample) // max(1, sample.count(b"\n")))
+  return max(1_000, budget // (4 * EXPANSION * row_bytes))
+
+def columnar_chunk_rows(file, columnar, budget):
+  # Columnar files know their row count, except Arrow streams, which are
+  # read in chunks of the smallest size.
+  row_bytes = max(1, file.size // max(1, columnar.num_rows or 1))
+  return max(1_000, budget // (4 * EXPANSION * row_bytes))
+
+def read_chunks(file, file_type, budget, schema=DEFAULT_SCHEMA):
+  if is_columnar(file):
+    columnar = ColumnarFile(file, file_type, schema)
+    return columnar.frames(columnar_chunk_rows(file, columnar, budget))
+
+  check_columns(pd.read_csv(open_upload(file), nrows=0).columns, file_type, schema)
+  rows = chunk_rows(file, budget)
+  # Integer columns are read as text: a chunk cannot go back to the file
+  # for the raw values of a column pandas read as floats.
+  dtype = {**schema.dtypes(), **{column: str for column in schema.columns_of("integer")}}
+  return pd.read_csv(open_upload(file), dtype=dtype, usecols=schema.wanted, chunksize=rows)
+
+def empty_frame(schema, float_columns=()):
+  """A frame without rows, typed as the in-memory path would type the file."""
+  def dtype(column):
+    kind = schema.types[column]
+    if kind == "integer":
+      return "int64"
+    if kind == "number":
+      return "float64" if column in float_columns else "int64"
+    return object
+  return pd.DataFrame({column: pd.Series(dtype=dtype(column)) for column in schema.columns})
+
+class Spill:
+  """
+  Per-partition spill files for one side of the reconciliation. Chunks are
+  appended as pickled frames and read back in the order they were written,
+  so each partition keeps its rows in file order.
+  """
+
+  def __init__(self, directory, name, partitions, schema=DEFAULT_SCHEMA):
+    self.paths = [os.path.join(directory, f"{name}-{index}.pickle") for index in range(partitions)]
+    self.schema = schema
+    # Number columns that held a float in any chunk.
+    self.float_columns = set()
+
+  def write(self, chunk):
+    buckets = key_hashes(chunk, self.schema) % len(self.paths)
+    for partition, part in chunk.groupby(buckets, sort=False):
+      with open(self.paths[partition], "ab") as spill_file:
+        pickle.dump(part, spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+  def read(self, partition):
+    parts = []
+    if os.path.exists(self.paths[partition]):
+      with open(self.paths[partition], "rb") as spill_file:
+        while True:
+          try:
+            parts.append(pickle.load(spill_file))
+          except EOFError:
+            break
+
+    if not parts:
+      return empty_frame(self.schema, self.float_columns)
+
+    file_df = pd.concat(parts)
+    # The in-memory path infers one type per number column for the whole
+    # file, so a partition whose own rows are all integers is widened to
+    # match.
+    for column in self.float_columns:
+      if not types.is_float_dtype(file_df[column]):
+        file_df[column] = file_df[column].astype("float64")
+    return file_df
+
+def spill_file(file, file_type, spill, budget, limit):
+  """
+  Streams one upload into the spill in chunks, validating each chunk on the
+  way. Returns the violation count and the first `limit` violations.
+  """
+  schema = spill.schema
+  total, violations = 0, []
+  for chunk in read_chunks(file, file_type, budget, schema):
+    chunk_total, chunk_violations = find_violations(chunk, file_type, None, limit - len(violations), schema)
+    total += chunk_total
+    violations += chunk_violations
+    if total:
+      # Once the upload is known to be rejected the rest is only read for
+      # its violations.
+      continue
+
+    chunk = coerce_types(chunk[schema.columns], schema)
+    spill.float_columns.update(column for column in schema.columns_of("number") if types.is_float_dtype(chunk[column]))
+    spill.write(chunk)
+  return total, violations
+
+def reconcile_external(source, target, budget=None, schema=DEFAULT_SCHEMA):
+  """
+  Out-of-core variant of `engine.reconcile` for uploads that do not fit the
+  memory budget. Rows are partitioned by a hash of their key into spill files
+  on local disk and reconciled one partition at a time. Every record keeps
+  its position in the original file, so the result matches the in-memory
+  path exactly.
+  """
+  budget = memory_budget() if budget is None else budget
+  partitions = partition_count(content_size(source) + content_size(target), budget)
+
+  with tempfile.TemporaryDirectory(prefix="reconciliation-", dir=spill_dir()) as directory:
+    source_spill = Spill(directory, "source", partitions, schema)
+    target_spill = Spill(directory, "target", partitions, schema)
+
+    limit = max_errors()
+    source_total, source_violations = spill_file(source, 'source', source_spill, budget, limit)
+    target_total, target_violations = spill_file(target, 'target', target_spill, budget, limit - len(source_violations))
+    if source_total or target_total:
+      raise serializers.ValidationError(violation_detail(source_violations + target_violations, source_total + target_total))
+
+    parts = [
+      positioned_result(source_spill.read(partition), target_spill.read(partition), schema)
+      for partition in range(partitions)
+    ]
+
+  return in_file_order(parts)
@@ -0,0 +1,142 @@
+import os
+import pickle
+import tempfile
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from pandas.util import hash_pandas_object
+from .engine import ENGINE_VERSION, key_hashes, positioned_result
+from .results import MISSING_IN_SOURCE, ReconciliationResult
+from .schemas import DEFAULT_SCHEMA
+
+# How a feed upload was reconciled: 'full' when there was no usable previous
+# state, 'incremental' otherwise, with the number of keys that were
+# recomputed.
+FeedRun = namedtuple("FeedRun", ["mode", "changed_ids"])
+
+def feed_dir():
+  return settings.RECONCILIATION_FEED_DIR
+
+def state_path(name):
+  return os.path.join(feed_dir(), f"{name}.pickle")
+
+def load_state(name):
+  try:
+    with open(state_path(name), "rb") as state_file:
+      return pickle.load(state_file)
+  except FileNotFoundError:
+    return None
+
+def save_state(name, state):
+  os.makedirs(feed_dir(), exist_ok=True)
+  descriptor, temporary = tempfile.mkstemp(dir=feed_dir(), suffix=".tmp")
+  with os.fdopen(descriptor, "wb") as state_file:
+    pickle.dump(state, state_file, protocol=pickle.HIGHEST_PROTOCOL)
+  os.replace(temporary, state_path(name))
+
+def record_keys(df, schema):
+  """
+  One value per row for its key: the key column itself, or a hash of the
+  key columns of a composite key. Two composite keys sharing a hash are
+  only ever recomputed together, which is safe.
+  """
+  if len(schema.keys) == 1:
+    return df[schema.keys[0]].to_numpy()
+  return key_hashes(df, schema)
+
+def row_digests(df, schema):
+  """
+  Hashes every row of a validated frame, key included, together with its
+  occurrence number among the rows sharing its key. A key keeps the same set
+  of digests only while all of its rows are unchanged, and within one file
+  a digest identifies a single row.
+  """
+  occurrence = np.zeros(len(df), dtype=np.int64)
+  duplicated = df.duplicated(subset=schema.keys, keep=False).to_numpy()
+  if duplicated.any():
+    occurrence[duplicated] = df.loc[duplicated].groupby(schema.keys, sort=False).cumcount().to_numpy()
+  return hash_pandas_object(df[schema.columns].assign(occurrence=occurrence), index=False).to_numpy()
+
+def changed_ids(previous, current, index):
+  # A digest seen on only one side belongs to a row that was added, removed
+  # or edited since the previous run.
+  removed = previous["ids"][index.get_indexer(previous["digests"]) < 0]
+  added = current["ids"][pd.Index(previous["digests"]).get_indexer(current["digests"]) < 0]
+  return np.union1d(removed, added)
+
+def side_rows(df, schema):
+  return {"ids": record_keys(df, schema), "digests": row_digests(df, schema)}
+
+def reconcile_feed(name, source_df, target_df, schema=DEFAULT_SCHEMA):
+  """
+  Reconciles an upload of a named feed against the state kept from its
+  previous run. Only keys whose rows changed on either side are matched
+  again; the records of every other key are carried over from the previous
+  result and moved to the file positions their rows now have. A run with a
+  different schema than the previous one is always a full run.
+
+  Frames must be validated and indexed by file position. Returns the result
+  and a FeedRun.
+  """
+  rows = {"source": side_rows(source_df, schema), "target": side_rows(target_df, schema)}
+  # Hash tables over each side's digests, built once and reused for every
+  # lookup below.
+  indexes = {side: pd.Index(rows[side]["digests"]) for side in rows}
+  previous = load_state(name)
+  incremental = (
+    previous is not None
+    and previous["version"] == ENGINE_VERSION
+    and previous["schema"] == schema.to_dict()
+    # Kept records are found again by digest, which needs digests to be
+    # unique within a file; a 64-bit collision falls back to a full run.
+    and indexes["source"].is_unique
+    and indexes["target"].is_unique
+  )
+
+  if incremental:
+    changed = np.union1d(
+      changed_ids(previous["rows"]["source"], rows["source"], indexes["source"]),
+      changed_ids(previous["rows"]["target"], rows["target"], indexes["target"]),
+    )
+    result, positions = positioned_result(
+      source_df[pd.Index(rows["source"]["ids"]).isin(changed)],
+      target_df[pd.Index(rows["target"]["ids"]).isin(changed)],
+      schema,
+    )
+    run = FeedRun("incremental", len(changed))
+  else:
+    result, positions = positioned_result(source_df, target_df, schema)
+    run = FeedRun("full", len(np.union1d(rows["source"]["ids"], rows["target"]["ids"])))
+
+  # Records missing in source come from target rows, all others from
+  # source rows.
+  from_target = result.status == MISSING_IN_SOURCE
+  digests = np.empty(len(result), dtype=np.uint64)
+  digests[from_target] = rows["target"]["digests"][positions[from_target]]
+  digests[~from_target] = rows["source"]["digests"][positions[~from_target]]
+
+  if incremental:
+    kept = np.flatnonzero(~pd.Index(record_keys(pd.DataFrame(previous["result"].keys), schema)).isin(changed))
+    kept_result = previous["result"].take(kept)
+    kept_digests = previous["digests"][kept]
+    kept_from_target = kept_result.status == MISSING_IN_SOURCE
+    kept_positions = np.where(
+      kept_from_target,
+      indexes["target"].get_indexer(kept_digests),
+      indexes["source"].get_indexer(kept_digests),
+    )
+    result = ReconciliationResult.concat([result, kept_result])
+    # Kept rows only hold real numbers from sides whose rows are unchanged,
+    # so the number columns can take the dtypes of the current files back
+    # even where the filler of the other side had widened them.
+    for column in schema.columns_of("number"):
+      result.source[column] = result.source[column].astype(source_df[column].dtype, copy=False)
+      result.target[column] = result.target[column].astype(target_df[column].dtype, copy=False)
+    positions = np.concatenate([positions, kept_positions])
+    digests = np.concatenate([digests, kept_digests])
+
+  order = np.lexsort((positions, result.status))
+  result = result.take(order)
+  save_state(name, {"version": ENGINE_VERSION, "schema": schema.to_dict(), "rows": rows, "result": result, "digests": digests[order]})
+  return result, run
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+from django.conf import settings
+from .engine import normalize_dates
+from .results import MISSING_IN_SOURCE, MISSING_IN_TARGET
+
+# Suggested pairings of unmatched records: the result rows of a record
+# missing in target (a source record) and of a record missing in source (a
+# target record), with the similarity of their text columns. Sorted by
+# source row, then best score first.
+ProbableMatches = namedtuple("ProbableMatches", ["source", "target", "scores"])
+
+# Blocking buckets with more rows than this on either side are skipped. Only
+# records repeating the same text on the same dates fill a bucket that far.
+MAX_BUCKET = 1000
+
+def min_score():
+  return getattr(settings, "RECONCILIATION_FUZZY_MIN_SCORE", 0.5)
+
+def max_candidates():
+  return getattr(settings, "RECONCILIATION_FUZZY_CANDIDATES", 3)
+
+def fuzzy_columns(schema):
+  """The compared columns records are scored on (text) and blocked by (dates)."""
+  return (
+    [name for name in schema.compare if schema.types[name] == "text"],
+    [name for name in schema.compare if schema.types[name] == "date"],
+  )
+
+def text_of(value):
+  # Empty cells are None or NaN, which is the only value unequal to itself.
+  return "" if value is None or value != value else str(value)
+
+def fuzzy_text(columns, start, stop):
+  # Case, surrounding and repeated whitespace are ignored; the text columns
+  # of a record are joined into one string.
+  if len(columns) == 1:
+    return [" ".join(text_of(value).lower().split()) for value in columns[0][start:stop].tolist()]
+  return [
+    " ".join(" ".join(map(text_of, row)).lower().split())
+    for row in zip(*(column[start:stop].tolist() for column in columns))
+  ]
+
+def trigrams(texts):
+  """
+  Returns the rows and character trigrams of every text, each trigram as the
+  code points of its characters packed into one integer. Texts are padded
+  so the first and last letters make grams of their own. Empty texts have
+  no trigrams and never match.
+  """
+  padded = [f"  {text} " if text else "" for text in texts]
+  lengths = np.fromiter(map(len, padded), dtype=np.int64, count=len(padded))
+  chars = np.frombuffer("".join(padded).encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+  grams = (chars[:-2] << 42) | (chars[1:-1] << 21) | chars[2:]
+  # A text of n characters has n - 2 grams; the last two start within it
+  # but run into the next text.
+  counts = np.maximum(lengths - 2, 0)
+  starts = np.cumsum(lengths) - lengths
+  offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+  return np.repeat(np.arange(len(texts)), counts), grams[offsets]
+
+def block_codes(source, target, lengths):
+  """
+  Integer codes of the dates of both sides, given as lists of date columns
+  of `lengths` rows, that are equal when every date column is. Without date
+  columns all records are in one block.
+  """
+  if not source:
+    return np.zeros(lengths[0], dtype=np.int64), np.zeros(lengths[1], dtype=np.int64)
+  both = pd.DataFrame(dict(enumerate(normalize_dates(pd.Series(np.concatenate(pair))) for pair in zip(source, target))))
+  codes = both.groupby(list(both.columns), sort=False).ngroup().to_numpy()
+  return codes[:lengths[0]], codes[lengths[0]:]
+
+def ordered(rows, grams, order, records):
+  """
+  Sorts the distinct grams of every record by `order`, the rank of each gram
+  from the rarest to the most common. Returns them as row * len(order) +
+  rank keys, which come out sorted, the position of each gram in its record
+  and the number of distinct grams of every record.
+  """
+  keys = np.sort(rows * len(order) + order[grams])
+  keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])]
+  sizes = np.bincount(keys // len(order), minlength=records)
+  positions = np.arange(len(keys)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+  return keys, positions, sizes
+
+def prefixes(keys, positions, sizes, blocks, grams, threshold):
+  """
+  Keeps the rarest grams of every record, just enough of them that two
+  records with a Jaccard similarity of at least `threshold` share one of
+  them (prefix filtering), keyed by date block and gram.
+  """
+  rows, ranks = np.divmod(keys, grams)
+  kept = positions < sizes[rows] - np.ceil(threshold * sizes[rows]) + 1
+  rows, ranks, positions = rows[kept], ranks[kept], positions[kept]
+  buckets = blocks[rows] * grams + ranks
+  # Buckets over MAX_BUCKET rows are dropped.
+  codes, _ = pd.factorize(buckets)
+  small = np.bincount(codes)[codes] <= MAX_BUCKET
+  return pd.DataFrame({"bucket": buckets[small], "row": rows[small], "position": positions[small]})
+
+def overlap_needed(threshold, source_size, target_size):
+  # |A & B| / |A | B| >= t exactly when |A & B| >= t / (1 + t) * (|A| + |B|).
+  return np.ceil(threshold / (1 + threshold) * (source_size + target_size) - 1e-9)
+
+def probable_matches(result, threshold=None, candidates=None):
+  """
+  Suggests pairings between the records missing in target and the records
+  missing in source, whose keys differ but whose text columns are alike.
+  Records are only compared within blocks of equal dates, and only when they
+  share one of their rarest character trigrams, so the pass never compares
+  all pairs. Pairs scoring at least `threshold` (the Jaccard similarity of
+  their trigrams) are kept, at most `candidates` for each source record.
+  """
+  threshold = min_score() if threshold is None else threshold
+  candidates = max_candidates() if candidates is None else candidates
+  text, dates = fuzzy_columns(result.schema)
+  source_start, source_stop = result.bounds(MISSING_IN_TARGET)
+  target_start, target_stop = result.bounds(MISSING_IN_SOURCE)
+
+  empty = np.array([], dtype=np.int64)
+  if source_start == source_stop or target_start == target_stop or not text:
+    return ProbableMatches(empty, empty, np.array([], dtype=np.float64))
+
+  source_rows, source_grams = trigrams(fuzzy_text([result.source[name] for name in text], source_start, source_stop))
+  target_rows, target_grams = trigrams(fuzzy_text([result.target[name] for name in text], target_start, target_stop))
+  codes, uniques = pd.factorize(np.concatenate([source_grams, target_grams]))
+  grams = max(len(uniques), 1)
+  # Grams are ranked by how often they occur, the rarest first. Repeats
+  # within a record make little difference to that.
+  order = np.empty(grams, dtype=np.int64)
+  order[np.argsort(np.bincount(codes, minlength=grams), kind="stable")] = np.arange(grams)
+  source_keys, source_positions, source_sizes = ordered(source_rows, codes[:len(source_rows)], order, source_stop - source_start)
+  target_keys, target_positions, target_sizes = ordered(target_rows, codes[len(source_rows):], order, target_stop - target_start)
+  source_blocks, target_blocks = block_codes(
+    [result.source[name][source_start:source_stop] for name in dates],
+    [result.target[name][target_start:target_stop] for name in dates],
+    (len(source_sizes), len(target_sizes)),
+  )
+
+  # Candidates share a date block and one of their rare trigrams.
+  shared = prefixes(source_keys, source_positions, source_sizes, source_blocks, grams, threshold).merge(
+    prefixes(target_keys, target_positions, target_sizes, target_blocks, grams, threshold),
+    on="bucket", suffixes=("_source", "_target"),
+  )
+  pairs = shared.groupby(shared["row_source"] * len(target_sizes) + shared["row_target"], sort=False).agg(
+    shared=("position_source", "size"), last_source=("position_source", "max"), last_target=("position_target", "max"),
+  )
+  source, target = np.divmod(pairs.index.to_numpy(), len(target_sizes))
+  source_size, target_size = source_sizes[source], target_sizes[target]
+  overlap, last_source, last_target = (pairs[name].to_numpy() for name in ("shared", "last_source", "last_target"))
+
+  # Every common gram up to the last one the prefixes share has been
+  # counted, so at most the shorter remainder of the two records can add
+  # to the overlap (positional filtering).
+  possible = overlap + np.minimum(source_size - 1 - last_source, target_size - 1 - last_target) >= overlap_needed(threshold, source_size, target_size)
+  source, target, source_size, target_size, overlap, last_source = (
+    values[possible] for values in (source, target, source_size, target_size, overlap, last_source)
+  )
+
+  # The rest of each source record is looked up in its target record.
+  lengths = source_size - 1 - last_source
+  pair = np.repeat(np.arange(len(source)), lengths)
+  starts = np.cumsum(source_sizes) - source_sizes
+  offsets = np.repeat(starts[source] + last_source + 1 - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+  probes = target[pair] * grams + source_keys[offsets] % grams
+  found = target_keys[np.minimum(np.searchsorted(target_keys, probes), len(target_keys) - 1)] == probes
+  overlap = overlap + np.bincount(pair, weights=found, minlength=len(source))
+
+  scores = overlap / (source_size + target_size - overlap)
+  kept = scores >= threshold
+  source, target, scores = source[kept], target[kept], scores[kept]
+
+  order = np.lexsort((target, -scores, source))
+  source, target, scores = source[order], target[order], scores[order]
+  rank = np.arange(len(source)) - np.searchsorted(source, source)
+  best = rank < candidates
+  return ProbableMatches(
+    source[best] + source_start,
+    target[best] + target_start,
+    np.round(scores[best], 3),
+  )
+
+def match_records(result, matches):
+  """Yields the probable matches in the JSON response shape."""
+  source_ids = result.take(matches.source).record_ids(0, len(matches.source))
+  target_ids = result.take(matches.target).record_ids(0, len(matches.target))
+  for source_id, target_id, score in zip(source_ids, target_ids, matches.scores.tolist()):
+    yield {"source_record_id": source_id, "target_record_id": target_id, "score": score}
@@ -0,0 +1,116 @@
+import json
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+from .models import ReconciliationJob
+from .results import ReconciliationResult
+from .schemas import DEFAULT_SCHEMA, parse_schema
+from .serializers.reconcilation import FileSerializers
+from .utils import convert_to_json
+
+def enqueue(validated_data):
+  job = ReconciliationJob(
+    format=validated_data['format'],
+    engine=validated_data.get('engine') or '',
+    feed=validated_data.get('feed') or '',
+    schema=validated_data['schema'].to_dict() if 'schema' in validated_data else None,
+    fuzzy=validated_data.get('fuzzy', False),
+  )
+  job.source.save(validated_data['source'].name, validated_data['source'], save=False)
+  job.target.save(validated_data['target'].name, validated_data['target'], save=False)
+  job.save()
+  return job
+
+def job_timeout():
+  return getattr(settings, "RECONCILIATION_JOB_TIMEOUT", 60 * 60)
+
+def job_max_attempts():
+  return getattr(settings, "RECONCILIATION_JOB_MAX_ATTEMPTS", 2)
+
+def recover_stale_jobs():
+  """
+  Jobs still running `job_timeout()` seconds after they were claimed are
+  taken to have lost their worker. They are queued again, or failed once
+  they have been claimed `job_max_attempts()` times, so a job that kills
+  its worker cannot keep the queue busy.
+  """
+  now = timezone.now()
+  stale = ReconciliationJob.objects.filter(status=ReconciliationJob.RUNNING, started_at__lt=now - timedelta(seconds=job_timeout()))
+  stale.filter(attempts__lt=job_max_attempts()).update(status=ReconciliationJob.QUEUED, started_at=None)
+  stale.update(
+    status=ReconciliationJob.FAILED,
+    finished_at=now,
+    errors={"error": [f"reconciliation did not finish within {job_timeout()} seconds"]},
+  )
+
+def claim_next_job():
+  """
+  Moves the oldest queued job to running and returns it, or returns None
+  when the queue is empty. The conditional update is what makes the claim
+  safe when several worker processes poll the same table.
+  """
+  recover_stale_jobs()
+  while True:
+    job = ReconciliationJob.objects.filter(status=ReconciliationJob.QUEUED).first()
+    if job is None:
+      return None
+
+    claimed = ReconciliationJob.objects.filter(pk=job.pk, status=ReconciliationJob.QUEUED).update(
+      status=ReconciliationJob.RUNNING,
+      started_at=timezone.now(),
+      attempts=F('attempts') + 1,
+    )
+    if claimed:
+      job.refresh_from_db()
+      return job
+
+def run_job(job):
+  data = {'source': job.source, 'target': job.target, 'format': 'json'}
+  if job.engine:
+    data['engine'] = job.engine
+  if job.feed:
+    data['feed'] = job.feed
+  if job.schema:
+    data['schema'] = json.dumps(job.schema)
+
+  try:
+    serializer = FileSerializers(data=data)
+    if serializer.is_valid():
+      content = b"".join(convert_to_json(serializer.validated_data))
+      job.result.save('result.json', ContentFile(content), save=False)
+      job.status = ReconciliationJob.SUCCEEDED
+    else:
+      job.errors = json.loads(json.dumps(serializer.errors, cls=JSONEncoder))
+      job.status = ReconciliationJob.FAILED
+  except Exception as exc:
+    job.errors = {"error": [f"reconciliation failed: {exc}"]}
+    job.status = ReconciliationJob.FAILED
+
+  job.finished_at = timezone.now()
+  job.save()
+  return job
+
+def run_next_job():
+  job = claim_next_job()
+  return run_job(job) if job is not None else None
+
+def load_result(job):
+  schema = parse_schema(job.schema) if job.schema else DEFAULT_SCHEMA
+  with job.result.open('rb') as result_file:
+    return ReconciliationResult.from_dict(json.load(result_file), schema)
+
+def work(poll_interval=1.0, max_jobs=None):
+  """
+  Worker loop run by each process of the worker pool. Polls the queue table
+  and processes one job at a time.
+  """
+  processed = 0
+  while max_jobs is None or processed < max_jobs:
+    if run_next_job() is None:
+      time.sleep(poll_interval)
+    else:
+      processed += 1
@@ -0,0 +1,30 @@
+import multiprocessing
+from django.core.management.base import BaseCommand
+from django.db import connections
+from ...jobs import work
+
+class Command(BaseCommand):
+  help = "Runs a pool of worker processes that reconcile queued upload jobs."
+
+  def add_arguments(self, parser):
+    parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+
+  def handle(self, *args, **options):
+    # Children must open their own database connections rather than share
+    # the parent's SQLite handle.
+    connections.close_all()
+    workers = [
+      multiprocessing.Process(target=work, kwargs={"poll_interval": options["poll_interval"]}, daemon=True)
+      for _ in range(options["processes"])
+    ]
+    for worker in workers:
+      worker.start()
+    self.stdout.write(f"Started {len(workers)} reconciliation workers")
+
+    try:
+      for worker in workers:
+        worker.join()
+    except KeyboardInterrupt:
+      for worker in workers:
+        worker.terminate()
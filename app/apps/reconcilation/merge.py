@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from pandas.api import types
+from rest_framework import serializers
+from .engine import in_file_order, positioned_result
+from .external import empty_frame, memory_budget, read_chunks
+from .schemas import DEFAULT_SCHEMA
+from .validation import coerce_types, find_violations, max_errors, violation_detail
+
+def sorted_fallback():
+  return getattr(settings, "RECONCILIATION_SORTED_FALLBACK", False)
+
+class Unsorted(Exception):
+  """Raised by the sorted engine for a file whose keys go down somewhere."""
+
+  def __init__(self, file_type, key, position, value, previous):
+    super().__init__(f"The {file_type} file is not sorted by {key}: the row in position {position + 1} has {key} {value} after {key} {previous}")
+
+class SortedSide:
+  """
+  One upload read a chunk at a time, validated and checked to be sorted by
+  its key as it goes. `rows` holds the rows read but not matched yet.
+  """
+
+  def __init__(self, file, file_type, budget, schema, limit):
+    self.chunks = read_chunks(file, file_type, budget, schema)
+    self.file_type = file_type
+    self.schema = schema
+    self.key = schema.keys[0]
+    self.limit = limit
+    self.rows = empty_frame(schema)
+    # The last key read, None until the first chunk.
+    self.last = None
+    self.done = False
+    self.total, self.violations = 0, []
+    # Number columns that held a float in any chunk.
+    self.float_columns = set()
+
+  def read(self):
+    chunk = next(self.chunks, None)
+    if chunk is None:
+      self.done = True
+      return
+
+    chunk_total, chunk_violations = find_violations(chunk, self.file_type, None, self.limit - len(self.violations), self.schema)
+    self.total += chunk_total
+    self.violations += chunk_violations
+    if self.total or not len(chunk):
+      # Once the upload is known to be rejected the rest is only read for
+      # its violations.
+      return
+
+    chunk = coerce_types(chunk[self.schema.columns], self.schema)
+    keys = chunk[self.key].to_numpy()
+    self.check_order(keys, chunk.index)
+    self.float_columns.update(column for column in self.schema.columns_of("number") if types.is_float_dtype(chunk[column]))
+    self.rows = pd.concat([self.rows, chunk]) if len(self.rows) else chunk
+    self.last = keys[-1]
+
+  def check_order(self, keys, index):
+    # Equal keys may follow each other; the engine pairs duplicates as the
+    # in-memory path does.
+    if self.last is not None and keys[0] < self.last:
+      raise Unsorted(self.file_type, self.key, int(index[0]), keys[0], self.last)
+    down = np.flatnonzero(keys[1:] < keys[:-1])
+    if len(down):
+      row = int(down[0]) + 1
+      raise Unsorted(self.file_type, self.key, int(index[row]), keys[row], keys[row - 1])
+
+  def take(self, bound):
+    """Removes and returns the rows keyed below `bound`, or every row when it is None."""
+    if bound is None:
+      count = len(self.rows)
+    else:
+      count = int(np.searchsorted(self.rows[self.key].to_numpy(), bound, side="left"))
+    taken, self.rows = self.rows.iloc[:count], self.rows.iloc[count:]
+    return taken
+
+def reconcile_sorted(source, target, budget=None, schema=DEFAULT_SCHEMA):
+  """
+  Variant of `engine.reconcile` for uploads sorted by their key. Both files
+  are read a chunk at a time, side by side like a merge join. Every key
+  below the last key read on both sides is complete, so its rows are
+  matched and dropped while the rest of the files is still unread. Memory
+  stays within a few chunks plus the records of the result, whatever the
+  file sizes.
+
+  Raises Unsorted at the first key lower than the one before it. The result
+  matches the in-memory path exactly.
+  """
+  if len(schema.keys) != 1:
+    raise serializers.ValidationError({"error": "The sorted engine needs a schema with a single key column"})
+
+  budget = memory_budget() if budget is None else budget
+  limit = max_errors()
+  source_side = SortedSide(source, 'source', budget, schema, limit)
+  target_side = SortedSide(target, 'target', budget, schema, limit)
+  sides = [source_side, target_side]
+
+  parts = []
+  while not (source_side.done and target_side.done):
+    # Reads on the side that is behind, so the bound moves forward.
+    open_sides = [side for side in sides if not side.done]
+    behind = next((side for side in open_sides if side.last is None), None) or min(open_sides, key=lambda side: side.last)
+    behind.read()
+    if source_side.total or target_side.total or any(side.last is None and not side.done for side in sides):
+      continue
+
+    bound = min((side.last for side in sides if not side.done), default=None)
+    source_rows, target_rows = source_side.take(bound), target_side.take(bound)
+    if len(source_rows) or len(target_rows):
+      parts.append(positioned_result(source_rows, target_rows, schema))
+
+  if source_side.total or target_side.total:
+    violations = source_side.violations + target_side.violations[:limit - len(source_side.violations)]
+    raise serializers.ValidationError(violation_detail(violations, source_side.total + target_side.total))
+
+  if not parts:
+    parts.append(positioned_result(empty_frame(schema, source_side.float_columns), empty_frame(schema, target_side.float_columns), schema))
+  result = in_file_order(parts)
+
+  # The in-memory path infers one type per number column for the whole
+  # file, so a side whose records are all integers is widened to match.
+  for side, values in ((source_side, result.source), (target_side, result.target)):
+    for column in side.float_columns:
+      values[column] = values[column].astype("float64")
+  return result
@@ -0,0 +1,133 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from .cache import cache_enabled, cache_stats
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the request latency histogram buckets.
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120]
+
+class Timings:
+  """
+  Phase durations, row counts and input sizes of one reconciliation
+  request. Phases that run more than once, one per upload say, add up.
+  """
+
+  def __init__(self):
+    self.started = time.perf_counter()
+    self.phases = {}
+    self.rows = {}
+    self.bytes = {}
+
+  @contextmanager
+  def phase(self, name):
+    started = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.phases[name] = self.phases.get(name, 0) + time.perf_counter() - started
+
+  def elapsed(self):
+    return time.perf_counter() - self.started
+
+  def server_timing(self):
+    """The phases so far as a Server-Timing header value, in milliseconds."""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items())
+
+class Metrics:
+  """
+  Process-wide aggregates of the reconciliation requests served, rendered
+  in the Prometheus text format. Each server process keeps its own.
+  """
+
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.requests = {}
+    self.latency = {}
+    self.phases = {}
+    self.rows = {}
+    self.bytes = {}
+
+  def observe(self, format, status, timings, elapsed):
+    with self.lock:
+      self.requests[format, status] = self.requests.get((format, status), 0) + 1
+
+      buckets, total, count = self.latency.get(format, ([0] * len(LATENCY_BUCKETS), 0.0, 0))
+      for index, bound in enumerate(LATENCY_BUCKETS):
+        if elapsed <= bound:
+          buckets[index] += 1
+      self.latency[format] = (buckets, total + elapsed, count + 1)
+
+      for name, seconds in timings.phases.items():
+        total, count = self.phases.get(name, (0.0, 0))
+        self.phases[name] = (total + seconds, count + 1)
+      for side, rows in timings.rows.items():
+        self.rows[side] = self.rows.get(side, 0) + rows
+      for side, size in timings.bytes.items():
+        self.bytes[side] = self.bytes.get(side, 0) + size
+
+  def render(self):
+    lines = []
+
+    def family(name, kind, help):
+      lines.append(f"# HELP {name} {help}")
+      lines.append(f"# TYPE {name} {kind}")
+
+    with self.lock:
+      family("reconciliation_requests_total", "counter", "Reconciliation requests by report format and response status.")
+      for (format, status), count in sorted(self.requests.items()):
+        lines.append(f'reconciliation_requests_total{{format="{format}",status="{status}"}} {count}')
+
+      family("reconciliation_request_duration_seconds", "histogram", "Reconciliation request latency, rendering included, by report format.")
+      for format, (buckets, total, count) in sorted(self.latency.items()):
+        for bound, bucket in zip(LATENCY_BUCKETS, buckets):
+          lines.append(f'reconciliation_request_duration_seconds_bucket{{format="{format}",le="{bound}"}} {bucket}')
+        lines.append(f'reconciliation_request_duration_seconds_bucket{{format="{format}",le="+Inf"}} {count}')
+        lines.append(f'reconciliation_request_duration_seconds_sum{{format="{format}"}} {total}')
+        lines.append(f'reconciliation_request_duration_seconds_count{{format="{format}"}} {count}')
+
+      family("reconciliation_phase_seconds", "summary", "Time spent in each reconciliation phase.")
+      for name, (total, count) in sorted(self.phases.items()):
+        lines.append(f'reconciliation_phase_seconds_sum{{phase="{name}"}} {total}')
+        lines.append(f'reconciliation_phase_seconds_count{{phase="{name}"}} {count}')
+
+      family("reconciliation_rows_total", "counter", "Rows read from uploads, by side.")
+      for side, rows in sorted(self.rows.items()):
+        lines.append(f'reconciliation_rows_total{{side="{side}"}} {rows}')
+
+      family("reconciliation_input_bytes_total", "counter", "Bytes uploaded, by side.")
+      for side, size in sorted(self.bytes.items()):
+        lines.append(f'reconciliation_input_bytes_total{{side="{side}"}} {size}')
+
+    if cache_enabled():
+      family("reconciliation_cache_lookups_total", "counter", "Result cache lookups by outcome.")
+      for outcome, count in sorted(cache_stats().items()):
+        lines.append(f'reconciliation_cache_lookups_total{{outcome="{outcome}"}} {count}')
+
+    return "\n".join(lines) + "\n"
+
+_metrics = Metrics()
+
+def metrics():
+  return _metrics
+
+def record(timings, format, status, **fields):
+  """
+  Logs one structured line for a finished request and adds it to the
+  process metrics. `fields` are logged as they are.
+  """
+  elapsed = timings.elapsed()
+  metrics().observe(format, status, timings, elapsed)
+  logger.info(json.dumps({
+    "event": "reconciliation",
+    "format": format,
+    "status": status,
+    "duration_ms": round(elapsed * 1000, 1),
+    "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in timings.phases.items()},
+    "rows": timings.rows,
+    "bytes": timings.bytes,
+    **fields,
+  }))
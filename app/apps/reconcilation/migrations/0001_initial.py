@@ -0,0 +1,35 @@
+# Generated by Django 5.1.15 on 2026-10-18 11:55
+
+import app.apps.reconcilation.models
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], db_index=True, default='queued', max_length=16)),
+                ('source', models.FileField(upload_to=app.apps.reconcilation.models.job_upload_path)),
+                ('target', models.FileField(upload_to=app.apps.reconcilation.models.job_upload_path)),
+                ('format', models.CharField(max_length=16)),
+                ('engine', models.CharField(blank=True, max_length=16)),
+                ('result', models.FileField(blank=True, upload_to=app.apps.reconcilation.models.job_upload_path)),
+                ('errors', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
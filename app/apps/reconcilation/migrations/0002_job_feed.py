@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reconcilation', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reconciliationjob',
+            name='feed',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reconcilation', '0002_job_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reconciliationjob',
+            name='schema',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reconcilation', '0003_job_schema'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reconciliationjob',
+            name='fuzzy',
+            field=models.BooleanField(default=False),
+        ),
+    ]
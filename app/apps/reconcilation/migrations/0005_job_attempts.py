@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reconcilation', '0004_job_fuzzy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reconciliationjob',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
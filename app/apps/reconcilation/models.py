@@ -0,0 +1,39 @@
+import uuid
+from django.db import models
+
+def job_upload_path(job, filename):
+  return f"reconciliation/jobs/{job.id}/{filename}"
+
+class ReconciliationJob(models.Model):
+  QUEUED = 'queued'
+  RUNNING = 'running'
+  SUCCEEDED = 'succeeded'
+  FAILED = 'failed'
+  STATUS_CHOICES = [
+    (QUEUED, 'Queued'),
+    (RUNNING, 'Running'),
+    (SUCCEEDED, 'Succeeded'),
+    (FAILED, 'Failed'),
+  ]
+
+  id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+  status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+  source = models.FileField(upload_to=job_upload_path)
+  target = models.FileField(upload_to=job_upload_path)
+  format = models.CharField(max_length=16)
+  engine = models.CharField(max_length=16, blank=True)
+  feed = models.CharField(max_length=100, blank=True)
+  schema = models.JSONField(null=True, blank=True)
+  fuzzy = models.BooleanField(default=False)
+  result = models.FileField(upload_to=job_upload_path, blank=True)
+  errors = models.JSONField(null=True, blank=True)
+  attempts = models.PositiveSmallIntegerField(default=0)
+  created_at = models.DateTimeField(auto_now_add=True)
+  started_at = models.DateTimeField(null=True, blank=True)
+  finished_at = models.DateTimeField(null=True, blank=True)
+
+  class Meta:
+    ordering = ['created_at']
+
+  def __str__(self):
+    return f"{self.id} ({self.status})"
@@ -0,0 +1,172 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from .compressed import content_size
+from .external import fits_in_memory
+from .engine import NORMALIZERS, Match, build_result, coded, joint_keys, match_columns
+from .schemas import DEFAULT_SCHEMA
+
+def worker_count():
+  return getattr(settings, "RECONCILIATION_WORKERS", None) or os.cpu_count() or 1
+
+def parallel_min_bytes():
+  return getattr(settings, "RECONCILIATION_PARALLEL_MIN_BYTES", 8 * 1024 * 1024)
+
+def use_parallel(*files):
+  """Whether uploads of this size are worth spreading over the pool."""
+  return worker_count() > 1 and sum(content_size(file) for file in files) >= parallel_min_bytes()
+
+def default_engine(*files):
+  """
+  The engine for uploads sent without one: out of core when they would not
+  fit the memory budget, parallel when they are large enough, in memory
+  otherwise.
+  """
+  if not fits_in_memory(*files):
+    return 'external'
+  return 'parallel' if use_parallel(*files) else 'memory'
+
+_pool = None
+
+def worker_pool():
+  # Workers are spawned rather than forked, since the web server may be
+  # running threads, and kept for the life of the process.
+  global _pool
+  if _pool is None:
+    _pool = ProcessPoolExecutor(worker_count(), mp_context=multiprocessing.get_context("spawn"))
+  return _pool
+
+@receiver(setting_changed)
+def reset_worker_pool(setting, **kwargs):
+  global _pool
+  if setting == "RECONCILIATION_WORKERS" and _pool is not None:
+    _pool.shutdown()
+    _pool = None
+
+def partitioned(columns, partitions):
+  """
+  Reorders a side's columns so the rows of each key partition are contiguous,
+  keeping file order within a partition. Returns the columns and the row
+  offsets where each partition starts, with the total row count appended.
+  """
+  buckets = pd.util.hash_pandas_object(pd.Series(columns["key"]), index=False).to_numpy() % partitions
+  order = np.argsort(buckets, kind="stable")
+  offsets = np.searchsorted(buckets[order], np.arange(partitions + 1))
+  return {column: values[order] for column, values in columns.items()}, offsets
+
+class SharedColumns:
+  """
+  Copies numeric arrays into shared memory blocks. Workers attach to the
+  blocks by name, so the columns are never pickled. The blocks are unlinked
+  on exit.
+  """
+
+  def __init__(self, arrays):
+    self.blocks, self.spec = [], {}
+    for key, array in arrays.items():
+      block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+      self.blocks.append(block)
+      np.ndarray(array.shape, array.dtype, buffer=block.buf)[:] = array
+      self.spec[key] = (block.name, array.dtype.str, len(array))
+
+  def __enter__(self):
+    return self.spec
+
+  def __exit__(self, *exc_info):
+    for block in self.blocks:
+      block.close()
+      block.unlink()
+
+def match_shared(spec, compare, source_range, target_range):
+  """
+  Worker entry point: matches one partition, read from the shared blocks
+  named in `spec`, and returns the Match with labels copied out.
+  """
+  blocks = {key: shared_memory.SharedMemory(name=name) for key, (name, _, _) in spec.items()}
+  try:
+    match = match_partition(blocks, spec, compare, source_range, target_range)
+  finally:
+    for block in blocks.values():
+      block.close()
+  return match
+
+def match_partition(blocks, spec, compare, source_range, target_range):
+  def side(name, start, stop):
+    return {
+      column: np.ndarray((spec[name, column][2],), np.dtype(spec[name, column][1]), buffer=blocks[name, column].buf)[start:stop]
+      for column in ["label", "key", *compare]
+    }
+
+  match = match_columns(side("source", *source_range), side("target", *target_range), compare)
+  return Match(*(np.array(labels) for labels in match))
+
+def merged(matches):
+  discrepant_source = np.concatenate([match.discrepant_source for match in matches])
+  discrepant_target = np.concatenate([match.discrepant_target for match in matches])
+  order = np.argsort(discrepant_source, kind="stable")
+  return Match(
+    missing_in_source=np.sort(np.concatenate([match.missing_in_source for match in matches]), kind="stable"),
+    missing_in_target=np.sort(np.concatenate([match.missing_in_target for match in matches]), kind="stable"),
+    discrepant_source=discrepant_source[order],
+    discrepant_target=discrepant_target[order],
+    fields=np.concatenate([match.fields for match in matches])[order],
+  )
+
+def shared_sides(source_df, target_df, schema):
+  """
+  The matched columns of both sides, all numeric so they can be shared:
+  text and dates are coded, and so are keys that are not integers.
+  """
+  source_key, target_key = joint_keys(source_df, target_df, schema)
+  if source_key.dtype == object:
+    source_key, target_key = coded(source_key, target_key)
+  sides = {
+    "source": {"label": source_df.index.to_numpy(), "key": source_key},
+    "target": {"label": target_df.index.to_numpy(), "key": target_key},
+  }
+  for name in schema.compare:
+    source_values, target_values = source_df[name].to_numpy(), target_df[name].to_numpy()
+    normalize_values = NORMALIZERS.get(schema.types[name])
+    if normalize_values is not None:
+      source_values, target_values = coded(source_values, target_values, normalize_values)
+    sides["source"][name], sides["target"][name] = source_values, target_values
+  return sides
+
+def reconcile_parallel(source_df, target_df, workers=None, schema=DEFAULT_SCHEMA):
+  """
+  Multi-core variant of `engine.reconcile`. Text and dates are coded as
+  integers, rows are partitioned by a hash of their key, and each partition
+  is matched in a worker process that reads the columns from shared memory.
+  The parent merges the partial matches and builds the result, so the
+  result matches the in-memory path exactly.
+
+  Frames must be validated and indexed by file position.
+  """
+  workers = worker_count() if workers is None else workers
+  sides = shared_sides(source_df, target_df, schema)
+
+  if workers <= 1:
+    match = match_columns(sides["source"], sides["target"], schema.compare)
+  else:
+    source_columns, source_offsets = partitioned(sides["source"], workers)
+    target_columns, target_offsets = partitioned(sides["target"], workers)
+    arrays = {
+      **{("source", column): values for column, values in source_columns.items()},
+      **{("target", column): values for column, values in target_columns.items()},
+    }
+    with SharedColumns(arrays) as spec:
+      match = merged(list(worker_pool().map(
+        match_shared,
+        [spec] * workers,
+        [schema.compare] * workers,
+        zip(source_offsets[:-1], source_offsets[1:]),
+        zip(target_offsets[:-1], target_offsets[1:]),
+      )))
+
+  return build_result(source_df, target_df, match, schema)[0]
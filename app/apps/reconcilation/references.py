@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.utils import timezone
+from .engine import NORMALIZERS, KeyIndex, build_result, coded, key_index, match_columns
+from .schemas import Schema
+
+# A registered target loaded from its directory: the description
+# register_reference() returned, the target frame, the KeyIndex of its keys,
+# and for each text or date column the code of every row and the distinct
+# values the codes point to.
+Reference = namedtuple("Reference", ["description", "frame", "index", "codes"])
+
+def reference_dir():
+  return settings.RECONCILIATION_REFERENCE_DIR
+
+def reference_path(name, *names):
+  return os.path.join(reference_dir(), name, *names)
+
+def current_version(name):
+  try:
+    with open(reference_path(name, "current")) as current_file:
+      return int(current_file.read())
+  except FileNotFoundError:
+    return None
+
+def write_arrays(frame, schema, directory):
+  index = key_index(frame[schema.keys[0]].to_numpy())
+  for part, values in index._asdict().items():
+    # Text and date keys are kept as fixed-width strings, which numpy can
+    # memory-map and binary search without Python comparisons.
+    np.save(os.path.join(directory, f"index-{part}.npy"), values.astype(str) if values.dtype == object else values)
+
+  for position, name in enumerate(schema.compare):
+    if schema.types[name] in NORMALIZERS:
+      codes, uniques = pd.factorize(frame[name].to_numpy())
+      np.save(os.path.join(directory, f"codes-{position}.npy"), codes)
+      np.save(os.path.join(directory, f"uniques-{position}.npy"), uniques.astype(str))
+    else:
+      np.save(os.path.join(directory, f"column-{position}.npy"), frame[name].to_numpy())
+
+def register_reference(name, frame, schema):
+  """
+  Stores a validated target frame as the next version of the named
+  reference and returns its description. Each version is a directory of
+  arrays written aside and renamed into place, and the reference's
+  "current" file is then replaced to point at it, so requests see either
+  the old version or the new one in full. The version before is kept for
+  requests that already started on it; older ones are removed.
+  """
+  os.makedirs(reference_path(name), exist_ok=True)
+  temporary = tempfile.mkdtemp(dir=reference_path(name), suffix=".tmp")
+  try:
+    write_arrays(frame, schema, temporary)
+    version = (current_version(name) or 0) + 1
+    while True:
+      description = {
+        "name": name,
+        "version": version,
+        "created_at": timezone.now().isoformat(),
+        "schema": schema.to_dict(),
+        "rows": len(frame),
+      }
+      with open(os.path.join(temporary, "reference.json"), "w") as description_file:
+        json.dump(description, description_file)
+      try:
+        # Fails when a concurrent registration took the version first.
+        os.rename(temporary, reference_path(name, str(version)))
+        break
+      except OSError:
+        version += 1
+  except BaseException:
+    shutil.rmtree(temporary, ignore_errors=True)
+    raise
+
+  pointer = tempfile.NamedTemporaryFile("w", dir=reference_path(name), suffix=".tmp", delete=False)
+  with pointer:
+    pointer.write(str(version))
+  if version > (current_version(name) or 0):
+    os.replace(pointer.name, reference_path(name, "current"))
+  else:
+    os.unlink(pointer.name)
+
+  for entry in os.listdir(reference_path(name)):
+    if entry.isdigit() and int(entry) < version - 1:
+      shutil.rmtree(reference_path(name, entry), ignore_errors=True)
+  return description
+
+def load_reference(name):
+  """The current version of a reference, or None when there is no such reference."""
+  version = current_version(name)
+  if version is None:
+    return None
+  directory = reference_path(name, str(version))
+  with open(os.path.join(directory, "reference.json")) as description_file:
+    description = json.load(description_file)
+  schema = Schema(**description["schema"])
+
+  def array(filename):
+    return np.load(os.path.join(directory, filename), mmap_mode="r")
+
+  index = KeyIndex(*(array(f"index-{part}.npy") for part in KeyIndex._fields))
+  key_values = index.keys[index.inverse]
+  columns = {schema.keys[0]: key_values.astype(object) if key_values.dtype.kind == "U" else key_values}
+  codes = {}
+  for position, name in enumerate(schema.compare):
+    if schema.types[name] in NORMALIZERS:
+      codes[name] = array(f"codes-{position}.npy"), array(f"uniques-{position}.npy").astype(object)
+      columns[name] = codes[name][1][codes[name][0]]
+    else:
+      columns[name] = array(f"column-{position}.npy")
+  return Reference(description, pd.DataFrame(columns, copy=False), index, codes)
+
+def delete_reference(name):
+  shutil.rmtree(reference_path(name))
+
+def reconcile_reference(source_df, reference):
+  """
+  Variant of `engine.reconcile` whose target is a registered reference.
+  The target is neither read nor validated, its keys are looked up in the
+  stored index, and only the distinct values of its text and date columns
+  are coded together with the source's.
+  """
+  schema = Schema(**reference.description["schema"])
+  source_keys = source_df[schema.keys[0]].to_numpy()
+  if reference.index.keys.dtype.kind == "U":
+    source_keys = source_keys.astype(str)
+  source = {"label": source_df.index.to_numpy(), "key": source_keys}
+  target = {"label": np.arange(len(reference.frame))}
+  for name in schema.compare:
+    if name in reference.codes:
+      target_codes, uniques = reference.codes[name]
+      source[name], unique_codes = coded(source_df[name].to_numpy(), uniques, NORMALIZERS[schema.types[name]])
+      target[name] = unique_codes[target_codes]
+    else:
+      source[name], target[name] = source_df[name].to_numpy(), reference.frame[name].to_numpy()
+
+  match = match_columns(source, target, schema.compare, reference.index)
+  return build_result(source_df, reference.frame, match, schema)[0]
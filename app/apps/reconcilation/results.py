@@ -0,0 +1,178 @@
+import numpy as np
+from .schemas import DEFAULT_SCHEMA
+
+SECTIONS = ["missing_in_source", "missing_in_target", "record_discrepancies"]
+
+# Row status codes; their order is the order of the sections.
+MISSING_IN_SOURCE, MISSING_IN_TARGET, DISCREPANCY = 0, 1, 2
+
+def field_bit(index):
+  """Bit of the discrepancy field mask for the schema's index-th compared column."""
+  return 1 << index
+
+def fields_dtype(schema):
+  # The smallest unsigned type with a bit per compared column: uint8 for
+  # the default schema's three.
+  return np.min_scalar_type((1 << len(schema.compare)) - 1)
+
+def numbers(values):
+  # Integers only when every value is one, like pandas infers for a file.
+  return np.array(values) if values else np.array([], dtype=np.int64)
+
+def typed(values, kind):
+  if kind == "integer":
+    return np.array(values, dtype=np.int64)
+  if kind == "number":
+    return numbers(values)
+  return np.array(values, dtype=object)
+
+def value_rows(columns, names, start, stop):
+  # Tuples of the named columns' values, row by row; empty tuples when the
+  # schema compares no columns.
+  if not names:
+    return [()] * (stop - start)
+  return zip(*(columns[name][start:stop].tolist() for name in names))
+
+class ReconciliationResult:
+  """
+  Reconciliation result held as one array per column instead of a dict per
+  record. Rows are grouped by status in section order.
+
+  `keys` maps each key column of the schema to its values. `source` and
+  `target` map each compared column to the values of that side. Records
+  missing in source carry their values in the target columns, records
+  missing in target in the source columns, and discrepancies in both.
+  `fields` is the mask of discrepant columns, bit i standing for the i-th
+  compared column. Dates of discrepancies are stored stripped, as they are
+  reported. Text and dates are object arrays; each number column keeps the
+  dtype of its file so integers stay integers.
+  """
+
+  def __init__(self, schema, keys, status, fields, source, target):
+    self.schema = schema
+    self.keys = keys
+    self.status = status
+    self.fields = fields
+    self.source = source
+    self.target = target
+
+  @property
+  def ids(self):
+    """The record IDs of a result with a single key column."""
+    return self.keys[self.schema.keys[0]]
+
+  def __len__(self):
+    return len(self.status)
+
+  def columns(self):
+    return [*self.keys.values(), self.status, self.fields, *self.source.values(), *self.target.values()]
+
+  @classmethod
+  def from_columns(cls, schema, columns):
+    """Inverse of columns()."""
+    keys, compare = len(schema.keys), len(schema.compare)
+    return cls(
+      schema,
+      dict(zip(schema.keys, columns[:keys])),
+      columns[keys],
+      columns[keys + 1],
+      dict(zip(schema.compare, columns[keys + 2:keys + 2 + compare])),
+      dict(zip(schema.compare, columns[keys + 2 + compare:])),
+    )
+
+  def bounds(self, status):
+    """Returns the (start, stop) rows of one status."""
+    start, stop = np.searchsorted(self.status, [status, status + 1])
+    return int(start), int(stop)
+
+  def count(self, status):
+    start, stop = self.bounds(status)
+    return stop - start
+
+  def take(self, rows):
+    return self.from_columns(self.schema, [column[rows] for column in self.columns()])
+
+  @classmethod
+  def concat(cls, results):
+    # Empty parts are left out so they cannot widen an integer number
+    # column to float.
+    parts = [result for result in results if len(result)] or results[:1]
+    return cls.from_columns(parts[0].schema, [np.concatenate(columns) for columns in zip(*(part.columns() for part in parts))])
+
+  def record_ids(self, start, stop):
+    """
+    The record_id of each row in the JSON shape: the key value, or a dict
+    of the key values for a composite key.
+    """
+    if len(self.schema.keys) == 1:
+      return self.ids[start:stop].tolist()
+    names = self.schema.keys
+    return [dict(zip(names, values)) for values in value_rows(self.keys, names, start, stop)]
+
+  def records(self, status):
+    """Yields the rows of one status as the dicts of the JSON response."""
+    start, stop = self.bounds(status)
+    names = self.schema.compare
+    ids = self.record_ids(start, stop)
+    if status == MISSING_IN_SOURCE or status == MISSING_IN_TARGET:
+      side = self.target if status == MISSING_IN_SOURCE else self.source
+      for record_id, values in zip(ids, value_rows(side, names, start, stop)):
+        yield {"record_id": record_id, "data": dict(zip(names, values))}
+      return
+
+    bits = [(index, name, field_bit(index)) for index, name in enumerate(names)]
+    for record_id, fields, source_row, target_row in zip(
+      ids,
+      self.fields[start:stop].tolist(),
+      value_rows(self.source, names, start, stop),
+      value_rows(self.target, names, start, stop),
+    ):
+      yield {
+        "record_id": record_id,
+        "source_data": dict(zip(names, source_row)),
+        "target_data": dict(zip(names, target_row)),
+        "discrepancy": {
+          name: {"source_value": source_row[index], "target_name": target_row[index]}
+          for index, name, bit in bits if fields & bit
+        },
+      }
+
+  def to_dict(self):
+    return {section: list(self.records(status)) for status, section in enumerate(SECTIONS)}
+
+  @classmethod
+  def from_dict(cls, data, schema=DEFAULT_SCHEMA):
+    """Rebuilds a result from the JSON response shape."""
+    names = schema.compare
+    composite = len(schema.keys) > 1
+    nothing = [None] * len(names)
+
+    def key_values(record):
+      return [record["record_id"][key] for key in schema.keys] if composite else [record["record_id"]]
+
+    def side(values):
+      return [values[name] for name in names]
+
+    rows = []
+    for record in data["missing_in_source"]:
+      rows.append((*key_values(record), MISSING_IN_SOURCE, 0, *nothing, *side(record["data"])))
+    for record in data["missing_in_target"]:
+      rows.append((*key_values(record), MISSING_IN_TARGET, 0, *side(record["data"]), *nothing))
+    for record in data["record_discrepancies"]:
+      fields = sum(field_bit(index) for index, name in enumerate(names) if name in record["discrepancy"])
+      rows.append((*key_values(record), DISCREPANCY, fields, *side(record["source_data"]), *side(record["target_data"])))
+
+    keys = len(schema.keys)
+    columns = [list(column) for column in zip(*rows)] or [[] for _ in range(keys + 2 + 2 * len(names))]
+    compare = [schema.types[name] for name in names]
+    for position, kind in enumerate(compare * 2, start=keys + 2):
+      if kind in ("integer", "number"):
+        # The filler of the side a missing record is absent from is zero,
+        # as the engine leaves it.
+        columns[position] = [0 if value is None else value for value in columns[position]]
+    return cls.from_columns(schema, [
+      *(typed(column, schema.types[key]) for key, column in zip(schema.keys, columns)),
+      np.array(columns[keys], dtype=np.uint8),
+      np.array(columns[keys + 1], dtype=fields_dtype(schema)),
+      *(typed(column, kind) for column, kind in zip(columns[keys + 2:], compare * 2)),
+    ])
@@ -0,0 +1,129 @@
+import base64
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import uuid
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from .results import DISCREPANCY, SECTIONS, field_bit
+from .utils import json_records
+
+# The most records a page of GET /api/runs/<id>/records/ may hold.
+MAX_PAGE_SIZE = 1000
+
+def run_dir():
+  return settings.RECONCILIATION_RUN_DIR
+
+def page_size():
+  return getattr(settings, "RECONCILIATION_RUN_PAGE_SIZE", 100)
+
+def run_path(run_id, *names):
+  return os.path.join(run_dir(), str(run_id), *names)
+
+def write_records(result, path):
+  """
+  Writes every record of `result` back to back, in section order, as the
+  JSON of the upload response with its section added under "status".
+  Returns the offset where each record starts, with the file size last.
+  """
+  lengths = []
+  with open(path, "wb") as records_file:
+    for status, section in enumerate(SECTIONS):
+      prefix = f'{{"status":"{section}",'
+      for records in json_records(result, status):
+        for record in records:
+          data = f"{prefix}{record[1:]}".encode("utf-8")
+          records_file.write(data)
+          lengths.append(len(data))
+  return np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+
+def save_run(result):
+  """
+  Stores a result under a new run ID and returns the run's description. A
+  run is a directory holding the records as JSON, an array of their byte
+  offsets and, for each compared column, the sorted rows discrepant in it.
+  The arrays are memory-mapped when read, so a page of records costs the
+  same however deep it is.
+  """
+  os.makedirs(run_dir(), exist_ok=True)
+  temporary = tempfile.mkdtemp(dir=run_dir(), suffix=".tmp")
+  try:
+    np.save(os.path.join(temporary, "offsets.npy"), write_records(result, os.path.join(temporary, "records.json")))
+    start, stop = result.bounds(DISCREPANCY)
+    for index in range(len(result.schema.compare)):
+      np.save(os.path.join(temporary, f"field-{index}.npy"), start + np.flatnonzero(result.fields[start:stop] & field_bit(index)))
+
+    run = {
+      "id": str(uuid.uuid4()),
+      "created_at": timezone.now().isoformat(),
+      "schema": result.schema.to_dict(),
+      "counts": {section: result.count(status) for status, section in enumerate(SECTIONS)},
+    }
+    with open(os.path.join(temporary, "run.json"), "w") as run_file:
+      json.dump(run, run_file)
+    os.replace(temporary, run_path(run["id"]))
+  except BaseException:
+    shutil.rmtree(temporary, ignore_errors=True)
+    raise
+  return run
+
+def load_run(run_id):
+  """The description save_run() returned for a run, or None when there is no such run."""
+  try:
+    with open(run_path(run_id, "run.json")) as run_file:
+      return json.load(run_file)
+  except FileNotFoundError:
+    return None
+
+def delete_run(run_id):
+  shutil.rmtree(run_path(run_id))
+
+def encode_cursor(row):
+  # Without the padding, which would need escaping in a URL.
+  return base64.urlsafe_b64encode(str(row).encode()).rstrip(b"=").decode()
+
+def decode_cursor(cursor):
+  """The last row of the previous page, or a ValueError for a cursor this module did not hand out."""
+  row = int(base64.urlsafe_b64decode(cursor.encode() + b"=" * (-len(cursor) % 4)))
+  if row < 0:
+    raise ValueError(cursor)
+  return row
+
+def page_rows(run, status=None, field=None, after=-1, limit=None):
+  """
+  The rows of the page after row `after`: those of one section, or of
+  every section, and only those discrepant in the index-th compared column
+  when `field` is given. One row more than `limit` is returned when there
+  is a next page.
+  """
+  limit = page_size() if limit is None else limit
+  counts = [run["counts"][section] for section in SECTIONS]
+  if status is None:
+    start, stop = 0, sum(counts)
+  else:
+    start = sum(counts[:status])
+    stop = start + counts[status]
+
+  if field is None:
+    first = max(start, after + 1)
+    return np.arange(first, min(first + limit + 1, stop))
+
+  # Searched in place: only the pages of the array around the cursor and
+  # the page itself are read.
+  discrepant = np.load(run_path(run["id"], f"field-{field}.npy"), mmap_mode="r")
+  first = int(np.searchsorted(discrepant, max(start, after + 1)))
+  rows = np.asarray(discrepant[first:first + limit + 1])
+  return rows[rows < stop]
+
+def read_records(run, rows):
+  """The stored JSON of each of `rows`."""
+  if not len(rows):
+    return []
+  offsets = np.load(run_path(run["id"], "offsets.npy"), mmap_mode="r")
+  starts, stops = offsets[rows].tolist(), offsets[rows + 1].tolist()
+  with open(run_path(run["id"], "records.json"), "rb") as records_file:
+    with mmap.mmap(records_file.fileno(), 0, access=mmap.ACCESS_READ) as records:
+      return [records[start:stop] for start, stop in zip(starts, stops)]
@@ -0,0 +1,123 @@
+import json
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Column types a schema can declare:
+# - integer: whole numbers, such as record IDs
+# - number: integers or decimals, kept as integers when every value is one
+# - text: compared with surrounding whitespace stripped and case ignored
+# - date: YYYY-MM-DD, compared and reported with surrounding whitespace
+#   stripped
+TYPES = ["integer", "number", "text", "date"]
+
+# Key values are matched exactly, so keys cannot be decimals.
+KEY_TYPES = ["integer", "text", "date"]
+
+# Discrepant columns are kept as the bits of one 64-bit mask.
+MAX_COMPARE_COLUMNS = 64
+
+class Schema:
+  """
+  The columns a reconciliation reads and how it compares them. `keys` are
+  the columns that identify a record, several of them for a composite key;
+  `compare` are the columns whose values must agree between the source and
+  target rows of a record, in the order discrepancies are reported.
+  """
+
+  def __init__(self, keys, compare, types):
+    self.keys = list(keys)
+    self.compare = list(compare)
+    self.types = {column: types.get(column, "text") for column in self.keys + self.compare}
+
+  @property
+  def columns(self):
+    return self.keys + self.compare
+
+  def columns_of(self, *kinds):
+    return [column for column in self.columns if self.types[column] in kinds]
+
+  def dtypes(self):
+    """
+    Types the CSV reader is given. Text and date columns are read as text
+    without inference. Integer and number columns are left to the parser's
+    numeric detection, which is how ill-typed values are found for
+    validation and how number columns stay integers when they can.
+    """
+    return {column: str for column in self.columns_of("text", "date")}
+
+  def wanted(self, name):
+    # usecols callable, so a missing column is reported by validation
+    # instead of the parser.
+    return name in self.types
+
+  def to_dict(self):
+    return {"keys": self.keys, "compare": self.compare, "types": self.types}
+
+  def __eq__(self, other):
+    return isinstance(other, Schema) and self.to_dict() == other.to_dict()
+
+  def __hash__(self):
+    return hash(str(self))
+
+  def __str__(self):
+    return json.dumps(self.to_dict(), sort_keys=True)
+
+DEFAULT_SCHEMA = Schema(
+  keys=["ID"],
+  compare=["Name", "Date", "Amount"],
+  types={"ID": "integer", "Name": "text", "Date": "date", "Amount": "number"},
+)
+
+def names(value, label):
+  if isinstance(value, str):
+    value = [value]
+  if not isinstance(value, list) or not all(isinstance(name, str) and name for name in value):
+    raise ValueError(f"Schema {label} must be a column name or a list of column names")
+  return value
+
+def parse_schema(definition):
+  """
+  Builds a Schema from its dict form, as configured or sent with a request:
+  {"keys": [...], "compare": [...], "types": {column: type}}. Columns
+  without a type are text. Raises ValueError naming the first problem.
+  """
+  if not isinstance(definition, dict):
+    raise ValueError("Schema must be an object with keys, compare and types")
+  unknown = sorted(set(definition) - {"keys", "compare", "types"})
+  if unknown:
+    raise ValueError(f"Unsupported schema fields: {', '.join(unknown)}. Allowed fields are: keys, compare, types")
+
+  keys = names(definition.get("keys"), "keys")
+  compare = names(definition.get("compare", []), "compare")
+  types = definition.get("types", {})
+  if not isinstance(types, dict):
+    raise ValueError("Schema types must map column names to types")
+
+  columns = keys + compare
+  if not keys:
+    raise ValueError("Schema keys must name at least one column")
+  if len(set(columns)) != len(columns):
+    raise ValueError("Schema columns may only appear once across keys and compare")
+  if len({column.lower() for column in columns}) != len(columns):
+    # Arrow and Parquet reports name their fields after the lowercased columns.
+    raise ValueError("Schema column names must differ by more than case")
+  if len(compare) > MAX_COMPARE_COLUMNS:
+    raise ValueError(f"Schemas compare at most {MAX_COMPARE_COLUMNS} columns")
+  for column, kind in types.items():
+    if column not in columns:
+      raise ValueError(f"Schema types name {column}, which is not a key or compared column")
+    if kind not in TYPES:
+      raise ValueError(f"Unsupported column type {kind}. Allowed column types are: {', '.join(TYPES)}")
+    if column in keys and kind not in KEY_TYPES:
+      raise ValueError(f"Unsupported key type {kind}. Allowed key types are: {', '.join(KEY_TYPES)}")
+  return Schema(keys, compare, types)
+
+def configured_schemas():
+  """The named schemas of RECONCILIATION_SCHEMAS, parsed."""
+  schemas = {}
+  for name, definition in getattr(settings, "RECONCILIATION_SCHEMAS", {}).items():
+    try:
+      schemas[name] = parse_schema(definition)
+    except ValueError as exc:
+      raise ImproperlyConfigured(f"RECONCILIATION_SCHEMAS[{name!r}]: {exc}")
+  return schemas
@@ -0,0 +1,51 @@
+from rest_framework import serializers
+import zipfile
+from ..batches import archive_pairs, max_pairs, upload_pairs
+from .reconcilation import FileSerializers
+
+class BatchSerializers(serializers.Serializer):
+  archive = serializers.FileField(allow_empty_file=False, required=False)
+  format = serializers.CharField(required=False, default='json')
+  output = serializers.CharField(required=False, default='zip')
+  engine = serializers.CharField(required=False)
+  schema = serializers.CharField(required=False)
+  fuzzy = serializers.BooleanField(required=False)
+
+  # The options every pair is reconciled with are those of a single upload.
+  validate_format = FileSerializers.validate_format
+  validate_engine = FileSerializers.validate_engine
+  validate_schema = FileSerializers.validate_schema
+  validate_fuzzy_matching = FileSerializers.validate_fuzzy_matching
+
+  def validate_output(self, output):
+    valid_outputs = ['zip', 'ndjson']
+    output = output.lower()
+    if output not in valid_outputs:
+      raise serializers.ValidationError(f'Unsupported batch output. Allowed batch outputs are: {", ".join(valid_outputs)}')
+    return output
+
+  def validate_archive(self, archive):
+    if not archive.name.lower().endswith('.zip'):
+      raise serializers.ValidationError('Batch archives must be .zip files')
+    try:
+      return zipfile.ZipFile(archive)
+    except zipfile.BadZipFile:
+      raise serializers.ValidationError('Could not read batch archive')
+
+  def validate(self, data):
+    if data['output'] == 'ndjson' and data['format'] not in ('json', 'summary'):
+      raise serializers.ValidationError({"error": "NDJSON batches hold json and summary reports only"})
+    if data.get('fuzzy'):
+      self.validate_fuzzy_matching(data)
+
+    pairs = archive_pairs(data['archive']) if 'archive' in data else upload_pairs(self.context.get('files', {}))
+    if not pairs:
+      raise serializers.ValidationError({"error": "A batch needs an archive or files named source.<name> and target.<name>"})
+    if len(pairs) > max_pairs():
+      raise serializers.ValidationError({"error": f"A batch holds at most {max_pairs()} pairs"})
+    data['pairs'] = pairs
+
+    # Each pair goes through the upload serializer with the options as sent.
+    data['options'] = {field: self.initial_data[field] for field in ('engine', 'schema', 'fuzzy') if field in self.initial_data}
+    data['options']['format'] = data['format']
+    return data
@@ -0,0 +1,35 @@
+from rest_framework import serializers
+from django.urls import reverse
+from ..models import ReconciliationJob
+
+class JobSerializers(serializers.ModelSerializer):
+  status_url = serializers.SerializerMethodField()
+  result_url = serializers.SerializerMethodField()
+
+  class Meta:
+    model = ReconciliationJob
+    fields = [
+      'id',
+      'status',
+      'format',
+      'engine',
+      'feed',
+      'fuzzy',
+      'errors',
+      'created_at',
+      'started_at',
+      'finished_at',
+      'status_url',
+      'result_url',
+    ]
+
+  def build_url(self, name, job):
+    url = reverse(name, kwargs={'job_id': job.id})
+    request = self.context.get('request')
+    return request.build_absolute_uri(url) if request else url
+
+  def get_status_url(self, job):
+    return self.build_url('reconcilation:job', job)
+
+  def get_result_url(self, job):
+    return self.build_url('reconcilation:job-result', job)
@@ -1,18 +1,70 @@
 from rest_framework import serializers
-import pandas as pd
-from datetime import datetime
+import json
 import os
+import re
+from contextlib import nullcontext
+from ..cache import cache_enabled, cache_key, result_cache
+from ..compressed import COMPRESSED_EXTENSIONS, check_archive, compression
+from ..columnar import COLUMNAR_EXTENSIONS, COLUMNAR_FORMATS, arrow_available, read_upload
+from ..engine import reconcile
+from ..feeds import reconcile_feed
+from ..fuzzy import fuzzy_columns, probable_matches
+from ..parallel import default_engine, reconcile_parallel
+from ..references import load_reference, reconcile_reference
+from ..runs import save_run
+from ..external import reconcile_external
+from ..merge import Unsorted, reconcile_sorted, sorted_fallback
+from ..schemas import DEFAULT_SCHEMA, Schema, configured_schemas, parse_schema
+from ..utils import REPORT_FORMATS
+from ..validation import coerce_types, find_violations, max_errors, violation_detail
 
 class FileSerializers(serializers.Serializer):
   source = serializers.FileField(allow_empty_file=False, required=True)
-  target = serializers.FileField(allow_empty_file=False, required=True)
+  # Left out for uploads reconciled against a registered `reference`.
+  target = serializers.FileField(allow_empty_file=False, required=False)
   format = serializers.CharField(required=True)
+  engine = serializers.CharField(required=False)
+  mode = serializers.CharField(required=False)
+  feed = serializers.CharField(required=False, max_length=100)
+  schema = serializers.CharField(required=False)
+  fuzzy = serializers.BooleanField(required=False)
+  persist = serializers.BooleanField(required=False)
+  reference = serializers.CharField(required=False, max_length=100)
+
+  # Set by validate() to 'hit' or 'miss' when the result cache is in use.
+  cache_status = None
+
+  # Set by validate() to a FeedRun when the upload belongs to a named feed.
+  feed_run = None
+
+  # Set by validate() to the request's schema.
+  active_schema = DEFAULT_SCHEMA
+
+  # Set by validate() to the ProbableMatches of the result when fuzzy
+  # matching was asked for.
+  probable_matches = None
+
+  # Set by validate() to the description of the stored run when the result
+  # was to be persisted.
+  run = None
+
+  # Set by validate() to the description of the reference version the
+  # upload was reconciled against.
+  target_reference = None
+
+  def phase(self, name):
+    # Times a phase on the request's Timings, when the view passed one.
+    timings = self.context.get('timings')
+    return timings.phase(name) if timings is not None else nullcontext()
 
   def validate_file_extension(self, file):
-      valid_extensions = ['.csv']
-      ext = os.path.splitext(file.name)[1]
-      if ext.lower() not in valid_extensions:
+      valid_extensions = ['.csv', *COLUMNAR_EXTENSIONS, *COMPRESSED_EXTENSIONS]
+      ext = compression(file) or os.path.splitext(file.name)[1].lower()
+      if ext not in valid_extensions:
         raise serializers.ValidationError(f'Unsupported file extension. Allowed extensions are: {", ".join(valid_extensions)}')
+      if ext in COLUMNAR_EXTENSIONS and not arrow_available():
+        raise serializers.ValidationError(f'Reading {ext} files requires the optional pyarrow package')
+      check_archive(file)
       return file
 
   def validate_source(self, source):
@@ -22,205 +74,201 @@ class FileSerializers(serializers.Serializer):
     return self.validate_file_extension(target)
 
   def validate_format(self, format):
-    valid_return_format = ['csv', 'html', 'json']
     format = format.lower()
-    if format not in valid_return_format:
-      raise serializers.ValidationError(f'Unsupported return file format. Allowed return file formats are: {", ".join(valid_return_format)}')
+    if format not in REPORT_FORMATS:
+      raise serializers.ValidationError(f'Unsupported return file format. Allowed return file formats are: {", ".join(REPORT_FORMATS)}')
+    if format in COLUMNAR_FORMATS and not arrow_available():
+      raise serializers.ValidationError(f'The {format} format requires the optional pyarrow package')
     return format
 
-  def validate_columns(self, file, file_type):
-    columns = [
-      "ID",
-      "Name",
-      "Date",
-      "Amount",
-    ]
-    file_df = pd.read_csv(file)
-    if list(file_df.columns) != columns:
-      missing_cols = [col for col in columns if col not in file_df.columns]
-      if missing_cols:
-        raise serializers.ValidationError({"error": f"Missing columns: {', '.join(missing_cols)}, in {file_type} file"})
-
-    return file_df
-
-  def is_valid_date(self, date_string, date_format='%Y-%m-%d'):
-    try:
-        datetime.strptime(date_string, date_format)
-        return True
-    except ValueError:
-        return False
-
-  def is_valid_number(self, value):
+  def validate_engine(self, engine):
+    valid_engines = ['memory', 'parallel', 'external', 'sorted']
+    engine = engine.lower()
+    if engine not in valid_engines:
+      raise serializers.ValidationError(f'Unsupported reconciliation engine. Allowed engines are: {", ".join(valid_engines)}')
+    return engine
+
+  def validate_mode(self, mode):
+    valid_modes = ['sync', 'async']
+    mode = mode.lower()
+    if mode not in valid_modes:
+      raise serializers.ValidationError(f'Unsupported mode. Allowed modes are: {", ".join(valid_modes)}')
+    return mode
+
+  def validate_feed(self, feed):
+    if not re.fullmatch(r'[A-Za-z0-9_-]+', feed):
+      raise serializers.ValidationError('Unsupported feed name. Feed names may only contain letters, digits, "_" and "-"')
+    return feed
+
+  def validate_reference(self, reference):
+    found = load_reference(reference) if re.fullmatch(r'[A-Za-z0-9_-]+', reference) else None
+    if found is None:
+      raise serializers.ValidationError(f'No reference is registered as {reference}')
+    return found
+
+  def validate_schema(self, schema):
+    # A configured schema by name, or a schema of its own as a JSON object.
+    if schema.lstrip().startswith('{'):
       try:
-          float(value)
-          return True
-      except ValueError:
-          return False
-
-  def is_empty(self, value):
-    return value.strip() == ""
-
-  def is_valid_string(self, value):
-    return isinstance(value, str)
-
-  def is_non_float_number(self, value):
-      return isinstance(value, int)
-
-  def validate_row(self, index, row, file_type):
-    if pd.isna(row["ID"]):
-      raise serializers.ValidationError({"error": f"ID value empty in {file_type} file for row in position {index + 1}"})
-    else:
-      id = row["ID"]
-
-    if pd.isna(row["Name"]):
-      raise serializers.ValidationError({"error": f"name value empty in {file_type} file for row with ID {row["ID"]}"})
-
-    if pd.isna(row["Date"]):
-      raise serializers.ValidationError({"error": f"date value empty in {file_type} file for row with ID {row["ID"]}"})
-    else:
-      source_date = str(row["Date"]).strip()
+        return parse_schema(json.loads(schema))
+      except json.JSONDecodeError:
+        raise serializers.ValidationError('Schema is not valid JSON')
+      except ValueError as exc:
+        raise serializers.ValidationError(str(exc))
 
-    if pd.isna(row["Amount"]):
-      raise serializers.ValidationError({"error": f"amount value empty in {file_type} file for row with ID {row["ID"]}"})
-    else:
-      source_amount = row["Amount"]
+    schemas = configured_schemas()
+    if schema not in schemas:
+      raise serializers.ValidationError(f'Unsupported schema. Allowed schemas are: {", ".join(schemas)}')
+    return schemas[schema]
 
-    if not self.is_valid_number(id):
-      raise serializers.ValidationError({"error": f"invalid ID type for row in position {index + 1} in {file_type} file"})
-
-    if not self.is_non_float_number(id):
-      raise serializers.ValidationError({"error": f"invalid ID type for row in position {index + 1} in {file_type} file"})
-
-    if not self.is_valid_string(source_date) or not self.is_valid_date(source_date):
-      raise serializers.ValidationError({"error": f"invalid date input in {file_type} file {source_date} from row with ID {row["ID"]}"})
-
-    if not self.is_valid_number(source_amount):
-      raise serializers.ValidationError({"error": f"invalid amount input in {file_type} file {source_amount} from row with ID {row["ID"]}"})
-
-    return {
-      "id": id,
-      "source_name": str(row["Name"]).strip().lower(),
-      "source_date": source_date,
-      "source_amount": source_amount,
-    }
-
-  def validate_matching_record(self, index, matching_record):
-    id = matching_record["ID"].iloc[0]
-
-    if pd.isna(matching_record["Name"].iloc[0]):
-      raise serializers.ValidationError({"error": f"name value empty in target file for row with ID {id}"})
-
-    if pd.isna(matching_record["Date"].iloc[0]):
-      raise serializers.ValidationError({"error": f"date value empty in target file for row with ID {id}"})
-    else:
-      source_date = str(matching_record["Date"].iloc[0]).strip()
-
-    if pd.isna(matching_record["Amount"].iloc[0]):
-      raise serializers.ValidationError({"error": f"amount value empty in target file for row with ID {id}"})
-    else:
-      source_amount = matching_record["Amount"].iloc[0]
-
-    if not self.is_valid_string(source_date) or not self.is_valid_date(source_date):
-      raise serializers.ValidationError({"error": f"invalid date input in target file {source_date} from row with ID {id}"})
-
-    if not self.is_valid_number(source_amount):
-      raise serializers.ValidationError({"error": f"invalid amount input in target file {source_amount} from row with ID {id}"})
-
-    return {
-      "id": id,
-      "source_name": str(matching_record["Name"].iloc[0]).strip().lower(),
-      "source_date": source_date,
-      "source_amount": source_amount,
-    }
+  def validate_columns(self, file, file_type):
+    return read_upload(file, file_type, self.active_schema)
+
+  def validate_fuzzy_matching(self, data):
+    if data.get('format') in COLUMNAR_FORMATS:
+      raise serializers.ValidationError({"error": f"Probable matches cannot be reported in the {data['format']} format"})
+    if not fuzzy_columns(data.get('schema', DEFAULT_SCHEMA))[0]:
+      raise serializers.ValidationError({"error": "Fuzzy matching needs a compared text column"})
+
+  def validate_reference_upload(self, data):
+    reference = data['reference']
+    if data.get('target') is not None:
+      raise serializers.ValidationError({"error": "Send either a target file or a reference, not both"})
+    if data.get('mode') == 'async':
+      raise serializers.ValidationError({"error": "Only synchronous uploads can use a reference"})
+    if data.get('feed'):
+      raise serializers.ValidationError({"error": "Feeds cannot be reconciled against a reference"})
+    if data.get('engine', 'memory') != 'memory':
+      raise serializers.ValidationError({"error": "References can only be reconciled with the memory engine"})
+
+    schema = Schema(**reference.description['schema'])
+    if data.get('schema', schema) != schema:
+      raise serializers.ValidationError({"error": f"The reference {reference.description['name']} was registered with another schema"})
+    data['schema'] = schema
 
   def validate(self, data):
+    if data.get('reference'):
+      self.validate_reference_upload(data)
+    elif data.get('target') is None:
+      raise serializers.ValidationError({"target": [self.fields['target'].error_messages['required']]})
+
+    if data.get('fuzzy'):
+      self.validate_fuzzy_matching(data)
+
+    # Asynchronous uploads are only checked here; a worker reconciles them
+    # later through this same serializer.
+    if data.get('mode') == 'async':
+      if data.get('persist'):
+        raise serializers.ValidationError({"error": "Only synchronous uploads can be persisted"})
+      return data
+
+    result = self.reconcile_upload(data)
+    if data.get('fuzzy'):
+      # A second pass over the unmatched records only, so it runs on cached
+      # and feed results alike.
+      with self.phase('fuzzy'):
+        self.probable_matches = probable_matches(result)
+    if data.get('persist'):
+      with self.phase('persist'):
+        self.run = save_run(result)
+    return result
+
+  def reconcile_upload(self, data):
     source = data.get('source')
     target = data.get('target')
-    source_df = self.validate_columns(source, 'source')
-    target_df = self.validate_columns(target, 'target')
-
-    return_data = {
-      "missing_in_source": [],
-      "missing_in_target": [],
-      "record_discrepancies": []
-    }
-
-    for index, row in source_df.iterrows():
-      validated_source_row = self.validate_row(index, row, 'source')
-      matching_record = target_df.loc[target_df["ID"] == validated_source_row["id"]]
-      if matching_record["ID"].empty:
-        missing_record = {
-          "record_id": row["ID"],
-          "data": {
-            "Name": row["Name"],
-            "Date": row["Date"],
-            "Amount": row["Amount"]
-          }
-        }
-        return_data["missing_in_target"].append(missing_record)
-      else:
-        validated_target_row = self.validate_matching_record(index, matching_record)
-
-        source_name = validated_source_row["source_name"]
-        source_date = validated_source_row["source_date"]
-        source_amount = validated_source_row["source_amount"]
-
-        t_name = matching_record["Name"].iloc[0]
-        target_name = validated_target_row["source_name"]
-        target_date = validated_target_row["source_date"]
-        target_amount = validated_target_row["source_amount"]
-
-        if source_name != target_name or source_date != target_date or source_amount != target_amount:
-          record_discrepancy = {
-            "record_id": row["ID"],
-            "source_data": {
-              "Name": row["Name"],
-              "Date": source_date,
-              "Amount": source_amount
-            },
-            "target_data": {
-              "Name": matching_record["Name"].iloc[0],
-              "Date": target_date,
-              "Amount": target_amount
-            },
-            "discrepancy": {}
-          }
-
-          if source_name != target_name:
-            record_discrepancy["discrepancy"]["Name"] = {
-              "source_value": row["Name"],
-              "target_name": t_name,
-            }
-
-          if source_date != target_date:
-            record_discrepancy["discrepancy"]["Date"] = {
-              "source_value": source_date,
-              "target_name": target_date,
-            }
-
-          if source_amount != target_amount:
-            record_discrepancy["discrepancy"]["Amount"] = {
-              "source_value": source_amount,
-              "target_name": target_amount,
-          }
-
-          return_data["record_discrepancies"].append(record_discrepancy)
-
-    for index, row in target_df.iterrows():
-      validated_source_row = self.validate_row(index, row, 'target')
-      matching_record = source_df.loc[source_df["ID"] == validated_source_row["id"]]
-      if matching_record["ID"].empty:
-        missing_record = {
-          "record_id": row["ID"],
-          "data": {
-            "Name": row["Name"],
-            "Date": row["Date"],
-            "Amount": row["Amount"]
-          }
-        }
-        return_data["missing_in_source"].append(missing_record)
-
-    return return_data
+    self.active_schema = data.get('schema', DEFAULT_SCHEMA)
+    if data.get('reference'):
+      # The target was parsed and indexed when the reference was registered.
+      # Nothing hashes it, so the result cache is bypassed.
+      self.target_reference = data['reference'].description
+      source_df, _ = self.load_frames(source)
+      with self.phase('match'):
+        return reconcile_reference(source_df, data['reference'])
+
+    if data.get('feed'):
+      # A feed is patched from its own previous state, so the result cache
+      # is bypassed and the files are always held in memory.
+      if data.get('engine') == 'external':
+        raise serializers.ValidationError({"error": "Feeds cannot be reconciled with the external engine"})
+      frames = self.load_frames(source, target)
+      with self.phase('match'):
+        result, self.feed_run = reconcile_feed(data['feed'], *frames, self.active_schema)
+      return result
+
+    if not cache_enabled():
+      return self.reconcile(source, target, data.get('engine'))
+
+    with self.phase('cache'):
+      key = cache_key(source, target, schema=self.active_schema)
+      cached = result_cache().get(key)
+    if cached is not None:
+      self.cache_status = 'hit'
+      return cached
+
+    self.cache_status = 'miss'
+    result = self.reconcile(source, target, data.get('engine'))
+    with self.phase('cache'):
+      result_cache().set(key, result)
+    return result
+
+  def reconcile(self, source, target, engine=None):
+    if engine == 'sorted':
+      try:
+        with self.phase('sorted'):
+          return reconcile_sorted(source, target, schema=self.active_schema)
+      except Unsorted as exc:
+        if not sorted_fallback():
+          raise serializers.ValidationError({"error": str(exc)})
+      engine = None
+
+    engine = engine or default_engine(source, target)
+
+    if engine == 'external':
+      # Reading, validation and matching interleave out of core.
+      with self.phase('external'):
+        return reconcile_external(source, target, schema=self.active_schema)
+
+    frames = self.load_frames(source, target)
+    with self.phase('match'):
+      if engine == 'parallel':
+        return reconcile_parallel(*frames, schema=self.active_schema)
+      return reconcile(*frames, self.active_schema)
+
+  def streamed_frame(self, file_type):
+    # Frames the upload handler already parsed and validated, for the
+    # default schema, while the request was received.
+    handler = self.context.get('upload_handler')
+    if handler is None or self.active_schema != DEFAULT_SCHEMA:
+      return None
+    return handler.frame(file_type)
+
+  def load_frames(self, source, target=None):
+    # Without a target, as for uploads against a reference, only the source
+    # is read and the target frame is None.
+    source_df = self.streamed_frame('source')
+    target_df = self.streamed_frame('target')
+    source_checked, target_checked = source_df is not None, target_df is not None or target is None
+    with self.phase('read'):
+      if not source_checked:
+        source_df = self.validate_columns(source, 'source')
+      if not target_checked:
+        target_df = self.validate_columns(target, 'target')
+
+    timings = self.context.get('timings')
+    if timings is not None:
+      timings.rows.update(source=len(source_df))
+      if target_df is not None:
+        timings.rows.update(target=len(target_df))
+
+    with self.phase('validate'):
+      limit = max_errors()
+      source_total, source_violations = (0, []) if source_checked else find_violations(source_df, 'source', source, limit, self.active_schema)
+      target_total, target_violations = (0, []) if target_checked else find_violations(target_df, 'target', target, limit - len(source_violations), self.active_schema)
+      if source_total or target_total:
+        raise serializers.ValidationError(violation_detail(source_violations + target_violations, source_total + target_total))
+
+      source_df = coerce_types(source_df, self.active_schema)
+      return source_df, None if target_df is None else coerce_types(target_df, self.active_schema)
 
   def create(self, validated_data):
       return validated_data
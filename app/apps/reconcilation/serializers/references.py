@@ -0,0 +1,36 @@
+from rest_framework import serializers
+import re
+from ..columnar import read_upload
+from ..references import register_reference
+from ..schemas import DEFAULT_SCHEMA
+from ..validation import coerce_types, find_violations, violation_detail
+from .reconcilation import FileSerializers
+
+class ReferenceSerializers(serializers.Serializer):
+  name = serializers.CharField(max_length=100)
+  target = serializers.FileField(allow_empty_file=False, required=True)
+  schema = serializers.CharField(required=False)
+
+  # A reference is read and checked as the target of an upload would be.
+  validate_file_extension = FileSerializers.validate_file_extension
+  validate_target = FileSerializers.validate_target
+  validate_schema = FileSerializers.validate_schema
+
+  def validate_name(self, name):
+    if not re.fullmatch(r'[A-Za-z0-9_-]+', name):
+      raise serializers.ValidationError('Unsupported reference name. Reference names may only contain letters, digits, "_" and "-"')
+    return name
+
+  def validate(self, data):
+    schema = data.get('schema', DEFAULT_SCHEMA)
+    if len(schema.keys) != 1:
+      raise serializers.ValidationError({"error": "References need a schema with a single key column"})
+
+    target_df = read_upload(data['target'], 'target', schema)
+    total, violations = find_violations(target_df, 'target', data['target'], schema=schema)
+    if total:
+      raise serializers.ValidationError(violation_detail(violations, total))
+    return register_reference(data['name'], coerce_types(target_df, schema), schema)
+
+  def create(self, validated_data):
+      return validated_data
@@ -0,0 +1,68 @@
+import numpy as np
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+from .results import DISCREPANCY, SECTIONS, field_bit
+
+def summary_top():
+  return getattr(settings, "RECONCILIATION_SUMMARY_TOP", 10)
+
+def largest(differences, count):
+  """
+  Positions of the `count` largest absolute differences, largest first and
+  in row order among equals. A partial selection finds them, so only those
+  few are ever sorted.
+  """
+  magnitudes = np.abs(differences)
+  if count < len(magnitudes):
+    chosen = np.argpartition(-magnitudes, count - 1)[:count]
+  else:
+    chosen = np.arange(len(magnitudes))
+  return chosen[np.lexsort((chosen, -magnitudes[chosen]))]
+
+def amount_summary(result, name, start, stop, top):
+  """Totals and largest differences of a number column over the discrepancies."""
+  rows = start + np.flatnonzero(result.fields[start:stop] & field_bit(result.schema.compare.index(name)))
+  source_values = result.source[name][rows]
+  target_values = result.target[name][rows]
+  differences = target_values - source_values
+  chosen = largest(differences, top) if top else np.array([], dtype=np.intp)
+  return {
+    "total_difference": np.abs(differences).sum().item(),
+    "net_difference": differences.sum().item(),
+    "largest_discrepancies": [
+      {"record_id": record_id, "source_value": source_value, "target_value": target_value, "difference": difference}
+      for record_id, source_value, target_value, difference in zip(
+        result.take(rows[chosen]).record_ids(0, len(chosen)),
+        source_values[chosen].tolist(),
+        target_values[chosen].tolist(),
+        differences[chosen].tolist(),
+      )
+    ],
+  }
+
+def summarize(result, matches=None, top=None):
+  """
+  Aggregates of a result computed on its columns, without building a
+  record per row: the records per section, the discrepancies per compared
+  column and, for each number column, the total and net difference
+  (target minus source) and the `top` largest differences.
+  """
+  top = summary_top() if top is None else top
+  start, stop = result.bounds(DISCREPANCY)
+  fields = result.fields[start:stop]
+  names = result.schema.compare
+  summary = {
+    "counts": {section: result.count(status) for status, section in enumerate(SECTIONS)},
+    "discrepancy_fields": {name: int(np.count_nonzero(fields & field_bit(index))) for index, name in enumerate(names)},
+    "amounts": {
+      name: amount_summary(result, name, start, stop, top)
+      for name in names if result.schema.types[name] in ("integer", "number")
+    },
+  }
+  if matches is not None:
+    summary["probable_matches"] = len(matches.source)
+  return summary
+
+def convert_to_summary(result, matches=None):
+  # Compact like the JSON report.
+  yield JSONEncoder(separators=(',', ':'), ensure_ascii=False, allow_nan=False).encode(summarize(result, matches)).encode('utf-8')
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import shutil
+import tempfile
+from django.urls import reverse
+from django.test import TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from .utils import (
+  response_with_discrepanies_and_missing_data_in_json_format,
+  response_with_discrepanies_and_missing_data_in_csv_format,
+)
+
+async def async_content(response):
+  return b"".join([chunk async for chunk in response.streaming_content])
+
+class TestAsyncUploads(TestCase):
+  def setUp(self):
+    self.upload_url = reverse('reconcilation:asgi-upload')
+    self.media_root = tempfile.mkdtemp()
+    self.settings_override = override_settings(RECONCILIATION_CACHE_DIR=None, MEDIA_ROOT=self.media_root)
+    self.settings_override.enable()
+
+  def tearDown(self):
+    self.settings_override.disable()
+    shutil.rmtree(self.media_root, ignore_errors=True)
+
+  def upload(self, format, **fields):
+    source_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n2,Jane Doe,2023-01-03,200.5"
+    target_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100\n3,David Doe,2023-02-03,300.5"
+
+    return self.async_client.post(self.upload_url, {
+        'source': SimpleUploadedFile("source.csv", source_file_data, content_type="text/csv"),
+        'target': SimpleUploadedFile("target.csv", target_file_data, content_type="text/csv"),
+        'format': format,
+        **fields,
+    })
+
+  async def test_streams_the_same_reports_as_the_sync_endpoint(self):
+    """
+    Should reconcile on the executor and stream the report of the sync endpoint
+    """
+    json_response, csv_response = await asyncio.gather(self.upload('json'), self.upload('csv'))
+
+    self.assertEqual(json_response.status_code, 200)
+    self.assertEqual(json.loads(await async_content(json_response)), response_with_discrepanies_and_missing_data_in_json_format())
+    self.assertEqual(await async_content(csv_response), response_with_discrepanies_and_missing_data_in_csv_format())
+    self.assertIn('match;dur=', json_response['Server-Timing'])
+
+  async def test_handles_concurrent_uploads(self):
+    """
+    Should serve many uploads at once with a small executor
+    """
+    with override_settings(RECONCILIATION_ASYNC_WORKERS=2):
+      responses = await asyncio.gather(*(self.upload('json') for _ in range(20)))
+      contents = [await async_content(response) for response in responses]
+
+    self.assertEqual({response.status_code for response in responses}, {200})
+    self.assertEqual(len(set(contents)), 1)
+
+  async def test_reports_validation_errors(self):
+    """
+    Should answer invalid uploads with the errors of the sync endpoint
+    """
+    response = await self.upload('xml')
+
+    self.assertEqual(response.status_code, 422)
+    self.assertEqual(response.json(), {
+      'format': ['Unsupported return file format. Allowed return file formats are: csv, html, json, ndjson, summary, arrow, parquet'],
+    })
+
+  async def test_rejects_uploads_past_the_pending_limit(self):
+    """
+    Should answer 503 once RECONCILIATION_ASYNC_MAX_PENDING uploads are in progress
+    """
+    with override_settings(RECONCILIATION_ASYNC_MAX_PENDING=0):
+      response = await self.upload('json')
+
+    self.assertEqual(response.status_code, 503)
+    self.assertEqual(response['Retry-After'], '1')
+
+  async def test_queues_background_jobs(self):
+    """
+    Should queue uploads sent with mode=async
+    """
+    response = await self.upload('json', mode='async')
+
+    self.assertEqual(response.status_code, 202)
+    self.assertEqual(response.json()['status'], 'queued')
@@ -0,0 +1,98 @@
+import io
+import json
+import zipfile
+from django.urls import reverse
+from django.test import override_settings
+from rest_framework.test import APITestCase, APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
+from .utils import (
+  streamed_content,
+  zipped,
+  response_with_discrepanies_and_missing_data_in_json_format,
+  response_with_discrepanies_and_missing_data_in_csv_format,
+)
+
+SOURCE = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n2,Jane Doe,2023-01-03,200.5"
+TARGET = b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100\n3,David Doe,2023-02-03,300.5"
+BROKEN = b"ID,Name\n1,John Doe"
+
+class TestBatches(APITestCase):
+  def setUp(self):
+    self.client = APIClient()
+    self.batch_url = reverse('reconcilation:batch')
+    self.settings_override = override_settings(RECONCILIATION_CACHE_DIR=None, RECONCILIATION_ASYNC_WORKERS=2)
+    self.settings_override.enable()
+
+  def tearDown(self):
+    self.settings_override.disable()
+
+  def post(self, files, **fields):
+    return self.client.post(self.batch_url, {
+        **{name: SimpleUploadedFile(name.split('.', 1)[0] + '.csv', content, content_type="text/csv") for name, content in files.items()},
+        **fields,
+    }, format='multipart')
+
+  def test_reconciles_every_pair_into_an_archive(self):
+    """
+    Should return each pair's report and a manifest in one zip archive
+    """
+    response = self.post({
+      'source.north': SOURCE, 'target.north': TARGET,
+      'source.south': SOURCE, 'target.south': TARGET,
+    }, format='csv')
+
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response['Content-Type'], 'application/zip')
+    archive = zipfile.ZipFile(io.BytesIO(streamed_content(response)))
+    self.assertEqual(archive.namelist(), ['north/reconciliation.csv', 'south/reconciliation.csv', 'manifest.json'])
+    self.assertEqual(archive.read('south/reconciliation.csv'), response_with_discrepanies_and_missing_data_in_csv_format())
+    self.assertEqual(json.loads(archive.read('manifest.json')), [
+      {'pair': 'north', 'status': 200, 'report': 'north/reconciliation.csv'},
+      {'pair': 'south', 'status': 200, 'report': 'south/reconciliation.csv'},
+    ])
+
+  def test_reports_bad_pairs_without_failing_the_batch(self):
+    """
+    Should stream one NDJSON line per pair, with errors for the pairs that fail
+    """
+    response = self.post({
+      'source.good': SOURCE, 'target.good': TARGET,
+      'source.broken': BROKEN, 'target.broken': TARGET,
+      'source.alone': SOURCE,
+    }, output='ndjson')
+
+    self.assertEqual(response.status_code, 200)
+    lines = [json.loads(line) for line in streamed_content(response).splitlines()]
+    self.assertEqual([(line['pair'], line['status']) for line in lines], [('good', 200), ('broken', 422), ('alone', 422)])
+    self.assertEqual(lines[0]['report'], response_with_discrepanies_and_missing_data_in_json_format())
+    self.assertEqual(lines[2]['errors'], {'target': ['The pair has no target file']})
+
+  def test_reads_pairs_from_a_zip_archive(self):
+    """
+    Should take each directory of an uploaded archive as a pair
+    """
+    archive = zipped({
+      'branches/0001/source.csv': SOURCE, 'branches/0001/target.csv': TARGET,
+      'branches/0002/source.csv': SOURCE, 'branches/0002/target.csv': BROKEN,
+      'README.txt': b'nightly files',
+    })
+    response = self.client.post(self.batch_url, {
+      'archive': SimpleUploadedFile('nightly.zip', archive, content_type='application/zip'),
+      'output': 'ndjson',
+    }, format='multipart')
+
+    lines = [json.loads(line) for line in streamed_content(response).splitlines()]
+    self.assertEqual([(line['pair'], line['status']) for line in lines], [('branches/0001', 200), ('branches/0002', 422)])
+
+  def test_rejects_invalid_batches(self):
+    """
+    Should refuse batches without pairs or with options no pair could use
+    """
+    self.assertEqual(self.post({}).status_code, 422)
+    response = self.post({'source.north': SOURCE, 'target.north': TARGET}, format='csv', output='ndjson')
+    self.assertEqual(response.status_code, 422)
+    self.assertEqual(response.json(), {'error': ['NDJSON batches hold json and summary reports only']})
+
+    with override_settings(RECONCILIATION_BATCH_MAX_PAIRS=1):
+      response = self.post({'source.a': SOURCE, 'target.a': TARGET, 'source.b': SOURCE, 'target.b': TARGET})
+    self.assertEqual(response.status_code, 422)
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+from django.urls import reverse
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase, APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
+from ..cache import ResultCache, cache_stats
+from .utils import response_with_discrepanies_and_missing_data_in_csv_format, streamed_content
+
+class TestCachedUploads(APITestCase):
+  def setUp(self):
+    self.client = APIClient()
+    self.upload_url = reverse('reconcilation:upload')
+    self.cache_dir = tempfile.mkdtemp()
+    self.settings_override = override_settings(RECONCILIATION_CACHE_DIR=self.cache_dir)
+    self.settings_override.enable()
+
+  def tearDown(self):
+    self.settings_override.disable()
+    shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+  def post(self, format):
+    source_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n2,Jane Doe,2023-01-03,200.5"
+    target_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100\n3,David Doe,2023-02-03,300.5"
+
+    return self.client.post(self.upload_url, {
+        'source': SimpleUploadedFile("source.csv", source_file_data, content_type="text/csv"),
+        'target': SimpleUploadedFile("target.csv", target_file_data, content_type="text/csv"),
+        'format': format,
+    }, format='multipart')
+
+  def test_serves_repeated_uploads_from_the_cache(self):
+    """
+    Should reuse the result of an identical upload and only render it again
+    """
+    first = self.post('json')
+    second = self.post('csv')
+
+    self.assertEqual(first['X-Reconciliation-Cache'], 'miss')
+    self.assertEqual(second['X-Reconciliation-Cache'], 'hit')
+    self.assertEqual(streamed_content(second), response_with_discrepanies_and_missing_data_in_csv_format())
+    self.assertEqual(cache_stats(), {"hot_hits": 1, "disk_hits": 0, "misses": 1})
+
+class TestResultCache(SimpleTestCase):
+  def setUp(self):
+    self.cache_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+  def test_falls_back_to_the_disk_tier(self):
+    """
+    Should find results written by another process on disk
+    """
+    ResultCache(self.cache_dir, 1024 * 1024, 1024 * 1024).set("key", {"missing_in_source": []})
+    cache = ResultCache(self.cache_dir, 1024 * 1024, 1024 * 1024)
+
+    self.assertEqual(cache.get("key"), {"missing_in_source": []})
+    self.assertEqual(cache.get("key"), {"missing_in_source": []})
+    self.assertIsNone(cache.get("other"))
+    self.assertEqual(cache.stats, {"hot_hits": 1, "disk_hits": 1, "misses": 1})
+
+  def test_evicts_least_recently_used_results(self):
+    """
+    Should drop the least recently used files once the disk tier is full
+    """
+    value = {"records": "x" * 400}
+    cache = ResultCache(self.cache_dir, 1000, 0)
+    cache.set("first", value)
+    cache.set("second", value)
+    os.utime(cache.path("first"), (1, 1))
+    os.utime(cache.path("second"), (2, 2))
+    cache.get("first")
+    cache.set("third", value)
+
+    self.assertTrue(os.path.exists(cache.path("first")))
+    self.assertFalse(os.path.exists(cache.path("second")))
+    self.assertTrue(os.path.exists(cache.path("third")))
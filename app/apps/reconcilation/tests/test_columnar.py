@@ -0,0 +1,154 @@
+import datetime
+import decimal
+import io
+from unittest import mock, skipUnless
+import pandas as pd
+from django.urls import reverse
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase, APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
+from ..columnar import arrow_available, read_csv_arrow, read_upload
+from .utils import response_with_discrepanies_and_missing_data_in_json_format, streamed_content, streamed_json
+
+if arrow_available():
+  import pyarrow as pa
+  from pyarrow import ipc
+  from pyarrow import parquet as pq
+
+SOURCE_CSV = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n2,Jane Doe,2023-01-03,200.5"
+TARGET_CSV = b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100\n3,David Doe,2023-02-03,300.5"
+
+def parquet_bytes(table):
+  sink = io.BytesIO()
+  pq.write_table(table, sink)
+  return sink.getvalue()
+
+def arrow_bytes(table):
+  sink = io.BytesIO()
+  with ipc.new_file(sink, table.schema) as writer:
+    writer.write_table(table)
+  return sink.getvalue()
+
+@skipUnless(arrow_available(), "pyarrow is not installed")
+class TestColumnarReader(SimpleTestCase):
+  def test_reads_csv_like_pandas(self):
+    """
+    Should read a CSV upload with pyarrow into the same frame pandas would
+    """
+    file_data = b"ID,Name,Date,Amount,Note\n 1,John Doe,2023-01-03,100.5,\n2,007,2023-01-03,NA,x"
+    expected = pd.read_csv(io.BytesIO(file_data), dtype={"Name": str, "Date": str})
+
+    pd.testing.assert_frame_equal(read_csv_arrow(SimpleUploadedFile("source.csv", file_data)), expected[["ID", "Name", "Date", "Amount"]])
+
+  def test_falls_back_to_pandas_for_ambiguous_csv(self):
+    """
+    Should leave files that pyarrow types differently from pandas to the pandas reader
+    """
+    file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,+100\n2,Jane Doe,2023-01-03,200"
+
+    self.assertIsNone(read_csv_arrow(SimpleUploadedFile("source.csv", file_data)))
+    self.assertEqual(read_upload(SimpleUploadedFile("source.csv", file_data), 'source')["Amount"].dtype, "int64")
+
+  def test_shapes_columnar_types_like_csv(self):
+    """
+    Should read dates, decimals and dictionary encoded names into the values a CSV upload gives
+    """
+    table = pa.table({
+      "ID": pa.array([1, 2], pa.int32()),
+      "Name": pa.array(["John Doe", "Jane Doe"]).dictionary_encode(),
+      "Date": pa.array([datetime.date(2023, 1, 3), datetime.date(2023, 1, 3)]),
+      "Amount": pa.array([decimal.Decimal("100.5"), decimal.Decimal("200.5")]),
+    })
+    file_df = read_upload(SimpleUploadedFile("source.parquet", parquet_bytes(table)), 'source')
+
+    pd.testing.assert_frame_equal(file_df, pd.read_csv(io.BytesIO(SOURCE_CSV), dtype={"Name": str, "Date": str}))
+
+@skipUnless(arrow_available(), "pyarrow is not installed")
+@override_settings(RECONCILIATION_CACHE_DIR=None)
+class TestColumnarUploads(APITestCase):
+  def setUp(self):
+    self.client = APIClient()
+    self.upload_url = reverse('reconcilation:upload')
+
+  def post(self, source, target, format='json', **fields):
+    return self.client.post(self.upload_url, {
+        'source': source,
+        'target': target,
+        'format': format,
+        **fields,
+    }, format='multipart')
+
+  def columnar_pair(self):
+    source_table = pa.Table.from_pandas(pd.read_csv(io.BytesIO(SOURCE_CSV)))
+    target_table = pa.Table.from_pandas(pd.read_csv(io.BytesIO(TARGET_CSV)))
+    return (
+      SimpleUploadedFile("source.parquet", parquet_bytes(source_table)),
+      SimpleUploadedFile("target.arrow", arrow_bytes(target_table)),
+    )
+
+  def test_reconciles_parquet_and_arrow_uploads(self):
+    """
+    Should reconcile Parquet and Arrow IPC uploads like their CSV equivalents, on any engine
+    """
+    for engine in ['memory', 'external']:
+      response = self.post(*self.columnar_pair(), engine=engine)
+
+      self.assertEqual(response.status_code, 200)
+      self.assertEqual(streamed_json(response), response_with_discrepanies_and_missing_data_in_json_format())
+
+  def test_rejects_columnar_uploads_missing_columns(self):
+    """
+    Should check the schema of a columnar upload for the required columns
+    """
+    table = pa.table({"ID": [1], "Name": ["John Doe"], "Amount": [100.5]})
+    response = self.post(SimpleUploadedFile("source.parquet", parquet_bytes(table)), self.columnar_pair()[1])
+
+    self.assertEqual(response.status_code, 422)
+    self.assertEqual(response.data['error'], ['Missing columns: Date, in source file'])
+
+  def test_returns_arrow_and_parquet_reports(self):
+    """
+    Should return the reconciliation as an Arrow stream or a Parquet file with one row per record
+    """
+    source = SimpleUploadedFile("source.csv", SOURCE_CSV, content_type="text/csv")
+    target = SimpleUploadedFile("target.csv", TARGET_CSV, content_type="text/csv")
+    arrow = self.post(source, target, format='arrow')
+    source.seek(0), target.seek(0)
+    parquet = self.post(source, target, format='parquet')
+
+    self.assertEqual(arrow['Content-Type'], 'application/vnd.apache.arrow.stream')
+    self.assertEqual(parquet['Content-Type'], 'application/vnd.apache.parquet')
+    arrow_table = ipc.open_stream(streamed_content(arrow)).read_all()
+    parquet_table = pq.read_table(io.BytesIO(streamed_content(parquet)))
+    self.assertTrue(arrow_table.equals(parquet_table))
+    self.assertEqual(arrow_table.to_pydict(), {
+      "record_id": [3, 2, 1],
+      "status": ["missing_in_source", "missing_in_target", "record_discrepancies"],
+      "discrepant_fields": [0, 0, 6],
+      "source_name": [None, "Jane Doe", "John Doe"],
+      "source_date": [None, "2023-01-03", "2023-01-03"],
+      "source_amount": [None, 200.5, 100.5],
+      "target_name": ["David Doe", None, "John Doe"],
+      "target_date": ["2023-02-03", None, "2023-01-01"],
+      "target_amount": [300.5, None, 100.0],
+    })
+
+class TestWithoutArrow(APITestCase):
+  def setUp(self):
+    self.client = APIClient()
+    self.upload_url = reverse('reconcilation:upload')
+
+  @mock.patch('app.apps.reconcilation.columnar.pa', None)
+  def test_requires_pyarrow_for_columnar_files(self):
+    """
+    Should explain that Parquet uploads and reports need pyarrow when it is not installed
+    """
+    response = self.client.post(self.upload_url, {
+        'source': SimpleUploadedFile("source.parquet", b"PAR1"),
+        'target': SimpleUploadedFile("target.csv", TARGET_CSV, content_type="text/csv"),
+        'format': 'parquet',
+    }, format='multipart')
+
+    self.assertEqual(response.status_code, 422)
+    self.assertEqual(response.json()["source"], ['Reading .parquet files requires the optional pyarrow package'])
+    self.assertEqual(response.json()["format"], ['The parquet format requires the optional pyarrow package'])
@@ -0,0 +1,82 @@
+import bz2
+import gzip
+import lzma
+from django.urls import reverse
+from django.test import override_settings
+from rest_framework.test import APITestCase, APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
+from .utils import response_with_discrepanies_and_missing_data_in_json_format, streamed_json, zipped
+
+SOURCE_CSV = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n2,Jane Doe,2023-01-03,200.5"
+TARGET_CSV = b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100\n3,David Doe,2023-02-03,300.5"
+
+COMPRESSORS = {
+  '.csv.gz': gzip.compress,
+  '.csv.bz2': bz2.compress,
+  '.csv.xz': lzma.compress,
+  '.zip': lambda data: zipped({'export.csv': data}),
+}
+
+@override_settings(RECONCILIATION_CACHE_DIR=None)
+class TestCompressedUploads(APITestCase):
+  def setUp(self):
+    self.client = APIClient()
+    self.upload_url = reverse('reconcilation:upload')
+
+  def post(self, source, target, **fields):
+    return self.client.post(self.upload_url, {
+        'source': source,
+        'target': target,
+        'format': 'json',
+        **fields,
+    }, format='multipart')
+
+  def test_reconciles_compressed_uploads(self):
+    """
+    Should reconcile gzip, bzip2, xz and zip uploads like the CSV files they hold, on any engine
+    """
+    for ext, compress in COMPRESSORS.items():
+      for engine in ['memory', 'external']:
+        response = self.post(
+          SimpleUploadedFile(f"source{ext}", compress(SOURCE_CSV)),
+          SimpleUploadedFile(f"target{ext}", compress(TARGET_CSV)),
+          engine=engine,
+        )
+
+        self.assertEqual(response.status_code, 200, (ext, engine))
+        self.assertEqual(streamed_json(response), response_with_discrepanies_and_missing_data_in_json_format())
+
+  @override_settings(RECONCILIATION_MAX_DECOMPRESSED_BYTES=64)
+  def test_rejects_uploads_too_large_once_decompressed(self):
+    """
+    Should stop decompressing an upload once it grows past the configured limit
+    """
+    gzipped = self.post(SimpleUploadedFile("source.csv.gz", gzip.compress(SOURCE_CSV)), SimpleUploadedFile("target.csv", TARGET_CSV))
+    zip_file = self.post(SimpleUploadedFile("source.zip", zipped({'export.csv': SOURCE_CSV})), SimpleUploadedFile("target.csv", TARGET_CSV))
+
+    self.assertEqual(gzipped.status_code, 422)
+    self.assertEqual(gzipped.data['error'], ['source.csv.gz holds more than 64 bytes once decompressed'])
+    self.assertEqual(zip_file.status_code, 422)
+    self.assertEqual(zip_file.data['source'], ['Zip upload holds more than 64 bytes once decompressed'])
+
+  def test_rejects_zip_uploads_without_a_single_csv(self):
+    """
+    Should only accept zip uploads that hold exactly one CSV file
+    """
+    response = self.post(
+      SimpleUploadedFile("source.zip", zipped({'a.csv': SOURCE_CSV, 'b.csv': SOURCE_CSV})),
+      SimpleUploadedFile("target.zip", zipped({'target.txt': TARGET_CSV})),
+    )
+
+    self.assertEqual(response.status_code, 422)
+    self.assertEqual(response.data['source'], ['Zip uploads must hold exactly one .csv file'])
+    self.assertEqual(response.data['target'], ['Zip uploads must hold exactly one .csv file'])
+
+  def test_rejects_corrupt_compressed_uploads(self):
+    """
+    Should report a compressed upload that cannot be decompressed
+    """
+    response = self.post(SimpleUploadedFile("source.csv.gz", gzip.compress(SOURCE_CSV)[:-12]), SimpleUploadedFile("target.csv", TARGET_CSV))
+
+    self.assertEqual(response.status_code, 422)
+    self.assertEqual(response.data['error'], ['Could not decompress source.csv.gz'])
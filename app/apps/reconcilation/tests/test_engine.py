@@ -0,0 +1,67 @@
+from django.test import SimpleTestCase
+from ..engine import reconcile
+from .utils import frame
+
+class TestEngine(SimpleTestCase):
+  def test_pairs_source_rows_with_first_matching_target_row(self):
+    """
+    Should compare each source row against the first target row sharing its ID
+    """
+    source_df = frame([[1, "John Doe", "2023-01-01", 100]])
+    target_df = frame([
+      [1, "John Doe", "2023-01-01", 100],
+      [1, "John Doe", "2023-01-02", 100],
+    ])
+
+    result = reconcile(source_df, target_df).to_dict()
+
+    self.assertEqual(result, {
+      "missing_in_source": [],
+      "missing_in_target": [],
+      "record_discrepancies": [],
+    })
+
+  def test_ignores_case_and_surrounding_whitespace_in_names(self):
+    """
+    Should treat names differing only in case or padding as equal
+    """
+    source_df = frame([[1, " john doe", "2023-01-01", 100]])
+    target_df = frame([[1, "John Doe ", "2023-01-01", 100.0]])
+
+    self.assertEqual(reconcile(source_df, target_df).to_dict()["record_discrepancies"], [])
+
+  def test_keeps_file_order_in_every_section(self):
+    """
+    Should list missing and discrepant records in the order of their file
+    """
+    source_df = frame([
+      [5, "A", "2023-01-01", 1],
+      [1, "B", "2023-01-01", 1],
+      [4, "C", "2023-01-01", 1],
+      [2, "D", "2023-01-01", 1],
+    ])
+    target_df = frame([
+      [9, "E", "2023-01-01", 1],
+      [2, "D", "2023-01-01", 2],
+      [4, "C", "2023-01-02", 1],
+      [7, "F", "2023-01-01", 1],
+    ])
+
+    result = reconcile(source_df, target_df).to_dict()
+
+    self.assertEqual([r["record_id"] for r in result["missing_in_target"]], [5, 1])
+    self.assertEqual([r["record_id"] for r in result["missing_in_source"]], [9, 7])
+    self.assertEqual([r["record_id"] for r in result["record_discrepancies"]], [4, 2])
+    self.assertEqual(list(result["record_discrepancies"][0]["discrepancy"]), ["Date"])
+    self.assertEqual(list(result["record_discrepancies"][1]["discrepancy"]), ["Amount"])
+
+  def test_reports_every_discrepant_field_of_wide_integer_columns(self):
+    """
+    Should find discrepancies in integer columns too wide to share a fingerprint word
+    """
+    source_df = frame([[1, "John Doe", "2023-01-01", -2**61], [2, "Jane Doe", "2023-01-01", 2**61], [3, "Jane Doe", "2023-01-01", 5]])
+    target_df = frame([[1, "John Doe", "2023-01-01", 2**61], [2, "Jane Doe", "2023-01-02", 2**61], [3, "jane doe", "2023-01-01", 5]])
+
+    discrepancies = reconcile(source_df, target_df).to_dict()["record_discrepancies"]
+
+    self.assertEqual([(record["record_id"], list(record["discrepancy"])) for record in discrepancies], [(1, ["Amount"]), (2, ["Date"])])
@@ -0,0 +1,75 @@
+from django.urls import reverse
+from django.test import override_settings
+from rest_framework.test import APITestCase, APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
+from .utils import ledger, response_with_discrepanies_and_missing_data_in_json_format, streamed_json
+
+@override_settings(RECONCILIATION_MEMORY_BUDGET=4096, RECONCILIATION_CACHE_DIR=None)
+class TestExternalEngine(APITestCase):
+  def setUp(self):
+    self.client = APIClient()
+    self.upload_url = reverse('reconcilation:upload')
+
+  def post(self, source_file_data, target_file_data, engine):
+    return self.client.post(self.upload_url, {
+        'source': SimpleUploadedFile("source.csv", source_file_data, content_type="text/csv"),
+        'target': SimpleUploadedFile("target.csv", target_file_data, content_type="text/csv"),
+        'format': 'json',
+        'engine': engine,
+    }, format='multipart')
+
+  def test_can_process_files_out_of_core(self):
+    """
+    Should return the same response as the in-memory engine
+    """
+    source_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n2,Jane Doe,2023-01-03,200.5"
+    target_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100\n3,David Doe,2023-02-03,300.5"
+
+    response = self.post(source_file_data, target_file_data, 'external')
+
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(streamed_json(response), response_with_discrepanies_and_missing_data_in_json_format())
+
+  def test_keeps_file_order_across_chunks_and_partitions(self):
+    """
+    Should list records in file order even when they span several spill partitions
+    """
+    source_rows = [(id, "John Doe", "2023-01-01", id) for id in range(1, 3001)]
+    target_rows = [(id, "John Doe", "2023-01-01", id + (id % 7 == 0)) for id in range(3000, 100, -1)]
+
+    memory = self.post(ledger(source_rows), ledger(target_rows), 'memory')
+    external = self.post(ledger(source_rows), ledger(target_rows), 'external')
+
+    self.assertEqual(external.status_code, 200)
+    self.assertNotIn('external;dur=', memory['Server-Timing'])
+    self.assertIn('external;dur=', external['Server-Timing'])
+    self.assertEqual(streamed_json(external), streamed_json(memory))
+
+  def test_reports_the_same_validation_errors_as_the_in_memory_engine(self):
+    """
+    Should reject invalid rows found in any chunk with the in-memory messages
+    """
+    source_rows = [(id, "John Doe", "2023-01-01", 10) for id in range(1, 2501)]
+    source_rows[1800] = ("", "John Doe", "2023-01-01", 10)
+    source_rows[2400] = (2401, "John Doe", "2023-13-01", 10)
+    target_rows = [(1, "John Doe", "2023-01-01", "Fig")]
+
+    memory = self.post(ledger(source_rows), ledger(target_rows), 'memory')
+    external = self.post(ledger(source_rows), ledger(target_rows), 'external')
+
+    self.assertEqual(external.status_code, 422)
+    self.assertEqual(external.json(), memory.json())
+    self.assertEqual(external.json()["error"], [
+      'ID value empty in source file for row in position 1801',
+      'invalid date input in source file 2023-13-01 from row with ID 2401',
+      'invalid amount input in target file Fig from row with ID 1',
+    ])
+
+  def test_cannot_upload_with_invalid_engine_input(self):
+    """
+    Should not be able to process with an unknown engine
+    """
+    response = self.post(b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100", b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100", 'gpu')
+
+    self.assertEqual(response.status_code, 422)
+    self.assertEqual(response.json()["engine"], ['Unsupported reconciliation engine. Allowed engines are: memory, parallel, external, sorted'])
@@ -0,0 +1,129 @@
+import shutil
+import tempfile
+from django.urls import reverse
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase, APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
+from ..engine import reconcile
+from ..feeds import reconcile_feed
+from .utils import frame, streamed_json
+
+class TestFeeds(SimpleTestCase):
+  def setUp(self):
+    self.feed_dir = tempfile.mkdtemp()
+    self.settings_override = override_settings(RECONCILIATION_FEED_DIR=self.feed_dir)
+    self.settings_override.enable()
+
+  def tearDown(self):
+    self.settings_override.disable()
+    shutil.rmtree(self.feed_dir, ignore_errors=True)
+
+  def test_recomputes_only_changed_ids(self):
+    """
+    Should patch the previous result with the IDs that changed since the last run
+    """
+    source_df = frame([
+      [1, "John Doe", "2023-01-01", 100],
+      [2, "Jane Doe", "2023-01-01", 200],
+      [3, "David Doe", "2023-01-01", 300],
+    ])
+    target_df = frame([
+      [1, "John Doe", "2023-01-01", 100],
+      [2, "Jane Doe", "2023-01-01", 250],
+      [4, "Mary Major", "2023-01-01", 400],
+    ])
+    result, run = reconcile_feed("daily", source_df, target_df)
+    self.assertEqual(run.mode, "full")
+    self.assertEqual(result.to_dict(), reconcile(source_df, target_df).to_dict())
+
+    # ID 1 now differs, ID 2 is unchanged but moved, ID 4 left and ID 5 arrived.
+    target_df = frame([
+      [5, "Richard Roe", "2023-01-01", 500],
+      [1, "John Doe", "2023-01-02", 100],
+      [2, "Jane Doe", "2023-01-01", 250],
+    ])
+    result, run = reconcile_feed("daily", source_df, target_df)
+
+    self.assertEqual(run.mode, "incremental")
+    self.assertEqual(run.changed_ids, 3)
+    self.assertEqual(result.to_dict(), reconcile(source_df, target_df).to_dict())
+    self.assertEqual([r["record_id"] for r in result.to_dict()["record_discrepancies"]], [1, 2])
+
+  def test_handles_duplicate_ids(self):
+    """
+    Should notice when one of several rows sharing an ID is added or removed
+    """
+    source_df = frame([[1, "John Doe", "2023-01-01", 100], [1, "John Doe", "2023-01-01", 100]])
+    target_df = frame([[2, "Jane Doe", "2023-01-01", 200]])
+    reconcile_feed("daily", source_df, target_df)
+
+    source_df = frame([[1, "John Doe", "2023-01-01", 100]])
+    result, run = reconcile_feed("daily", source_df, target_df)
+
+    self.assertEqual(run.changed_ids, 1)
+    self.assertEqual(result.to_dict(), reconcile(source_df, target_df).to_dict())
+
+  def test_keeps_feeds_apart(self):
+    """
+    Should keep a separate state for every feed name
+    """
+    source_df = frame([[1, "John Doe", "2023-01-01", 100]])
+    target_df = frame([[1, "John Doe", "2023-01-01", 100]])
+    reconcile_feed("first", source_df, target_df)
+
+    self.assertEqual(reconcile_feed("second", source_df, target_df)[1].mode, "full")
+    self.assertEqual(reconcile_feed("first", source_df, target_df)[1].mode, "incremental")
+
+class TestFeedUploads(APITestCase):
+  def setUp(self):
+    self.client = APIClient()
+    self.upload_url = reverse('reconcilation:upload')
+    self.feed_dir = tempfile.mkdtemp()
+    self.settings_override = override_settings(RECONCILIATION_FEED_DIR=self.feed_dir, RECONCILIATION_CACHE_DIR=None)
+    self.settings_override.enable()
+
+  def tearDown(self):
+    self.settings_override.disable()
+    shutil.rmtree(self.feed_dir, ignore_errors=True)
+
+  def post(self, target_file_data, **fields):
+    source_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n2,Jane Doe,2023-01-03,200.5"
+
+    return self.client.post(self.upload_url, {
+        'source': SimpleUploadedFile("source.csv", source_file_data, content_type="text/csv"),
+        'target': SimpleUploadedFile("target.csv", target_file_data, content_type="text/csv"),
+        'format': 'json',
+        **fields,
+    }, format='multipart')
+
+  def test_reports_incremental_feed_runs(self):
+    """
+    Should reconcile repeated uploads of a feed incrementally and say so in the headers
+    """
+    first = self.post(b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100\n3,David Doe,2023-02-03,300.5", feed='daily')
+    second = self.post(b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n3,David Doe,2023-02-03,300.5", feed='daily')
+    unnamed = self.post(b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n3,David Doe,2023-02-03,300.5")
+
+    self.assertEqual(first['X-Reconciliation-Feed'], 'full')
+    self.assertEqual(second['X-Reconciliation-Feed'], 'incremental')
+    self.assertEqual(second['X-Reconciliation-Feed-Changed-IDs'], '1')
+    self.assertEqual(streamed_json(second), streamed_json(unnamed))
+    self.assertNotIn('X-Reconciliation-Feed', unnamed)
+
+  def test_rejects_invalid_feed_names(self):
+    """
+    Should reject feed names that are not made of letters, digits, underscores and hyphens
+    """
+    response = self.post(b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100", feed='../daily')
+
+    self.assertEqual(response.status_code, 422)
+    self.assertIn('feed', response.data)
+
+  def test_rejects_feeds_on_the_external_engine(self):
+    """
+    Should refuse to reconcile a feed out of core
+    """
+    response = self.post(b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100", feed='daily', engine='external')
+
+    self.assertEqual(response.status_code, 422)
+    self.assertEqual(response.data['error'], ['Feeds cannot be reconciled with the external engine'])
@@ -0,0 +1,107 @@
+from django.urls import reverse
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase, APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
+from ..engine import reconcile
+from ..fuzzy import match_records, probable_matches
+from .utils import frame, streamed_content, streamed_json
+
+class TestProbableMatches(SimpleTestCase):
+  def test_pairs_similar_names_on_the_same_date(self):
+    """
+    Should suggest unmatched records with alike names and equal dates, best first
+    """
+    source_df = frame([
+      [1, "John Doe", "2023-01-01", 100],
+      [2, "Mary Major", "2023-01-01", 200],
+      [3, "Richard Roe", "2023-01-01", 300],
+    ])
+    target_df = frame([
+      [11, "Mary Majors", "2023-01-02", 200],
+      [12, "jon  DOE", "2023-01-01", 100],
+      [13, "John Doe", "2023-01-01", 100],
+      [14, "Jane Roe", "2023-01-01", 300],
+    ])
+    result = reconcile(source_df, target_df)
+
+    self.assertEqual(list(match_records(result, probable_matches(result))), [
+      {"source_record_id": 1, "target_record_id": 13, "score": 1.0},
+      {"source_record_id": 1, "target_record_id": 12, "score": 0.545},
+    ])
+
+  def test_caps_candidates_per_record(self):
+    """
+    Should keep at most the configured number of suggestions for each source record
+    """
+    source_df = frame([[1, "John Doe", "2023-01-01", 100]])
+    target_df = frame([[10 + i, "John Doe", "2023-01-01", 100] for i in range(5)])
+    result = reconcile(source_df, target_df)
+
+    with override_settings(RECONCILIATION_FUZZY_CANDIDATES=2):
+      matches = probable_matches(result)
+
+    self.assertEqual(result.ids[matches.target].tolist(), [10, 11])
+
+  def test_respects_the_minimum_score(self):
+    """
+    Should leave out pairs less similar than the threshold
+    """
+    source_df = frame([[1, "John Doe", "2023-01-01", 100]])
+    target_df = frame([[2, "Jane Doe", "2023-01-01", 100]])
+    result = reconcile(source_df, target_df)
+
+    self.assertEqual(len(probable_matches(result).source), 0)
+    self.assertEqual(len(probable_matches(result, threshold=0.2).source), 1)
+
+class TestFuzzyUploads(APITestCase):
+  def setUp(self):
+    self.client = APIClient()
+    self.upload_url = reverse('reconcilation:upload')
+    self.settings_override = override_settings(RECONCILIATION_CACHE_DIR=None)
+    self.settings_override.enable()
+
+  def tearDown(self):
+    self.settings_override.disable()
+
+  def post(self, format, **fields):
+    source_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n2,Jane Doe,2023-01-03,200.5"
+    target_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n7,Jane  Do,2023-01-03,200.5"
+
+    return self.client.post(self.upload_url, {
+        'source': SimpleUploadedFile("source.csv", source_file_data, content_type="text/csv"),
+        'target': SimpleUploadedFile("target.csv", target_file_data, content_type="text/csv"),
+        'format': format,
+        **fields,
+    }, format='multipart')
+
+  def test_reports_probable_matches(self):
+    """
+    Should add the probable matches to JSON, CSV and HTML reports
+    """
+    response = self.post('json', fuzzy='true')
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(streamed_json(response)['probable_matches'], [
+      {'source_record_id': 2, 'target_record_id': 7, 'score': 0.7},
+    ])
+    self.assertIn('fuzzy;dur=', response['Server-Timing'])
+
+    csv = streamed_content(self.post('csv', fuzzy='true'))
+    self.assertTrue(csv.endswith(b'2,Probable Match,Jane Doe,2023-01-03,200.5,Record ID,2,7\n'))
+
+    html = streamed_content(self.post('html', fuzzy='true'))
+    self.assertIn(b'<h3 id="probable_matches">Probable Matches</h3>', html)
+    self.assertIn(b'<tr><td>2</td><td>7</td><td>0.7</td></tr>', html)
+
+  def test_leaves_reports_unchanged_without_fuzzy(self):
+    """
+    Should only add probable matches when they are asked for
+    """
+    self.assertNotIn('probable_matches', streamed_json(self.post('json')))
+
+  def test_rejects_columnar_formats(self):
+    """
+    Should refuse fuzzy matching for reports without room for it
+    """
+    response = self.post('arrow', fuzzy='true')
+
+    self.assertEqual(response.status_code, 422)
@@ -0,0 +1,121 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from django.urls import reverse
+from django.test import override_settings
+from rest_framework.test import APITestCase, APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from ..jobs import claim_next_job, run_next_job
+from ..models import ReconciliationJob
+from .utils import (
+  response_with_discrepanies_and_missing_data_in_json_format,
+  response_with_discrepanies_and_missing_data_in_csv_format,
+  streamed_content,
+  streamed_json,
+)
+
+class TestJobs(APITestCase):
+  def setUp(self):
+    self.client = APIClient()
+    self.upload_url = reverse('reconcilation:upload')
+    self.media_root = tempfile.mkdtemp()
+    self.settings_override = override_settings(RECONCILIATION_CACHE_DIR=None, MEDIA_ROOT=self.media_root)
+    self.settings_override.enable()
+
+  def tearDown(self):
+    self.settings_override.disable()
+    shutil.rmtree(self.media_root, ignore_errors=True)
+
+  def enqueue(self, source_file_data, target_file_data):
+    return self.client.post(self.upload_url, {
+        'source': SimpleUploadedFile("source.csv", source_file_data, content_type="text/csv"),
+        'target': SimpleUploadedFile("target.csv", target_file_data, content_type="text/csv"),
+        'format': 'json',
+        'mode': 'async',
+    }, format='multipart')
+
+  def test_can_reconcile_files_in_a_background_job(self):
+    """
+    Should queue the upload, run it in a worker and serve the result in any format
+    """
+    source_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n2,Jane Doe,2023-01-03,200.5"
+    target_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100\n3,David Doe,2023-02-03,300.5"
+
+    response = self.enqueue(source_file_data, target_file_data)
+
+    self.assertEqual(response.status_code, 202)
+    self.assertEqual(response.json()["status"], "queued")
+    job_url = reverse('reconcilation:job', kwargs={'job_id': response.json()["id"]})
+    result_url = reverse('reconcilation:job-result', kwargs={'job_id': response.json()["id"]})
+    self.assertEqual(self.client.get(result_url).status_code, 409)
+
+    run_next_job()
+
+    self.assertEqual(self.client.get(job_url).json()["status"], "succeeded")
+    self.assertEqual(streamed_json(self.client.get(result_url)), response_with_discrepanies_and_missing_data_in_json_format())
+    csv_response = self.client.get(result_url, {'format': 'csv'})
+    self.assertEqual(csv_response.status_code, 200)
+    self.assertEqual(streamed_content(csv_response), response_with_discrepanies_and_missing_data_in_csv_format())
+    self.assertEqual(self.client.get(result_url, {'format': 'html'})['Content-Type'], 'text/html')
+
+  def test_records_validation_errors_on_the_job(self):
+    """
+    Should fail the job with the same errors a synchronous upload would return
+    """
+    source_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023,100.5"
+    target_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100"
+
+    response = self.enqueue(source_file_data, target_file_data)
+    run_next_job()
+
+    job = self.client.get(reverse('reconcilation:job', kwargs={'job_id': response.json()["id"]})).json()
+    self.assertEqual(job["status"], "failed")
+    self.assertEqual(job["errors"], {"error": ["invalid date input in source file 2023 from row with ID 1"]})
+
+  def test_rejects_invalid_uploads_before_queueing(self):
+    """
+    Should not queue a job for an upload with an unsupported extension
+    """
+    response = self.client.post(self.upload_url, {
+        'source': SimpleUploadedFile("source.html", b"ID", content_type="text/html"),
+        'target': SimpleUploadedFile("target.csv", b"ID", content_type="text/csv"),
+        'format': 'json',
+        'mode': 'async',
+    }, format='multipart')
+
+    self.assertEqual(response.status_code, 422)
+    self.assertIsNone(run_next_job())
+
+  def abandon(self, job):
+    # As if the worker that claimed the job died two hours ago.
+    ReconciliationJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=2))
+
+  def test_requeues_jobs_whose_worker_was_lost(self):
+    """
+    Should run a job again once it has been running for longer than the timeout
+    """
+    source_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n2,Jane Doe,2023-01-03,200.5"
+    target_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100\n3,David Doe,2023-02-03,300.5"
+    response = self.enqueue(source_file_data, target_file_data)
+    self.abandon(claim_next_job())
+
+    job = run_next_job()
+
+    self.assertEqual(str(job.pk), response.json()["id"])
+    self.assertEqual(job.status, "succeeded")
+    self.assertEqual(job.attempts, 2)
+
+  @override_settings(RECONCILIATION_JOB_MAX_ATTEMPTS=1)
+  def test_fails_jobs_that_keep_losing_their_worker(self):
+    """
+    Should fail a job that has been claimed as many times as allowed instead of running it again
+    """
+    response = self.enqueue(b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5", b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5")
+    self.abandon(claim_next_job())
+
+    self.assertIsNone(run_next_job())
+
+    job = self.client.get(reverse('reconcilation:job', kwargs={'job_id': response.json()["id"]})).json()
+    self.assertEqual(job["status"], "failed")
+    self.assertEqual(job["errors"], {"error": ["reconciliation did not finish within 3600 seconds"]})
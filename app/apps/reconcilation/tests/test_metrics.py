@@ -0,0 +1,63 @@
+import json
+from django.urls import reverse
+from django.test import override_settings
+from rest_framework.test import APITestCase, APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
+from .utils import streamed_content
+
+SOURCE_CSV = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n2,Jane Doe,2023-01-03,200.5"
+TARGET_CSV = b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100\n3,David Doe,2023-02-03,300.5"
+
+@override_settings(RECONCILIATION_CACHE_DIR=None)
+class TestMetrics(APITestCase):
+  def setUp(self):
+    self.client = APIClient()
+    self.upload_url = reverse('reconcilation:upload')
+    self.metrics_url = reverse('reconcilation:metrics')
+
+  def upload(self, format):
+    return self.client.post(self.upload_url, {
+        'source': SimpleUploadedFile("source.csv", SOURCE_CSV, content_type="text/csv"),
+        'target': SimpleUploadedFile("target.csv", TARGET_CSV, content_type="text/csv"),
+        'format': format,
+    }, format='multipart')
+
+  def test_server_timing_header(self):
+    """
+    Should report the upload, read, validate and match phases in a Server-Timing header
+    """
+    response = self.upload('csv')
+
+    phases = [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')]
+    self.assertEqual(phases, ['upload', 'read', 'validate', 'match'])
+
+  def test_logs_one_line_per_request(self):
+    """
+    Should log the phases, row counts and input sizes once the report is sent
+    """
+    with self.assertLogs('app.apps.reconcilation.metrics', 'INFO') as logs:
+      streamed_content(self.upload('json'))
+
+    line = json.loads(logs.records[0].getMessage())
+    self.assertEqual(line['format'], 'json')
+    self.assertEqual(line['status'], 200)
+    self.assertEqual(line['rows'], {'source': 2, 'target': 2})
+    self.assertEqual(line['bytes'], {'source': len(SOURCE_CSV), 'target': len(TARGET_CSV)})
+    self.assertIn('render', line['phases_ms'])
+
+  def test_metrics_endpoint(self):
+    """
+    Should expose request counts and latency histograms per format in the Prometheus text format
+    """
+    streamed_content(self.upload('html'))
+    self.upload('xml')
+
+    response = self.client.get(self.metrics_url)
+
+    self.assertEqual(response.status_code, 200)
+    self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+    body = response.content.decode()
+    self.assertIn('# TYPE reconciliation_request_duration_seconds histogram', body)
+    self.assertIn('reconciliation_request_duration_seconds_bucket{format="html",le="+Inf"}', body)
+    self.assertIn('reconciliation_requests_total{format="invalid",status="422"}', body)
+    self.assertIn('reconciliation_phase_seconds_count{phase="render"}', body)
@@ -0,0 +1,97 @@
+import numpy as np
+from django.urls import reverse
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase, APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
+from ..engine import normalize_text, reconcile
+from ..parallel import coded, default_engine, reconcile_parallel
+from .utils import frame, streamed_json
+
+class TestParallelEngine(SimpleTestCase):
+  def pair(self):
+    source_df = frame([
+      [5, "A", "2023-01-01", 1],
+      [1, " b", "2023-01-01", 1.5],
+      [4, "C", "2023-01-01", 1],
+      [2, "D", "2023-01-01", 1],
+      [2, "E", "2023-01-01", 1],
+      [8, "F", "2023-01-01", 1],
+    ])
+    target_df = frame([
+      [9, "E", "2023-01-01", 1],
+      [2, "d ", "2023-01-01", 2],
+      [1, "B", "2023-01-01", 1.5],
+      [4, "C", " 2023-01-02", 1],
+      [8, "G", "2023-01-01", 1],
+      [7, "F", "2023-01-01", 1],
+    ])
+    return source_df, target_df
+
+  def test_matches_the_in_memory_engine(self):
+    """
+    Should return the same result as the in-memory engine for any worker count
+    """
+    source_df, target_df = self.pair()
+    expected = reconcile(source_df, target_df).to_dict()
+
+    for workers in [1, 2, 3]:
+      with override_settings(RECONCILIATION_WORKERS=workers):
+        self.assertEqual(reconcile_parallel(source_df, target_df).to_dict(), expected)
+
+  def test_codes_values_by_their_normalized_form(self):
+    """
+    Should give names the same code exactly when they normalize to the same value
+    """
+    source_codes, target_codes = coded(np.array(["John", " john "], dtype=object), np.array(["JOHN", "Jane"], dtype=object), normalize_text)
+
+    self.assertEqual(len({*source_codes, target_codes[0]}), 1)
+    self.assertNotEqual(target_codes[1], target_codes[0])
+
+class TestEngineChoice(SimpleTestCase):
+  def upload(self, megabytes):
+    upload = SimpleUploadedFile("source.csv", b"")
+    upload.size = megabytes * 1024 * 1024
+    return upload
+
+  @override_settings(RECONCILIATION_WORKERS=2)
+  def test_picks_every_engine_with_the_default_sizes(self):
+    """
+    Should reconcile small uploads in memory, larger ones in parallel and those past the budget out of core
+    """
+    self.assertEqual(default_engine(self.upload(2), self.upload(2)), 'memory')
+    self.assertEqual(default_engine(self.upload(8), self.upload(8)), 'parallel')
+    self.assertEqual(default_engine(self.upload(17), self.upload(17)), 'external')
+
+  @override_settings(RECONCILIATION_WORKERS=1)
+  def test_keeps_uploads_in_memory_with_one_worker(self):
+    """
+    Should not pick the parallel engine without a second worker
+    """
+    self.assertEqual(default_engine(self.upload(8), self.upload(8)), 'memory')
+
+class TestParallelUploads(APITestCase):
+  def setUp(self):
+    self.client = APIClient()
+    self.upload_url = reverse('reconcilation:upload')
+
+  def post(self, engine):
+    source_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n2,Jane Doe,2023-01-03,200.5"
+    target_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100\n3,David Doe,2023-02-03,300.5"
+
+    return self.client.post(self.upload_url, {
+        'source': SimpleUploadedFile("source.csv", source_file_data, content_type="text/csv"),
+        'target': SimpleUploadedFile("target.csv", target_file_data, content_type="text/csv"),
+        'format': 'json',
+        'engine': engine,
+    }, format='multipart')
+
+  @override_settings(RECONCILIATION_WORKERS=2, RECONCILIATION_CACHE_DIR=None)
+  def test_can_reconcile_on_the_parallel_engine(self):
+    """
+    Should reconcile uploads across worker processes when asked for the parallel engine
+    """
+    parallel = self.post('parallel')
+    memory = self.post('memory')
+
+    self.assertEqual(parallel.status_code, 200)
+    self.assertEqual(streamed_json(parallel), streamed_json(memory))
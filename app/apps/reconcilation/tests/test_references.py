@@ -0,0 +1,83 @@
+import shutil
+import tempfile
+from django.urls import reverse
+from django.test import override_settings
+from rest_framework.test import APITestCase, APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
+from .utils import response_with_discrepanies_and_missing_data_in_json_format, streamed_json
+
+SOURCE = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n2,Jane Doe,2023-01-03,200.5"
+TARGET = b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100\n3,David Doe,2023-02-03,300.5"
+
+class TestReferences(APITestCase):
+  def setUp(self):
+    self.client = APIClient()
+    self.upload_url = reverse('reconcilation:upload')
+    self.references_url = reverse('reconcilation:references')
+    self.reference_dir = tempfile.mkdtemp()
+    self.settings_override = override_settings(RECONCILIATION_CACHE_DIR=None, RECONCILIATION_REFERENCE_DIR=self.reference_dir)
+    self.settings_override.enable()
+
+  def tearDown(self):
+    self.settings_override.disable()
+    shutil.rmtree(self.reference_dir, ignore_errors=True)
+
+  def register(self, target_file_data, name='master'):
+    return self.client.post(self.references_url, {
+        'name': name,
+        'target': SimpleUploadedFile("target.csv", target_file_data, content_type="text/csv"),
+    }, format='multipart')
+
+  def post(self, **fields):
+    return self.client.post(self.upload_url, {
+        'source': SimpleUploadedFile("source.csv", SOURCE, content_type="text/csv"),
+        'format': 'json',
+        **fields,
+    }, format='multipart')
+
+  def test_reconciles_against_a_registered_reference(self):
+    """
+    Should return the same response as an upload of the registered target
+    """
+    registered = self.register(TARGET)
+    self.assertEqual(registered.status_code, 201)
+    self.assertEqual((registered.data['name'], registered.data['version'], registered.data['rows']), ('master', 1, 2))
+
+    response = self.post(reference='master')
+
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response['X-Reconciliation-Reference-Version'], '1')
+    self.assertEqual(streamed_json(response), response_with_discrepanies_and_missing_data_in_json_format())
+
+  def test_replaces_references_with_new_versions(self):
+    """
+    Should reconcile against the latest version and keep only the one before it
+    """
+    self.register(b"ID,Name,Date,Amount\n5,John Doe,2023-01-01,100")
+    self.register(b"ID,Name,Date,Amount\n6,John Doe,2023-01-01,100")
+    self.assertEqual(self.register(TARGET).data['version'], 3)
+
+    response = self.post(reference='master')
+    self.assertEqual(response['X-Reconciliation-Reference-Version'], '3')
+    self.assertEqual(streamed_json(response), response_with_discrepanies_and_missing_data_in_json_format())
+    self.assertEqual(self.client.get(reverse('reconcilation:reference', kwargs={'name': 'master'})).data['version'], 3)
+
+    self.assertEqual(self.client.delete(reverse('reconcilation:reference', kwargs={'name': 'master'})).status_code, 204)
+    self.assertEqual(self.post(reference='master').json(), {'reference': ['No reference is registered as master']})
+
+  def test_rejects_invalid_references(self):
+    """
+    Should validate a reference as a target upload, and refuse uploads with both a target and a reference
+    """
+    response = self.register(b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,Fig")
+    self.assertEqual(response.status_code, 422)
+    self.assertEqual(response.json(), {'error': ['invalid amount input in target file Fig from row with ID 1']})
+
+    self.register(TARGET)
+    response = self.post(reference='master', target=SimpleUploadedFile("target.csv", TARGET, content_type="text/csv"))
+    self.assertEqual(response.status_code, 422)
+    self.assertEqual(response.json(), {'error': ['Send either a target file or a reference, not both']})
+
+    response = self.post()
+    self.assertEqual(response.status_code, 422)
+    self.assertEqual(response.json(), {'target': ['No file was submitted.']})
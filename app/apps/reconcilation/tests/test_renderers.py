@@ -0,0 +1,107 @@
+import json
+from django.test import SimpleTestCase
+from ..results import ReconciliationResult
+from ..utils import CHUNK_SIZE, convert_to_csv, convert_to_html, convert_to_json, convert_to_ndjson
+
+def report_data(rows):
+  return {
+    "missing_in_source": [
+      {"record_id": id, "data": {"Name": "John Doe", "Date": "2023-01-01", "Amount": 100}}
+      for id in range(rows)
+    ],
+    "missing_in_target": [],
+    "record_discrepancies": [
+      {
+        "record_id": id,
+        "source_data": {"Name": "John Doe", "Date": "2023-01-01", "Amount": 100.5},
+        "target_data": {"Name": "John Doe", "Date": "2023-01-01", "Amount": 100},
+        "discrepancy": {"Amount": {"source_value": 100.5, "target_name": 100}},
+      }
+      for id in range(rows)
+    ],
+  }
+
+def report(rows):
+  return ReconciliationResult.from_dict(report_data(rows))
+
+class TestRenderers(SimpleTestCase):
+  def test_streams_large_reports_in_bounded_chunks(self):
+    """
+    Should yield a large report piece by piece instead of as one blob
+    """
+    data = report(20_000)
+
+    for renderer in (convert_to_csv, convert_to_html, convert_to_json, convert_to_ndjson):
+      chunks = list(renderer(data))
+      self.assertGreater(len(chunks), 1)
+      self.assertLess(max(len(chunk) for chunk in chunks[:-1]), 2 * CHUNK_SIZE)
+
+  def test_writes_integer_amounts_as_floats_when_the_column_has_floats(self):
+    """
+    Should format a numeric column the way the previous pandas based renderer did
+    """
+    csv_content = b"".join(convert_to_csv(report(1))).decode()
+
+    self.assertEqual(csv_content.splitlines()[1:], [
+      "0,Missing in Source,John Doe,2023-01-01,100.0,,,",
+      "0,Discrepancy,John Doe,2023-01-01,100.5,Amount,100.5,100",
+    ])
+
+  def test_renders_json_with_the_same_shape(self):
+    """
+    Should stream JSON that parses back into the reconciliation data
+    """
+    data = report_data(3)
+
+    self.assertEqual(json.loads(b"".join(convert_to_json(ReconciliationResult.from_dict(data)))), data)
+
+  def test_renders_ndjson_as_one_line_per_record(self):
+    """
+    Should write each record of the JSON report on its own line, tagged with its section
+    """
+    data = report_data(3)
+
+    lines = b"".join(convert_to_ndjson(ReconciliationResult.from_dict(data))).decode().splitlines()
+
+    self.assertEqual([json.loads(line) for line in lines], [
+      {"status": section, **record} for section, records in data.items() for record in records
+    ])
+
+  def test_escapes_values_in_html_reports(self):
+    """
+    Should escape markup found in record values
+    """
+    data = report_data(1)
+    data["missing_in_source"][0]["data"]["Name"] = "<script>alert(1)</script>"
+
+    html_content = b"".join(convert_to_html(ReconciliationResult.from_dict(data))).decode()
+
+    self.assertIn("<td>&lt;script&gt;alert(1)&lt;/script&gt;</td>", html_content)
+    self.assertNotIn("<script>", html_content)
+
+  def test_drops_row_separators_found_in_html_values(self):
+    """
+    Should keep a record's values in its own cells when they hold the control characters rows are joined with
+    """
+    data = report_data(1)
+    data["missing_in_source"][0]["data"]["Name"] = "a\x01b\x02<td>c\x03"
+    data["record_discrepancies"][0]["source_data"]["Amount"] = "1\x00\x02"
+
+    html_content = b"".join(convert_to_html(ReconciliationResult.from_dict(data))).decode()
+
+    self.assertIn("<tr><td>0</td><td>ab&lt;td&gt;c</td><td>2023-01-01</td><td>100</td></tr>", html_content)
+    self.assertIn("<td>1</td><td>John Doe</td><td>2023-01-01</td><td>100</td><td class=\"discrepancy\">Amount: 1 vs 100</td></tr>", html_content)
+    self.assertEqual(html_content.count("<tr><td>"), 2)
+    self.assertFalse(set("\x00\x01\x02\x03") & set(html_content))
+
+  def test_splits_large_html_sections_into_pages(self):
+    """
+    Should page sections longer than the page size and link every page
+    """
+    html_content = b"".join(convert_to_html(report(5), page_size=2)).decode()
+
+    self.assertIn('<a href="#missing_in_source-page-3">3</a>', html_content)
+    self.assertIn('<div class="page" id="record_discrepancies-page-3">', html_content)
+    self.assertIn('<p>Page 3 of 3</p>', html_content)
+    self.assertEqual(html_content.count("<tr><td>4</td>"), 2)
+    self.assertNotIn('missing_in_target-page', html_content)
@@ -0,0 +1,48 @@
+import numpy as np
+from django.test import SimpleTestCase
+from ..results import DISCREPANCY, MISSING_IN_SOURCE, ReconciliationResult
+
+class TestReconciliationResult(SimpleTestCase):
+  def data(self):
+    return {
+      "missing_in_source": [
+        {"record_id": 3, "data": {"Name": "David Doe", "Date": "2023-02-03", "Amount": 300}},
+      ],
+      "missing_in_target": [],
+      "record_discrepancies": [
+        {
+          "record_id": 1,
+          "source_data": {"Name": "John Doe", "Date": "2023-01-03", "Amount": 100},
+          "target_data": {"Name": "John", "Date": "2023-01-01", "Amount": 100},
+          "discrepancy": {
+            "Name": {"source_value": "John Doe", "target_name": "John"},
+            "Date": {"source_value": "2023-01-03", "target_name": "2023-01-01"},
+          },
+        },
+      ],
+    }
+
+  def test_round_trips_the_json_shape(self):
+    """
+    Should store records as typed columns and give back the same JSON shape
+    """
+    result = ReconciliationResult.from_dict(self.data())
+
+    self.assertEqual(result.ids.dtype, np.int64)
+    self.assertEqual(result.source["Amount"].dtype, np.int64)
+    self.assertEqual(result.fields.tolist(), [0, 3])
+    self.assertEqual(result.count(MISSING_IN_SOURCE), 1)
+    self.assertEqual(result.to_dict(), self.data())
+
+  def test_concat_keeps_integer_amounts(self):
+    """
+    Should not widen integer amounts to floats when joined with an empty result
+    """
+    result = ReconciliationResult.from_dict(self.data())
+    empty = ReconciliationResult.from_dict({"missing_in_source": [], "missing_in_target": [], "record_discrepancies": []})
+    empty.target["Amount"] = empty.target["Amount"].astype(np.float64)
+
+    joined = ReconciliationResult.concat([empty, result])
+
+    self.assertEqual(joined.target["Amount"].dtype, np.int64)
+    self.assertEqual(joined.bounds(DISCREPANCY), (1, 2))
@@ -0,0 +1,119 @@
+import shutil
+import tempfile
+from urllib.parse import parse_qs, urlparse
+from django.urls import reverse
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase, APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
+from ..engine import reconcile
+from ..runs import decode_cursor, page_rows, read_records, save_run
+from .utils import frame, streamed_content, response_with_discrepanies_and_missing_data_in_json_format
+
+class TestRunStore(SimpleTestCase):
+  def setUp(self):
+    self.run_dir = tempfile.mkdtemp()
+    self.settings_override = override_settings(RECONCILIATION_RUN_DIR=self.run_dir)
+    self.settings_override.enable()
+    source_df = frame([[index, "John Doe", "2023-01-01", 100] for index in range(20)])
+    target_df = source_df.copy()
+    target_df.loc[target_df.ID % 3 == 0, "Amount"] = 101
+    target_df.loc[target_df.ID % 4 == 0, "Name"] = "Jane Doe"
+    self.run = save_run(reconcile(source_df.iloc[:18], target_df.iloc[2:]))
+
+  def tearDown(self):
+    self.settings_override.disable()
+    shutil.rmtree(self.run_dir, ignore_errors=True)
+
+  def ids(self, rows):
+    return [int(record.split(b'"record_id":')[1].split(b',')[0]) for record in read_records(self.run, rows)]
+
+  def test_pages_through_every_record(self):
+    """
+    Should list every record once, page after page, in section order
+    """
+    ids, after = [], -1
+    while True:
+      rows = page_rows(self.run, after=after, limit=4)
+      ids += self.ids(rows[:4])
+      if len(rows) <= 4:
+        break
+      after = int(rows[3])
+
+    self.assertEqual(self.run["counts"], {"missing_in_source": 2, "missing_in_target": 2, "record_discrepancies": 8})
+    self.assertEqual(ids, [18, 19, 0, 1, 3, 4, 6, 8, 9, 12, 15, 16])
+
+  def test_filters_by_status_and_field(self):
+    """
+    Should page through one section, or the discrepancies in one field
+    """
+    self.assertEqual(self.ids(page_rows(self.run, status=1)), [0, 1])
+    self.assertEqual(self.ids(page_rows(self.run, field=0)), [4, 8, 12, 16])
+    self.assertEqual(self.ids(page_rows(self.run, field=2, after=8, limit=1)), [12, 15])
+    self.assertEqual(len(page_rows(self.run, status=0, field=2)), 0)
+
+class TestRunEndpoints(APITestCase):
+  def setUp(self):
+    self.client = APIClient()
+    self.upload_url = reverse('reconcilation:upload')
+    self.run_dir = tempfile.mkdtemp()
+    self.settings_override = override_settings(RECONCILIATION_CACHE_DIR=None, RECONCILIATION_RUN_DIR=self.run_dir)
+    self.settings_override.enable()
+
+  def tearDown(self):
+    self.settings_override.disable()
+    shutil.rmtree(self.run_dir, ignore_errors=True)
+
+  def post(self, **fields):
+    source_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n2,Jane Doe,2023-01-03,200.5"
+    target_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100\n3,David Doe,2023-02-03,300.5"
+
+    return self.client.post(self.upload_url, {
+        'source': SimpleUploadedFile("source.csv", source_file_data, content_type="text/csv"),
+        'target': SimpleUploadedFile("target.csv", target_file_data, content_type="text/csv"),
+        **fields,
+    }, format='multipart')
+
+  def test_persists_uploads(self):
+    """
+    Should store the result of a persisted upload and page through its records
+    """
+    response = self.post(format='summary', persist='true')
+    self.assertEqual(response.status_code, 200)
+    streamed_content(response)
+    run_id = response['X-Reconciliation-Run']
+
+    run = self.client.get(reverse('reconcilation:run', kwargs={'run_id': run_id})).json()
+    self.assertEqual(run['counts'], {'missing_in_source': 1, 'missing_in_target': 1, 'record_discrepancies': 1})
+
+    page = self.client.get(run['records_url'], {'limit': 2}).json()
+    expected = response_with_discrepanies_and_missing_data_in_json_format()
+    self.assertEqual(page['results'], [
+      {'status': 'missing_in_source', **expected['missing_in_source'][0]},
+      {'status': 'missing_in_target', **expected['missing_in_target'][0]},
+    ])
+    last = self.client.get(page['next']).json()
+    self.assertEqual(last, {'next': None, 'results': [{'status': 'record_discrepancies', **expected['record_discrepancies'][0]}]})
+    self.assertEqual(decode_cursor(parse_qs(urlparse(page['next']).query)['cursor'][0]), 1)
+
+    self.assertEqual(self.client.delete(reverse('reconcilation:run', kwargs={'run_id': run_id})).status_code, 204)
+    self.assertEqual(self.client.get(run['records_url']).status_code, 404)
+
+  def test_rejects_invalid_pages(self):
+    """
+    Should refuse unknown statuses, fields, cursors and limits
+    """
+    response = self.post(format='summary', persist='true')
+    records_url = reverse('reconcilation:run-records', kwargs={'run_id': response['X-Reconciliation-Run']})
+
+    response = self.client.get(records_url, {'status': 'matched', 'field': 'Total', 'cursor': '!', 'limit': '5000'})
+    self.assertEqual(response.status_code, 422)
+    self.assertEqual(set(response.json()), {'status', 'field', 'cursor', 'limit'})
+
+  def test_persists_synchronous_uploads_only(self):
+    """
+    Should refuse to persist queued uploads
+    """
+    response = self.post(format='json', persist='true', mode='async')
+
+    self.assertEqual(response.status_code, 422)
+    self.assertEqual(response.json(), {'error': ['Only synchronous uploads can be persisted']})
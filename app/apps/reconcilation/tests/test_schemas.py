@@ -0,0 +1,170 @@
+import io
+import json
+import pandas as pd
+from django.urls import reverse
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase, APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
+from ..engine import reconcile
+from ..external import reconcile_external
+from ..schemas import parse_schema
+from .utils import streamed_content, streamed_json
+
+REGIONS = {
+  "keys": ["Region", "ID"],
+  "compare": ["Amount", "Status"],
+  "types": {"ID": "integer", "Amount": "number"},
+}
+
+SOURCE = b"Region,ID,Amount,Status,Notes\nEU,1,100,open,a\nUS,1,200,closed,b\nEU,2,50.5,open,c\n"
+TARGET = b"Notes,ID,Region,Status,Amount\nx,1,EU,open,100\ny,1,US,Open,250\nz,3,US,open,75\n"
+
+class TestParseSchema(SimpleTestCase):
+  def test_defaults_untyped_columns_to_text(self):
+    """
+    Should type the columns a schema does not type as text
+    """
+    schema = parse_schema({"keys": "Code", "compare": ["Label"]})
+
+    self.assertEqual(schema.keys, ["Code"])
+    self.assertEqual(schema.types, {"Code": "text", "Label": "text"})
+
+  def test_rejects_invalid_schemas(self):
+    """
+    Should name the problem of an invalid schema
+    """
+    cases = [
+      ({"compare": ["Name"]}, "Schema keys must be a column name or a list of column names"),
+      ({"keys": ["ID"], "types": {"ID": "uuid"}}, "Unsupported column type uuid. Allowed column types are: integer, number, text, date"),
+      ({"keys": ["Amount"], "types": {"Amount": "number"}}, "Unsupported key type number. Allowed key types are: integer, text, date"),
+      ({"keys": ["ID"], "compare": ["ID"]}, "Schema columns may only appear once across keys and compare"),
+      ({"keys": ["ID"], "compare": ["Amount", "amount"]}, "Schema column names must differ by more than case"),
+      ({"keys": ["ID"], "types": {"Name": "text"}}, "Schema types name Name, which is not a key or compared column"),
+      ({"keys": ["ID"], "order": "asc"}, "Unsupported schema fields: order. Allowed fields are: keys, compare, types"),
+    ]
+    for definition, message in cases:
+      with self.subTest(definition=definition):
+        with self.assertRaisesMessage(ValueError, message):
+          parse_schema(definition)
+
+class TestCompositeKeys(SimpleTestCase):
+  def frames(self):
+    schema = parse_schema(REGIONS)
+    read = lambda data: pd.read_csv(io.BytesIO(data), usecols=schema.wanted, dtype=schema.dtypes())
+    return schema, read(SOURCE), read(TARGET)
+
+  def test_matches_on_every_key_column(self):
+    """
+    Should only match rows whose key columns are all equal
+    """
+    schema, source_df, target_df = self.frames()
+    result = reconcile(source_df, target_df, schema).to_dict()
+
+    self.assertEqual(result["missing_in_source"], [
+      {"record_id": {"Region": "US", "ID": 3}, "data": {"Amount": 75, "Status": "open"}},
+    ])
+    self.assertEqual(result["missing_in_target"], [
+      {"record_id": {"Region": "EU", "ID": 2}, "data": {"Amount": 50.5, "Status": "open"}},
+    ])
+    self.assertEqual(result["record_discrepancies"], [{
+      "record_id": {"Region": "US", "ID": 1},
+      "source_data": {"Amount": 200.0, "Status": "closed"},
+      "target_data": {"Amount": 250, "Status": "Open"},
+      "discrepancy": {
+        "Amount": {"source_value": 200.0, "target_name": 250},
+        "Status": {"source_value": "closed", "target_name": "Open"},
+      },
+    }])
+
+  def test_external_engine_agrees(self):
+    """
+    Should give the same result out of core as in memory
+    """
+    schema, source_df, target_df = self.frames()
+    external = reconcile_external(
+      SimpleUploadedFile("source.csv", SOURCE), SimpleUploadedFile("target.csv", TARGET), budget=64, schema=schema,
+    )
+
+    self.assertEqual(external.to_dict(), reconcile(source_df, target_df, schema).to_dict())
+
+class TestSchemaUploads(APITestCase):
+  def setUp(self):
+    self.client = APIClient()
+    self.upload_url = reverse('reconcilation:upload')
+    self.settings_override = override_settings(RECONCILIATION_CACHE_DIR=None)
+    self.settings_override.enable()
+
+  def tearDown(self):
+    self.settings_override.disable()
+
+  def post(self, source=SOURCE, target=TARGET, **fields):
+    return self.client.post(self.upload_url, {
+        'source': SimpleUploadedFile("source.csv", source, content_type="text/csv"),
+        'target': SimpleUploadedFile("target.csv", target, content_type="text/csv"),
+        **fields,
+    }, format='multipart')
+
+  def test_reconciles_with_a_schema_sent_as_json(self):
+    """
+    Should reconcile the columns of a schema sent with the upload and ignore the others
+    """
+    response = self.post(format='csv', schema=json.dumps(REGIONS))
+
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(streamed_content(response), (
+      b'Region,ID,Status,Amount,Status,Discrepancy Field,Source Value,Target Value\n'
+      b'US,3,Missing in Source,75.0,open,,,\n'
+      b'EU,2,Missing in Target,50.5,open,,,\n'
+      b'US,1,Discrepancy,200.0,closed,Amount,200.0,250\n'
+      b'US,1,Discrepancy,200.0,closed,Status,closed,Open\n'
+    ))
+
+  def test_escapes_schema_column_names_in_html_reports(self):
+    """
+    Should escape markup found in the column names of a schema sent with the upload
+    """
+    column = "<img src=x onerror=alert(1)> & co"
+    schema = {"keys": ["ID"], "compare": [column]}
+    source = f'ID,"{column}"\n1,a\n2,b\n'.encode()
+    target = f'ID,"{column}"\n1,c\n3,d\n'.encode()
+
+    response = self.post(source, target, format='html', schema=json.dumps(schema))
+
+    html_content = streamed_content(response).decode()
+    self.assertEqual(response.status_code, 200)
+    self.assertIn("<th>&lt;img src=x onerror=alert(1)&gt; &amp; co</th>", html_content)
+    self.assertIn("<th>Source &lt;img src=x onerror=alert(1)&gt; &amp; co</th>", html_content)
+    self.assertNotIn("<img", html_content)
+
+  @override_settings(RECONCILIATION_SCHEMAS={"regions": REGIONS})
+  def test_reconciles_with_a_configured_schema(self):
+    """
+    Should reconcile with a schema named in RECONCILIATION_SCHEMAS
+    """
+    by_name = self.post(format='json', schema='regions')
+    inline = self.post(format='json', schema=json.dumps(REGIONS))
+
+    self.assertEqual(by_name.status_code, 200)
+    self.assertEqual(streamed_json(by_name), streamed_json(inline))
+
+  def test_reports_missing_schema_columns(self):
+    """
+    Should report the schema columns a file lacks
+    """
+    response = self.post(target=b"ID,Region,Amount\n1,EU,100\n", format='json', schema=json.dumps(REGIONS))
+
+    self.assertEqual(response.status_code, 422)
+    self.assertEqual(response.data['error'], ['Missing columns: Status, in target file'])
+
+  def test_rejects_unknown_and_invalid_schemas(self):
+    """
+    Should reject schema names that are not configured and schemas that do not parse
+    """
+    unknown = self.post(format='json', schema='regions')
+    invalid = self.post(format='json', schema='{"keys": ')
+
+    self.assertEqual(unknown.status_code, 422)
+    self.assertEqual(unknown.data['schema'], ['Unsupported schema. Allowed schemas are: '])
+    self.assertEqual(invalid.status_code, 422)
+    self.assertEqual(invalid.data['schema'], ['Schema is not valid JSON'])
+
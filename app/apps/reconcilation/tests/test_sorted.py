@@ -0,0 +1,71 @@
+from django.urls import reverse
+from django.test import override_settings
+from rest_framework.test import APITestCase, APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
+from .utils import ledger, response_with_discrepanies_and_missing_data_in_json_format, streamed_json
+
+@override_settings(RECONCILIATION_MEMORY_BUDGET=4096, RECONCILIATION_CACHE_DIR=None)
+class TestSortedEngine(APITestCase):
+  def setUp(self):
+    self.client = APIClient()
+    self.upload_url = reverse('reconcilation:upload')
+
+  def post(self, source_file_data, target_file_data, engine):
+    return self.client.post(self.upload_url, {
+        'source': SimpleUploadedFile("source.csv", source_file_data, content_type="text/csv"),
+        'target': SimpleUploadedFile("target.csv", target_file_data, content_type="text/csv"),
+        'format': 'json',
+        'engine': engine,
+    }, format='multipart')
+
+  def test_can_process_sorted_files(self):
+    """
+    Should return the same response as the in-memory engine
+    """
+    source_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n2,Jane Doe,2023-01-03,200.5"
+    target_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100\n3,David Doe,2023-02-03,300.5"
+
+    response = self.post(source_file_data, target_file_data, 'sorted')
+
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(streamed_json(response), response_with_discrepanies_and_missing_data_in_json_format())
+
+  def test_merges_files_across_chunks(self):
+    """
+    Should match duplicate and missing keys read in different chunks as the in-memory engine does
+    """
+    source_rows = [(id // 2, "John Doe", "2023-01-01", id) for id in range(2, 6000) if id % 11]
+    target_rows = [(id // 3, "John Doe", "2023-01-01", id + (id % 7 == 0)) for id in range(900, 12000) if id % 13]
+
+    memory = self.post(ledger(source_rows), ledger(target_rows), 'memory')
+    merged = self.post(ledger(source_rows), ledger(target_rows), 'sorted')
+
+    self.assertEqual(merged.status_code, 200)
+    self.assertEqual(streamed_json(merged), streamed_json(memory))
+
+  def test_rejects_unsorted_files(self):
+    """
+    Should name the first row whose key comes before the one above it
+    """
+    source_rows = [(id, "John Doe", "2023-01-01", 10) for id in range(1, 2001)]
+    target_rows = [(id, "John Doe", "2023-01-01", 10) for id in range(1, 2001)]
+    target_rows[1500] = (7, "John Doe", "2023-01-01", 10)
+
+    response = self.post(ledger(source_rows), ledger(target_rows), 'sorted')
+
+    self.assertEqual(response.status_code, 422)
+    self.assertEqual(response.json(), {'error': ['The target file is not sorted by ID: the row in position 1501 has ID 7 after ID 1500']})
+
+  def test_can_fall_back_for_unsorted_files(self):
+    """
+    Should reconcile unsorted files with the general engine when the fallback is on
+    """
+    source_rows = [(id, "John Doe", "2023-01-01", 10) for id in range(2000, 0, -1)]
+    target_rows = [(id, "Jane Doe", "2023-01-01", 10) for id in range(1, 1500)]
+
+    memory = self.post(ledger(source_rows), ledger(target_rows), 'memory')
+    with override_settings(RECONCILIATION_SORTED_FALLBACK=True):
+      merged = self.post(ledger(source_rows), ledger(target_rows), 'sorted')
+
+    self.assertEqual(merged.status_code, 200)
+    self.assertEqual(streamed_json(merged), streamed_json(memory))
@@ -0,0 +1,58 @@
+import io
+from unittest import mock
+import pandas as pd
+from django.urls import reverse
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase, APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
+from ..serializers.reconcilation import FileSerializers
+from ..uploads import StreamedCSV
+from .utils import response_with_discrepanies_and_missing_data_in_json_format, streamed_json
+
+SOURCE_CSV = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n2,Jane Doe,2023-01-03,200.5"
+TARGET_CSV = b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100\n3,David Doe,2023-02-03,300.5"
+
+class TestStreamedCSV(SimpleTestCase):
+  def streamed(self, data, size):
+    streamed = StreamedCSV('source')
+    for start in range(0, len(data), size):
+      streamed.feed(data[start:start + size])
+    streamed.close()
+    return streamed.frame
+
+  @mock.patch('app.apps.reconcilation.uploads.STREAM_CHUNK_ROWS', 2)
+  def test_parses_chunks_as_they_arrive(self):
+    """
+    Should parse an upload fed in arbitrary pieces into the frame the whole file gives
+    """
+    file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100\n2,Jane Doe,2023-01-03,200\n3,David Doe,2023-01-03,300.5"
+
+    pd.testing.assert_frame_equal(self.streamed(file_data, 7), pd.read_csv(io.BytesIO(file_data), dtype={"Name": str, "Date": str}))
+
+  def test_leaves_invalid_uploads_to_the_file(self):
+    """
+    Should not hand out a frame for uploads with violations or missing columns
+    """
+    self.assertIsNone(self.streamed(b"ID,Name,Date,Amount\n1,John Doe,2023,100", 5))
+    self.assertIsNone(self.streamed(b"ID,Name,Amount\n1,John Doe,100", 5))
+
+@override_settings(RECONCILIATION_CACHE_DIR=None)
+class TestStreamingUploads(APITestCase):
+  def setUp(self):
+    self.client = APIClient()
+    self.upload_url = reverse('reconcilation:upload')
+
+  @mock.patch.object(FileSerializers, 'validate_columns', side_effect=AssertionError("upload read again"))
+  def test_reconciles_uploads_parsed_while_received(self, validate_columns):
+    """
+    Should reconcile the frames parsed during the upload without reading the files again
+    """
+    response = self.client.post(self.upload_url, {
+        'source': SimpleUploadedFile("source.csv", SOURCE_CSV, content_type="text/csv"),
+        'target': SimpleUploadedFile("target.csv", TARGET_CSV, content_type="text/csv"),
+        'format': 'json',
+    }, format='multipart')
+
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(streamed_json(response), response_with_discrepanies_and_missing_data_in_json_format())
+    validate_columns.assert_not_called()
@@ -0,0 +1,106 @@
+import pandas as pd
+from django.urls import reverse
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase, APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
+from ..engine import reconcile
+from ..schemas import parse_schema
+from ..summary import summarize
+from .utils import frame, streamed_json
+
+class TestSummarize(SimpleTestCase):
+  def test_aggregates_every_section(self):
+    """
+    Should count records per section and per discrepant field, and total the amount differences
+    """
+    source_df = frame([
+      [1, "John Doe", "2023-01-01", 100],
+      [2, "Jane Doe", "2023-01-01", 200],
+      [3, "Richard Roe", "2023-01-01", 300],
+      [4, "Mary Major", "2023-01-01", 400],
+    ])
+    target_df = frame([
+      [1, "John Doe", "2023-01-01", 150],
+      [2, "Jane Roe", "2023-01-02", 200],
+      [3, "Richard Roe", "2023-01-01", 290],
+      [5, "David Doe", "2023-01-01", 500],
+    ])
+
+    self.assertEqual(summarize(reconcile(source_df, target_df), top=1), {
+      "counts": {"missing_in_source": 1, "missing_in_target": 1, "record_discrepancies": 3},
+      "discrepancy_fields": {"Name": 1, "Date": 1, "Amount": 2},
+      "amounts": {
+        "Amount": {
+          "total_difference": 60,
+          "net_difference": 40,
+          "largest_discrepancies": [
+            {"record_id": 1, "source_value": 100, "target_value": 150, "difference": 50},
+          ],
+        },
+      },
+    })
+
+  def test_orders_the_largest_differences(self):
+    """
+    Should list the largest absolute differences first, in row order among equals
+    """
+    source_df = frame([[index, "John Doe", "2023-01-01", 100] for index in range(8)])
+    target_df = frame([[index, "John Doe", "2023-01-01", 100 + change] for index, change in enumerate([1, -7, 3, 7, 0, -2, 5, 0])])
+    result = reconcile(source_df, target_df)
+
+    largest = summarize(result, top=4)["amounts"]["Amount"]["largest_discrepancies"]
+    self.assertEqual([record["record_id"] for record in largest], [1, 3, 6, 2])
+    self.assertEqual(len(summarize(result, top=10)["amounts"]["Amount"]["largest_discrepancies"]), 6)
+
+  def test_summarizes_declared_schemas(self):
+    """
+    Should total every number column of a schema and report composite keys
+    """
+    schema = parse_schema({"keys": ["Branch", "Ref"], "compare": ["Qty", "Price"], "types": {"Ref": "integer", "Qty": "integer", "Price": "number"}})
+    source_df = pd.DataFrame({"Branch": ["A", "B"], "Ref": [1, 1], "Qty": [2, 5], "Price": [1.5, 2.0]})
+    target_df = pd.DataFrame({"Branch": ["A", "B"], "Ref": [1, 1], "Qty": [3, 5], "Price": [1.5, 1.0]})
+
+    amounts = summarize(reconcile(source_df, target_df, schema))["amounts"]
+    self.assertEqual(amounts["Qty"]["largest_discrepancies"], [
+      {"record_id": {"Branch": "A", "Ref": 1}, "source_value": 2, "target_value": 3, "difference": 1},
+    ])
+    self.assertEqual(amounts["Price"]["net_difference"], -1.0)
+
+class TestSummaryUploads(APITestCase):
+  def setUp(self):
+    self.client = APIClient()
+    self.upload_url = reverse('reconcilation:upload')
+    self.settings_override = override_settings(RECONCILIATION_CACHE_DIR=None)
+    self.settings_override.enable()
+
+  def tearDown(self):
+    self.settings_override.disable()
+
+  def test_returns_the_summary(self):
+    """
+    Should answer format=summary with the aggregates instead of the records
+    """
+    source_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-03,100.5\n2,Jane Doe,2023-01-03,200.5"
+    target_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,100\n3,David Doe,2023-02-03,300.5"
+
+    response = self.client.post(self.upload_url, {
+        'source': SimpleUploadedFile("source.csv", source_file_data, content_type="text/csv"),
+        'target': SimpleUploadedFile("target.csv", target_file_data, content_type="text/csv"),
+        'format': 'summary',
+    }, format='multipart')
+
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response['Content-Type'], 'application/json')
+    self.assertEqual(streamed_json(response), {
+      "counts": {"missing_in_source": 1, "missing_in_target": 1, "record_discrepancies": 1},
+      "discrepancy_fields": {"Name": 0, "Date": 1, "Amount": 1},
+      "amounts": {
+        "Amount": {
+          "total_difference": 0.5,
+          "net_difference": -0.5,
+          "largest_discrepancies": [
+            {"record_id": 1, "source_value": 100.5, "target_value": 100.0, "difference": -0.5},
+          ],
+        },
+      },
+    })
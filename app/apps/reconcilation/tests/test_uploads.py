@@ -2,12 +2,16 @@ from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django import urls
+from django.test import override_settings
 from .utils import (
   response_with_discrepanies_and_missing_data_in_json_format,
   response_with_discrepanies_and_missing_data_in_csv_format,
-  response_with_discrepanies_and_missing_data_in_html_format
+  response_with_discrepanies_and_missing_data_in_html_format,
+  streamed_content,
+  streamed_json,
 )
 
+@override_settings(RECONCILIATION_CACHE_DIR=None)
 class TestUpload(APITestCase):
   def setUp(self):
     self.client = APIClient()
@@ -85,7 +89,7 @@ class TestUpload(APITestCase):
     }, format='multipart')
 
     self.assertEqual(response.status_code, 422)
-    self.assertEqual(response.json()["format"], ['Unsupported return file format. Allowed return file formats are: csv, html, json'])
+    self.assertEqual(response.json()["format"], ['Unsupported return file format. Allowed return file formats are: csv, html, json, ndjson, summary, arrow, parquet'])
 
   def test_cannot_upload_file_with_invalid_format(self):
     """
@@ -104,8 +108,8 @@ class TestUpload(APITestCase):
     }, format='multipart')
 
     self.assertEqual(response.status_code, 422)
-    self.assertEqual(response.json()["source"], ['Unsupported file extension. Allowed extensions are: .csv'])
-    self.assertEqual(response.json()["target"], ['Unsupported file extension. Allowed extensions are: .csv'])
+    self.assertEqual(response.json()["source"], ['Unsupported file extension. Allowed extensions are: .csv, .parquet, .arrow, .feather, .csv.gz, .csv.bz2, .csv.xz, .zip'])
+    self.assertEqual(response.json()["target"], ['Unsupported file extension. Allowed extensions are: .csv, .parquet, .arrow, .feather, .csv.gz, .csv.bz2, .csv.xz, .zip'])
 
   def test_can_process_files_with_discrepancies_returned_in_in_json_format(self):
     """
@@ -124,7 +128,7 @@ class TestUpload(APITestCase):
     }, format='multipart')
 
     self.assertEqual(response.status_code, 200)
-    self.assertEqual(response.json(), response_with_discrepanies_and_missing_data_in_json_format())
+    self.assertEqual(streamed_json(response), response_with_discrepanies_and_missing_data_in_json_format())
 
   def test_can_process_files_with_invalid_date_data_in_source_file(self):
       """
@@ -202,6 +206,27 @@ class TestUpload(APITestCase):
       self.assertEqual(response.status_code, 422)
       self.assertEqual(response.json()["error"], ["invalid amount input in target file Fig from row with ID 1"])
 
+  def test_cannot_process_files_with_infinite_amounts(self):
+      """
+      Should reject infinite amounts before the report starts, whatever the format
+      """
+      source_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,inf\n2,Jane Doe,2023-01-03,200.5"
+      target_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023-01-01,Fig\n3,David Doe,2023-02-03,-inf"
+
+      for format in ['json', 'ndjson', 'summary']:
+        response = self.client.post(self.upload_url, {
+            'source': SimpleUploadedFile("source.csv", source_file_data, content_type="text/csv"),
+            'target': SimpleUploadedFile("target.csv", target_file_data, content_type="text/csv"),
+            'format': format
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()["error"], [
+          "invalid amount input in source file inf from row with ID 1",
+          "invalid amount input in target file Fig from row with ID 1",
+          "invalid amount input in target file -inf from row with ID 3",
+        ])
+
   def test_can_process_files_with_discrepancies_returned_in_in_csv_format(self):
     """
     Should be able to process files with discrepancies and return in csv format
@@ -219,7 +244,7 @@ class TestUpload(APITestCase):
     }, format='multipart')
 
     self.assertEqual(response.status_code, 200)
-    self.assertEqual(response.content, response_with_discrepanies_and_missing_data_in_csv_format())
+    self.assertEqual(streamed_content(response), response_with_discrepanies_and_missing_data_in_csv_format())
 
   def test_can_process_files_with_discrepancies_returned_in_html_format(self):
     """
@@ -238,7 +263,7 @@ class TestUpload(APITestCase):
     }, format='multipart')
 
     self.assertEqual(response.status_code, 200)
-    self.assertEqual(response.content, response_with_discrepanies_and_missing_data_in_html_format())
+    self.assertEqual(streamed_content(response), response_with_discrepanies_and_missing_data_in_html_format())
 
   def test_cannot_process_files_with_empty_name_column_for_source_file(self):
     """
@@ -467,3 +492,52 @@ class TestUpload(APITestCase):
 
     self.assertEqual(response.status_code, 422)
     self.assertEqual(response.json()["error"], ['invalid ID type for row in position 1 in target file'])
+
+  def test_reports_every_invalid_row_of_both_files_at_once(self):
+    """
+    Should report the violations of every row in both files in one response
+    """
+    source_file_data = b"ID,Name,Date,Amount\n1,John Doe,2023,100\n2,,2023-01-03,200.5\n3,Jim Doe,2023-01-03,Fig"
+    target_file_data = b"ID,Name,Date,Amount\n1.5,John Doe,2023-01-01,100\n3,David Doe,2023-02-03,"
+
+    source_file = SimpleUploadedFile("source.csv", source_file_data, content_type="text/csv")
+    target_file = SimpleUploadedFile("target.csv", target_file_data, content_type="text/csv")
+
+    response = self.client.post(self.upload_url, {
+        'source': source_file,
+        'target': target_file,
+        'format': 'json'
+    }, format='multipart')
+
+    self.assertEqual(response.status_code, 422)
+    self.assertEqual(response.json()["error"], [
+      'invalid date input in source file 2023 from row with ID 1',
+      'name value empty in source file for row with ID 2',
+      'invalid amount input in source file Fig from row with ID 3',
+      'invalid ID type for row in position 1 in target file',
+      'amount value empty in target file for row with ID 3',
+    ])
+
+  @override_settings(RECONCILIATION_MAX_VALIDATION_ERRORS=2)
+  def test_caps_the_number_of_reported_errors(self):
+    """
+    Should only list the configured number of errors and count the rest
+    """
+    source_file_data = b"ID,Name,Date,Amount\n1,,2023-01-01,100\n2,,2023-01-03,200.5\n3,,2023-01-03,1"
+    target_file_data = b"ID,Name,Date,Amount\n1,,2023-01-01,100"
+
+    source_file = SimpleUploadedFile("source.csv", source_file_data, content_type="text/csv")
+    target_file = SimpleUploadedFile("target.csv", target_file_data, content_type="text/csv")
+
+    response = self.client.post(self.upload_url, {
+        'source': source_file,
+        'target': target_file,
+        'format': 'json'
+    }, format='multipart')
+
+    self.assertEqual(response.status_code, 422)
+    self.assertEqual(response.json()["error"], [
+      'name value empty in source file for row with ID 1',
+      'name value empty in source file for row with ID 2',
+      '2 more errors not shown',
+    ])
@@ -0,0 +1,150 @@
+import io
+import os
+import queue
+import threading
+import pandas as pd
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler
+from .external import EXPANSION, memory_budget
+from .schemas import DEFAULT_SCHEMA
+from .validation import check_columns, find_violations
+
+# Rows per chunk the parser validates while the upload is still arriving.
+STREAM_CHUNK_ROWS = 256 * 1024
+
+# Upload chunks buffered ahead of the parser before the upload waits for it.
+QUEUE_CHUNKS = 256
+
+# A parser that is not handed data for this long gives up, so an upload that
+# dies half way cannot leave its thread behind.
+STALL_SECONDS = 60
+
+def stream_parsing_enabled():
+  return getattr(settings, "RECONCILIATION_STREAM_PARSE", True)
+
+class QueueReader(io.RawIOBase):
+  """Readable stream over the chunks put on a queue, ending at an empty chunk."""
+
+  def __init__(self, chunks):
+    self.chunks = chunks
+    self.pending = b""
+    self.finished = False
+
+  def readable(self):
+    return True
+
+  def readinto(self, buffer):
+    while not self.pending and not self.finished:
+      self.pending = self.chunks.get(timeout=STALL_SECONDS)
+      self.finished = not self.pending
+    count = min(len(buffer), len(self.pending))
+    buffer[:count] = self.pending[:count]
+    self.pending = self.pending[count:]
+    return count
+
+class StreamedCSV:
+  """
+  Parses and validates one CSV upload in a thread, fed with the upload's
+  chunks as they arrive. `frame` is only set when every chunk was valid and
+  typed the way the whole file would have been, so the frame can stand in
+  for reading the stored upload. Anything else, including every upload with
+  violations, leaves `frame` unset and is read again the usual way to report
+  the same errors.
+
+  Uploads are parsed before the request's own fields are known, so they
+  are parsed for the default schema; requests naming another schema read
+  the stored upload instead.
+  """
+
+  def __init__(self, file_type, schema=DEFAULT_SCHEMA):
+    self.file_type = file_type
+    self.schema = schema
+    self.frame = None
+    self.chunks = queue.Queue(maxsize=QUEUE_CHUNKS)
+    self.thread = threading.Thread(target=self.parse, daemon=True)
+    self.thread.start()
+
+  def feed(self, data):
+    while self.thread.is_alive():
+      try:
+        self.chunks.put(data, timeout=1)
+        return
+      except queue.Full:
+        continue
+
+  def close(self):
+    self.feed(b"")
+    self.thread.join()
+
+  def parse(self):
+    try:
+      self.frame = self.parsed(QueueReader(self.chunks))
+    except Exception:
+      self.frame = None
+
+  def parsed(self, stream):
+    schema = self.schema
+    parts = []
+    for chunk in pd.read_csv(io.BufferedReader(stream), dtype=schema.dtypes(), usecols=schema.wanted, chunksize=STREAM_CHUNK_ROWS):
+      check_columns(chunk.columns, self.file_type, schema)
+      if any(chunk[column].dtype.kind != "i" for column in schema.columns_of("integer")):
+        return None
+      if any(chunk[column].dtype.kind not in "if" for column in schema.columns_of("number")):
+        return None
+      if find_violations(chunk, self.file_type, None, 0, schema)[0]:
+        return None
+      parts.append(chunk)
+
+    # Chunks of integer and float numbers combine to float, as pandas infers
+    # for the whole file.
+    return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+
+class StreamingCSVUploadHandler(FileUploadHandler):
+  """
+  Upload handler that parses the `source` and `target` CSV files while they
+  are received, so parsing and validation overlap with the transfer. Chunks
+  are passed on unchanged to the next handlers, which still store the
+  upload for the paths that need the file itself.
+
+  Only requests that fit the memory budget are parsed this way; larger ones
+  go to the external engine, which reads the stored files in chunks.
+  """
+
+  def __init__(self, request=None):
+    super().__init__(request)
+    self.enabled = False
+    self.current = None
+    self.parsed = {}
+
+  def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+    self.enabled = stream_parsing_enabled() and 0 < content_length and content_length * EXPANSION <= memory_budget()
+
+  def new_file(self, field_name, file_name, *args, **kwargs):
+    super().new_file(field_name, file_name, *args, **kwargs)
+    self.current = None
+    if self.enabled and field_name in ('source', 'target') and os.path.splitext(file_name)[1].lower() == '.csv':
+      self.current = StreamedCSV(field_name)
+
+  def receive_data_chunk(self, raw_data, start):
+    if self.current is not None:
+      self.current.feed(raw_data)
+    return raw_data
+
+  def file_complete(self, file_size):
+    if self.current is not None:
+      self.current.close()
+      self.parsed[self.field_name] = self.current
+      self.current = None
+
+  def upload_interrupted(self):
+    if self.current is not None:
+      self.current.close()
+      self.current = None
+
+  def upload_complete(self):
+    self.upload_interrupted()
+
+  def frame(self, field_name):
+    """The parsed frame of an upload field, or None to read it from the file."""
+    streamed = self.parsed.get(field_name)
+    return streamed.frame if streamed is not None else None
@@ -1,8 +1,23 @@
 from django.urls import path
 from .views.reconcilation import FileUploadView
+from .views.async_uploads import AsyncFileUploadView
+from .views.batches import BatchUploadView
+from .views.jobs import JobDetailView, JobResultView
+from .views.metrics import MetricsView
+from .views.references import ReferenceDetailView, ReferenceUploadView
+from .views.runs import RunDetailView, RunRecordsView
 
 app_name = "reconcilation"
 
 urlpatterns = [
     path("uploads/", FileUploadView.as_view(), name='upload'),
+    path("asgi/uploads/", AsyncFileUploadView.as_view(), name='asgi-upload'),
+    path("batches/", BatchUploadView.as_view(), name='batch'),
+    path("jobs/<uuid:job_id>/", JobDetailView.as_view(), name='job'),
+    path("jobs/<uuid:job_id>/result/", JobResultView.as_view(), name='job-result'),
+    path("runs/<uuid:run_id>/", RunDetailView.as_view(), name='run'),
+    path("runs/<uuid:run_id>/records/", RunRecordsView.as_view(), name='run-records'),
+    path("references/", ReferenceUploadView.as_view(), name='references'),
+    path("references/<slug:name>/", ReferenceDetailView.as_view(), name='reference'),
+    path("metrics/", MetricsView.as_view(), name='metrics'),
 ]
@@ -1,211 +1,448 @@
+import csv
+import numpy as np
 import pandas as pd
+from functools import partial
+from html import escape
 from io import StringIO
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+from .columnar import COLUMNAR_FORMATS
+from .fuzzy import match_records
+from .results import DISCREPANCY, MISSING_IN_SOURCE, MISSING_IN_TARGET, SECTIONS, field_bit
 
-def convert_to_csv(reconciliation_data):
-  csv_data = []
-  # Process 'missing_in_source'
-  for item in reconciliation_data['missing_in_source']:
-      csv_data.append({
-          'Record ID': item['record_id'],
-          'Status': 'Missing in Source',
-          'Name': item['data']['Name'],
-          'Date': item['data']['Date'],
-          'Amount': item['data']['Amount'],
-          'Discrepancy Field': '',
-          'Source Value': '',
-          'Target Value': ''
-      })
-
-  # Process 'missing_in_target'
-  for item in reconciliation_data['missing_in_target']:
-      csv_data.append({
-          'Record ID': item['record_id'],
-          'Status': 'Missing in Target',
-          'Name': item['data']['Name'],
-          'Date': item['data']['Date'],
-          'Amount': item['data']['Amount'],
-          'Discrepancy Field': '',
-          'Source Value': '',
-          'Target Value': ''
-      })
-
-  # Process 'record_discrepancies'
-  for item in reconciliation_data['record_discrepancies']:
-      for field, discrepancy in item['discrepancy'].items():
-          csv_data.append({
-              'Record ID': item['record_id'],
-              'Status': 'Discrepancy',
-              'Name': item['source_data']['Name'],
-              'Date': item['source_data']['Date'],
-              'Amount': item['source_data']['Amount'],
-              'Discrepancy Field': field,
-              'Source Value': discrepancy['source_value'],
-              'Target Value': discrepancy['target_name']
-          })
-
-  # Convert list of dictionaries to DataFrame
-  df = pd.DataFrame(csv_data)
-
-  # Convert DataFrame to CSV
-  csv_buffer = StringIO()
-  df.to_csv(csv_buffer, index=False)
-  return csv_buffer.getvalue().encode('utf-8')
-
-def convert_to_html(reconciliation_data):
-  # Begin the HTML template
-  html_content = """
-  <!DOCTYPE html>
-  <html lang="en">
-  <head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Reconciliation Report</title>
-    <style>
-      body { font-family: Arial, sans-serif; margin: 20px; }
-      h1 { color: #333; }
-      h2 { color: #555; }
-      table { width: 100%; border-collapse: collapse; margin-bottom: 20px; }
-      th, td { border: 1px solid #ccc; padding: 8px; text-align: left; }
-      th { background-color: #f4f4f4; }
-      .discrepancy { color: red; }
-    </style>
-  </head>
-  <body>
-    <h1>Reconciliation Status</h1>
-    <p>Status: <strong>success</strong></p>
-    <p>Message: <strong>Reconciliation completed successfully.</strong></p>
-
-    <h2>Discrepancies</h2>
+# Renderers are generators so a report can be streamed to the client as it
+# is produced. Output is gathered into chunks of about this many characters
+# before being yielded.
+CHUNK_SIZE = 64 * 1024
+
+# Every format a report can be returned in, for uploads and job results.
+REPORT_FORMATS = ['csv', 'html', 'json', 'ndjson', 'summary', *COLUMNAR_FORMATS]
+
+def key_headers(schema):
+  # A single key column is reported as the record ID.
+  return ['Record ID'] if len(schema.keys) == 1 else list(schema.keys)
+
+def csv_header(schema):
+  return [*key_headers(schema), 'Status', *schema.compare, 'Discrepancy Field', 'Source Value', 'Target Value']
+
+def buffered(parts):
+  buffer, size = [], 0
+  for part in parts:
+    buffer.append(part)
+    size += len(part)
+    if size >= CHUNK_SIZE:
+      yield "".join(buffer).encode('utf-8')
+      buffer, size = [], 0
+  if buffer:
+    yield "".join(buffer).encode('utf-8')
+
+# Rows are read from the result's columns this many at a time.
+ROW_BLOCK = 10_000
+
+def missing_columns(result, status):
+  """The key columns and the values of records missing on one side."""
+  side = result.target if status == MISSING_IN_SOURCE else result.source
+  return [*result.keys.values(), *(side[name] for name in result.schema.compare)]
+
+def discrepancy_columns(result):
+  """The key columns, the field mask, then the source and target values."""
+  compare = result.schema.compare
+  return [
+    *result.keys.values(), result.fields,
+    *(result.source[name] for name in compare), *(result.target[name] for name in compare),
+  ]
+
+def values(columns, start, stop):
+  return zip(*[column[start:stop].tolist() for column in columns])
+
+def section_values(result, status, columns):
+  start, stop = result.bounds(status)
+  for block in range(start, stop, ROW_BLOCK):
+    yield from values(columns, block, min(block + ROW_BLOCK, stop))
+
+def discrepancy_rows_of(result, start, stop):
+  """
+  Yields each discrepancy as its key values, source values, target values
+  and the (field, source value, target value) of every discrepant field.
   """
+  schema = result.schema
+  keys, compare = len(schema.keys), len(schema.compare)
+  bits = [(index, field, field_bit(index)) for index, field in enumerate(schema.compare)]
+  for row in values(discrepancy_columns(result), start, stop):
+    fields = row[keys]
+    source_values, target_values = row[keys + 1:keys + 1 + compare], row[keys + 1 + compare:]
+    yield row[:keys], source_values, target_values, [
+      (field, source_values[index], target_values[index]) for index, field, bit in bits if fields & bit
+    ]
 
-  # Add the "Missing in Target" section
-  html_content += """
-  <h3>Missing in Target</h3>
-  <table>
-    <thead>
-      <tr>
-        <th>Record ID</th>
-        <th>Name</th>
-        <th>Date</th>
-        <th>Amount</th>
-      </tr>
-    </thead>
-    <tbody>
+def probable_match_rows(result, matches):
   """
+  Yields a row for each key column the records of a probable match differ
+  in, laid out like a discrepancy in that column: the source record with its
+  values, then the source and target key values.
+  """
+  keys = len(result.schema.keys)
+  count = len(matches.source)
+  source = values([column[matches.source] for column in missing_columns(result, MISSING_IN_TARGET)], 0, count)
+  target = values([column[matches.target] for column in result.keys.values()], 0, count)
+  for source_row, target_ids in zip(source, target):
+    for header, source_id, target_id in zip(key_headers(result.schema), source_row[:keys], target_ids):
+      if source_id != target_id:
+        yield [*source_row[:keys], 'Probable Match', *source_row[keys:], header, source_id, target_id]
+
+def csv_rows(result, matches=None):
+  keys = len(result.schema.keys)
+  for status, label in ((MISSING_IN_SOURCE, 'Missing in Source'), (MISSING_IN_TARGET, 'Missing in Target')):
+    for row in section_values(result, status, missing_columns(result, status)):
+      yield [*row[:keys], label, *row[keys:], '', '', '']
+
+  start, stop = result.bounds(DISCREPANCY)
+  for block in range(start, stop, ROW_BLOCK):
+    for ids, source_values, _, discrepant in discrepancy_rows_of(result, block, min(block + ROW_BLOCK, stop)):
+      for field, source_value, target_value in discrepant:
+        yield [*ids, 'Discrepancy', *source_values, field, source_value, target_value]
 
-  if reconciliation_data['missing_in_target']:
-    for record in reconciliation_data['missing_in_target']:
-      html_content += f"""
-        <tr>
-          <td>{record['record_id']}</td>
-          <td>{record['data']['Name']}</td>
-          <td>{record['data']['Date']}</td>
-          <td>{record['data']['Amount']}</td>
-        </tr>
-      """
-  else:
-    # Add placeholder when missing_in_target is empty
-    html_content += """
-      <tr>
-        <td colspan="4" style="text-align:center;">No records missing in target.</td>
-      </tr>
-    """
-
-  html_content += """
-    </tbody>
-  </table>
+  if matches is not None:
+    yield from probable_match_rows(result, matches)
+
+def float_columns(result):
+  """
+  Finds the columns holding only numbers, at least one of them a float.
+  These are written with every value as a float, which keeps the output
+  identical to the DataFrame.to_csv based renderer this replaced. Only
+  number columns can hold floats, so their dtypes decide.
   """
+  schema = result.schema
+  keys, compare = len(schema.keys), len(schema.compare)
+  missing_in_source = result.count(MISSING_IN_SOURCE)
+  missing_in_target = result.count(MISSING_IN_TARGET)
+  start, stop = result.bounds(DISCREPANCY)
+  is_float = {
+    side: {name: columns[name].dtype.kind == 'f' for name in schema.columns_of("number")}
+    for side, columns in (('source', result.source), ('target', result.target))
+  }
+
+  columns = []
+  for index, name in enumerate(schema.compare):
+    if name in is_float['source'] and (
+      (missing_in_source and is_float['target'][name]) or ((missing_in_target or stop > start) and is_float['source'][name])
+    ):
+      columns.append(keys + 1 + index)
+
+  # Source and target values are numbers only when every row of the report
+  # is a discrepancy in numeric columns; otherwise text, dates or blanks
+  # are mixed in.
+  if missing_in_source or missing_in_target or stop == start:
+    return columns
+  numeric = sum(field_bit(index) for index, name in enumerate(schema.compare) if schema.types[name] in ("integer", "number"))
+  reported = int(np.bitwise_or.reduce(result.fields[start:stop]))
+  if reported & ~numeric:
+    return columns
+  for side, position in (('source', keys + compare + 2), ('target', keys + compare + 3)):
+    if any(is_float[side].get(name) for index, name in enumerate(schema.compare) if reported & field_bit(index)):
+      columns.append(position)
+  return columns
+
+def csv_parts(result, matches=None):
+  floats = float_columns(result)
+  buffer = StringIO()
+  writer = csv.writer(buffer, lineterminator='\n')
+  writer.writerow(csv_header(result.schema))
+  empty = True
+  for row in csv_rows(result, matches):
+    empty = False
+    for column in floats:
+      row[column] = float(row[column])
+    writer.writerow(row)
+    if buffer.tell() >= CHUNK_SIZE:
+      yield buffer.getvalue()
+      buffer.seek(0)
+      buffer.truncate()
+
+  # An empty report used to come out of pandas as a single blank line.
+  yield "\n" if empty else buffer.getvalue()
+
+def convert_to_csv(result, matches=None):
+  yield from buffered(csv_parts(result, matches))
+
+HTML_HEAD = (
+  '<!DOCTYPE html>\n'
+  '<html lang="en">\n'
+  '<head>\n'
+  '<meta charset="UTF-8">\n'
+  '<meta name="viewport" content="width=device-width, initial-scale=1.0">\n'
+  '<title>Reconciliation Report</title>\n'
+  '<style>\n'
+  'body { font-family: Arial, sans-serif; margin: 20px; }\n'
+  'h1 { color: #333; }\n'
+  'h2 { color: #555; }\n'
+  'table { width: 100%; border-collapse: collapse; margin-bottom: 20px; }\n'
+  'th, td { border: 1px solid #ccc; padding: 8px; text-align: left; }\n'
+  'th { background-color: #f4f4f4; }\n'
+  '.discrepancy { color: red; }\n'
+  'nav a { margin-right: 6px; }\n'
+  '.pages > .page:not(:target) { display: none; }\n'
+  '.pages:not(:has(.page:target)) > .page:first-child { display: block; }\n'
+  '</style>\n'
+  '</head>\n'
+  '<body>\n'
+  '<h1>Reconciliation Status</h1>\n'
+  '<p>Status: <strong>success</strong></p>\n'
+  '<p>Message: <strong>Reconciliation completed successfully.</strong></p>\n'
+  '<h2>Discrepancies</h2>\n'
+)
+
+HTML_FOOT = '</body>\n</html>\n'
+
+def missing_headers(schema):
+  return [*key_headers(schema), *schema.compare]
+
+def discrepancy_headers(schema):
+  return [
+    *key_headers(schema),
+    *(f'Source {name}' for name in schema.compare),
+    *(f'Target {name}' for name in schema.compare),
+    'Discrepancy',
+  ]
+
+# Rows are rendered a block at a time. Cells are first joined with control
+# characters, which are not allowed in HTML text anyway, so the whole block
+# can be escaped in one call before the separators are swapped for markup.
+HTML_ROW_BLOCK = 250
+ROW_START, CELL, DISCREPANCY_CELL, ROW_END = "\x03", "\x00", "\x01", "\x02"
+SEPARATORS = dict.fromkeys(map(ord, ROW_START + CELL + DISCREPANCY_CELL + ROW_END))
+
+def html_page_size():
+  return getattr(settings, "RECONCILIATION_HTML_PAGE_SIZE", 1000)
 
-  # Add the "Missing in Source" section
-  html_content += """
-  <h3>Missing in Source</h3>
-  <table>
-    <thead>
-      <tr>
-        <th>Record ID</th>
-        <th>Name</th>
-        <th>Date</th>
-        <th>Amount</th>
-      </tr>
-    </thead>
-    <tbody>
+def html_rows(text):
+  return (
+    escape(text, quote=False)
+    .replace(ROW_START, '<tr><td>')
+    .replace(CELL, '</td><td>')
+    .replace(DISCREPANCY_CELL, '</td><td class="discrepancy">')
+    .replace(ROW_END, '</td></tr>\n')
+  )
+
+def row_template(cells, last=CELL):
+  """A str.format template of a row of `cells` cells, the last one preceded by `last`."""
+  return ROW_START + CELL.join(['{}'] * (cells - 1)) + last + '{}' + ROW_END
+
+def separator_count(text):
+  return sum(text.count(separator) for separator in (ROW_START, CELL, DISCREPANCY_CELL, ROW_END))
+
+def html_block(template, rows):
+  """
+  Renders rows of cells into `template`. A value holding a separator would
+  end its cell or row early, so when the block has more separators than its
+  rows put there, it is rendered again with them taken out of the values.
   """
+  rows = list(rows)
+  text = ''.join([template.format(*row) for row in rows])
+  if separator_count(text) != separator_count(template) * len(rows):
+    text = ''.join([
+      template.format(*[value.translate(SEPARATORS) if isinstance(value, str) else value for value in row])
+      for row in rows
+    ])
+  return html_rows(text)
+
+def missing_rows(result, status, start, stop):
+  columns = missing_columns(result, status)
+  return html_block(row_template(len(columns)), values(columns, start, stop))
+
+def discrepancy_rows(result, status, start, stop):
+  rows = []
+  template = row_template(len(discrepancy_headers(result.schema)), DISCREPANCY_CELL)
+  for ids, source_values, target_values, discrepant in discrepancy_rows_of(result, start, stop):
+    discrepancy_str = ", ".join([
+      f"{field}: {source_value} vs {target_value}"
+      for field, source_value, target_value in discrepant
+    ])
+    rows.append((*ids, *source_values, *target_values, discrepancy_str))
+  return html_block(template, rows)
+
+def match_headers(schema):
+  return [
+    *(f'Source {header}' for header in key_headers(schema)),
+    *(f'Target {header}' for header in key_headers(schema)),
+    'Score',
+  ]
 
-  if reconciliation_data['missing_in_source']:
-      for record in reconciliation_data['missing_in_source']:
-        html_content += f"""
-          <tr>
-            <td>{record['record_id']}</td>
-            <td>{record['data']['Name']}</td>
-            <td>{record['data']['Date']}</td>
-            <td>{record['data']['Amount']}</td>
-          </tr>
-        """
-  else:
-    # Add placeholder when missing_in_source is empty
-    html_content += """
-      <tr>
-        <td colspan="4" style="text-align:center;">No records missing in source.</td>
-      </tr>
-    """
-
-  html_content += """
-    </tbody>
-  </table>
+def match_rows(result, matches, start, stop):
+  columns = [
+    *(column[matches.source[start:stop]] for column in result.keys.values()),
+    *(column[matches.target[start:stop]] for column in result.keys.values()),
+    matches.scores[start:stop],
+  ]
+  return html_block(row_template(len(columns)), values(columns, 0, stop - start))
+
+HTML_SECTIONS = [
+  (MISSING_IN_TARGET, 'Missing in Target', missing_headers, missing_rows, 'No records missing in target.'),
+  (MISSING_IN_SOURCE, 'Missing in Source', missing_headers, missing_rows, 'No records missing in source.'),
+  (DISCREPANCY, 'Discrepancies in Matching Records', discrepancy_headers, discrepancy_rows, 'No discrepancies found in matching records.'),
+]
+
+def html_table_head(columns):
+  # Column names come from the schema, which an upload can send.
+  return '<table>\n<thead><tr>' + ''.join(f'<th>{escape(column, quote=False)}</th>' for column in columns) + '</tr></thead>\n<tbody>\n'
+
+def html_table(columns, start, stop, render_rows):
+  yield html_table_head(columns)
+  for block in range(start, stop, HTML_ROW_BLOCK):
+    yield render_rows(block, min(block + HTML_ROW_BLOCK, stop))
+  yield '</tbody>\n</table>\n'
+
+def html_section(key, title, columns, render_rows, placeholder, start, stop, page_size):
   """
+  Renders the table of rows `start` to `stop`, `render_rows(start, stop)`
+  rendering a block of them.
+  """
+  yield f'<h3 id="{key}">{title}</h3>\n'
+  if start == stop:
+    yield html_table_head(columns)
+    yield f'<tr><td colspan="{len(columns)}" style="text-align:center;">{placeholder}</td></tr>\n'
+    yield '</tbody>\n</table>\n'
+    return
+
+  if stop - start <= page_size:
+    yield from html_table(columns, start, stop, render_rows)
+    return
+
+  # Large sections are split into pages of `page_size` rows. Only the page
+  # named in the URL fragment (or the first one) is displayed, so the
+  # browser never has to lay out the whole table.
+  pages = range(start, stop, page_size)
+  yield '<nav>Pages: ' + ''.join(
+    f'<a href="#{key}-page-{number}">{number}</a>' for number in range(1, len(pages) + 1)
+  ) + '</nav>\n<div class="pages">\n'
+  for number, page in enumerate(pages, start=1):
+    yield f'<div class="page" id="{key}-page-{number}">\n<p>Page {number} of {len(pages)}</p>\n'
+    yield from html_table(columns, page, min(page + page_size, stop), render_rows)
+    yield '</div>\n'
+  yield '</div>\n'
 
-  # Add the "Discrepancies in Matching Records" section
-  html_content += """
-  <h3>Discrepancies in Matching Records</h3>
-  <table>
-    <thead>
-      <tr>
-        <th>Record ID</th>
-        <th>Source Name</th>
-        <th>Source Date</th>
-        <th>Source Amount</th>
-        <th>Target Name</th>
-        <th>Target Date</th>
-        <th>Target Amount</th>
-        <th>Discrepancy</th>
-      </tr>
-    </thead>
-    <tbody>
+def html_parts(result, page_size=None, matches=None):
+  page_size = html_page_size() if page_size is None else page_size
+  yield HTML_HEAD
+  for status, title, headers, render_rows, placeholder in HTML_SECTIONS:
+    start, stop = result.bounds(status)
+    yield from html_section(
+      SECTIONS[status], title, headers(result.schema), partial(render_rows, result, status), placeholder, start, stop, page_size,
+    )
+  if matches is not None:
+    yield from html_section(
+      'probable_matches', 'Probable Matches', match_headers(result.schema), partial(match_rows, result, matches),
+      'No probable matches found.', 0, len(matches.source), page_size,
+    )
+  yield HTML_FOOT
+
+def convert_to_html(result, page_size=None, matches=None):
+  yield from buffered(html_parts(result, page_size, matches))
+
+def json_encoder():
+  # Same compact, non-ASCII-escaping output as DRF's JSONRenderer.
+  return JSONEncoder(separators=(',', ':'), ensure_ascii=False, allow_nan=False).encode
+
+def json_values(values, encode):
+  """
+  The JSON text of every value of a column. Numbers are written as the
+  encoder writes them. Text and dates repeat, so each distinct value is
+  encoded once.
   """
+  if values.dtype.kind in "iu" or (values.dtype.kind == "f" and np.isfinite(values).all()):
+    return list(map(repr, values.tolist()))
+  codes, uniques = pd.factorize(values, use_na_sentinel=False)
+  return np.array([encode(value) for value in uniques], dtype=object)[codes].tolist()
+
+def json_object(names, encode):
+  # The template of an object with the given members, its values left as
+  # %s. Any % in a name is escaped for the template.
+  return '{' + ','.join(f'{encode(name).replace("%", "%%")}:%s' for name in names) + '}'
+
+def record_id_values(result, start, stop, encode):
+  """The JSON text of each record_id, as in result.record_ids()."""
+  columns = [json_values(result.keys[name][start:stop], encode) for name in result.schema.keys]
+  if len(columns) == 1:
+    return columns[0]
+  template = json_object(result.schema.keys, encode)
+  return [template % row for row in zip(*columns)]
+
+def discrepancy_template(names, fields, encode):
+  # A discrepancy record whose discrepant fields are the bits of `fields`,
+  # and for each of them the positions of its source and target values
+  # among the record's values.
+  side = json_object(names, encode)
+  discrepant = [index for index in range(len(names)) if fields & field_bit(index)]
+  pair = '{"source_value":%s,"target_name":%s}'
+  discrepancy = '{' + ','.join(f'{encode(names[index]).replace("%", "%%")}:{pair}' for index in discrepant) + '}'
+  picks = [position for index in discrepant for position in (index, len(names) + index)]
+  return f'{{"record_id":%s,"source_data":{side},"target_data":{side},"discrepancy":{discrepancy}}}', picks
 
-  if reconciliation_data['record_discrepancies']:
-    for record in reconciliation_data['record_discrepancies']:
-      discrepancies = []
-      for field, discrepancy in record['discrepancy'].items():
-        discrepancies.append(f"{field}: {discrepancy['source_value']} vs {discrepancy['target_name']}")
-
-      discrepancy_str = ", ".join(discrepancies)
-
-      html_content += f"""
-        <tr>
-          <td>{record['record_id']}</td>
-          <td>{record['source_data']['Name']}</td>
-          <td>{record['source_data']['Date']}</td>
-          <td>{record['source_data']['Amount']}</td>
-          <td>{record['target_data']['Name']}</td>
-          <td>{record['target_data']['Date']}</td>
-          <td>{record['target_data']['Amount']}</td>
-          <td class="discrepancy">{discrepancy_str}</td>
-        </tr>
-      """
-  else:
-    # Add placeholder when there are no discrepancies
-    html_content += """
-      <tr>
-        <td colspan="8" style="text-align:center;">No discrepancies found in matching records.</td>
-      </tr>
-    """
-
-  html_content += """
-    </tbody>
-  </table>
-  </body>
-  </html>
+def json_records(result, status, encode=None):
   """
+  Yields the JSON text of the records of one status, a list per block of
+  rows, exactly as the encoder writes the dicts of result.records(). Cells
+  are encoded a column at a time and records filled into templates built
+  once, instead of building and walking a dict per record.
+  """
+  encode = json_encoder() if encode is None else encode
+  names = result.schema.compare
+  start, stop = result.bounds(status)
+  missing = '{"record_id":%s,"data":' + json_object(names, encode) + '}'
+  templates = {}
+  for block in range(start, stop, ROW_BLOCK):
+    end = min(block + ROW_BLOCK, stop)
+    ids = record_id_values(result, block, end, encode)
+    if status != DISCREPANCY:
+      side = result.target if status == MISSING_IN_SOURCE else result.source
+      yield [missing % row for row in zip(ids, *(json_values(side[name][block:end], encode) for name in names))]
+      continue
+
+    cells = [json_values(values[name][block:end], encode) for values in (result.source, result.target) for name in names]
+    records = []
+    for record_id, fields, *row in zip(ids, result.fields[block:end].tolist(), *cells):
+      if fields not in templates:
+        templates[fields] = discrepancy_template(names, fields, encode)
+      template, picks = templates[fields]
+      records.append(template % (record_id, *row, *[row[position] for position in picks]))
+    yield records
+
+JSON_GROUP = 256
+
+def json_parts(result, matches=None):
+  encode = json_encoder()
+  yield '{'
+  for status, section in enumerate(SECTIONS):
+    yield f'{"," if status else ""}"{section}":['
+    first = True
+    for records in json_records(result, status, encode):
+      # Joined a few hundred at a time to keep the chunks bounded.
+      for group in range(0, len(records), JSON_GROUP):
+        yield ('' if first else ',') + ','.join(records[group:group + JSON_GROUP])
+        first = False
+    yield ']'
+  if matches is not None:
+    yield ',"probable_matches":['
+    for position, record in enumerate(match_records(result, matches)):
+      yield f'{"," if position else ""}{encode(record)}'
+    yield ']'
+  yield '}'
+
+def convert_to_json(result, matches=None):
+  yield from buffered(json_parts(result, matches))
+
+def ndjson_parts(result, matches=None):
+  # Each record is the object of the JSON report with its section first,
+  # under "status".
+  encode = json_encoder()
+  for status, section in enumerate(SECTIONS):
+    prefix = f'{{"status":"{section}",'
+    for records in json_records(result, status, encode):
+      for group in range(0, len(records), JSON_GROUP):
+        yield ''.join([f'{prefix}{record[1:]}\n' for record in records[group:group + JSON_GROUP]])
+  if matches is not None:
+    for record in match_records(result, matches):
+      yield f'{{"status":"probable_matches",{encode(record)[1:]}\n'
 
-  return html_content.encode('utf-8')
+def convert_to_ndjson(result, matches=None):
+  yield from buffered(ndjson_parts(result, matches))
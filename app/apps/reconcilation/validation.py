@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+from django.conf import settings
+from pandas.api import types
+from rest_framework import serializers
+from .compressed import open_upload
+from .schemas import DEFAULT_SCHEMA
+
+DATE_FORMAT = "%Y-%m-%d"
+
+Violation = namedtuple("Violation", ["file_type", "position", "column", "message"])
+
+# A check of one column: the rows it flags, the value shown in its message
+# (None when the message shows none) and the message.
+Check = namedtuple("Check", ["column", "mask", "values", "message"])
+
+def describe_row(position, key):
+  """`key` holds the (column, value) pairs of the row's key columns."""
+  if any(pd.isna(value) for _, value in key):
+    return f"row in position {position + 1}"
+  return "row with " + ", ".join(f"{column} {value}" for column, value in key)
+
+def max_errors():
+  return getattr(settings, "RECONCILIATION_MAX_VALIDATION_ERRORS", 100)
+
+def check_columns(columns, file_type, schema=DEFAULT_SCHEMA):
+  missing_cols = [col for col in schema.columns if col not in columns]
+  if missing_cols:
+    raise serializers.ValidationError({"error": f"Missing columns: {', '.join(missing_cols)}, in {file_type} file"})
+
+def raw_column(file, column):
+  # A float column cannot tell "2" from "2.0" any more, so the column is
+  # read again as text. This only happens for files that hold empty or
+  # non-integer values in an integer column.
+  return pd.read_csv(open_upload(file), usecols=[column], dtype=str)[column]
+
+def integer_masks(values, file, column):
+  if types.is_integer_dtype(values):
+    no_rows = np.zeros(len(values), dtype=bool)
+    return values, no_rows, no_rows
+
+  raw = values if values.dtype == object else raw_column(file, column)
+  empty = raw.isna().to_numpy()
+  integer = raw.astype(str).str.fullmatch(r"\s*[+-]?\d+\s*").to_numpy()
+  return raw, empty, ~empty & ~integer
+
+def date_masks(dates):
+  empty = dates.isna().to_numpy()
+  text = dates if dates.dtype == object else dates.astype(str)
+  invalid = ~empty & pd.to_datetime(text, format=DATE_FORMAT, errors="coerce").isna().to_numpy()
+  if invalid.any():
+    # Surrounding whitespace was always tolerated, so only the dates that
+    # failed are stripped and parsed again.
+    retry = pd.to_datetime(text[invalid].str.strip(), format=DATE_FORMAT, errors="coerce")
+    invalid[invalid] = retry.isna().to_numpy()
+  return text, empty, invalid
+
+def number_masks(numbers):
+  # Infinite amounts are rejected with the values that are not numbers, as
+  # no report format can write them.
+  empty = numbers.isna().to_numpy()
+  parsed = numbers if types.is_numeric_dtype(numbers) else pd.to_numeric(numbers, errors="coerce")
+  finite = np.isfinite(parsed.to_numpy(dtype=float, na_value=np.nan))
+  return numbers, empty, ~empty & ~finite
+
+def text_masks(text):
+  empty = text.isna().to_numpy()
+  return text, empty, np.zeros(len(text), dtype=bool)
+
+def column_masks(kind, values, file, column):
+  """Returns the values to report, the empty rows and the ill-typed rows of a column."""
+  if kind == "integer":
+    return integer_masks(values, file, column)
+  if kind == "number":
+    return number_masks(values)
+  if kind == "date":
+    return date_masks(values)
+  return text_masks(values)
+
+def empty_message(column, is_key):
+  if is_key:
+    return lambda ft, pos, key, value: f"{column} value empty in {ft} file for row in position {pos + 1}"
+  return lambda ft, pos, key, value: f"{column.lower()} value empty in {ft} file for {describe_row(pos, key)}"
+
+def invalid_message(column, kind, is_key):
+  if kind == "integer" and is_key:
+    return lambda ft, pos, key, value: f"invalid {column} type for row in position {pos + 1} in {ft} file"
+  if kind == "date":
+    return lambda ft, pos, key, value: f"invalid {column.lower()} input in {ft} file {str(value).strip()} from {describe_row(pos, key)}"
+  return lambda ft, pos, key, value: f"invalid {column.lower()} input in {ft} file {value} from {describe_row(pos, key)}"
+
+def schema_checks(file_df, file, schema):
+  """
+  Returns the checks of every column and the key values rows are described
+  by. Every column is checked for empty values first, then the typed
+  columns for values of the wrong type, each group in schema order. For
+  the default schema that is the order the old row-by-row validation ran
+  its checks in, so the violations of a single row keep a familiar order.
+  """
+  masks = {column: column_masks(schema.types[column], file_df[column], file, column) for column in schema.columns}
+  empty = [
+    Check(column, masks[column][1], None, empty_message(column, column in schema.keys))
+    for column in schema.columns
+  ]
+  invalid = [
+    Check(column, masks[column][2], masks[column][0], invalid_message(column, schema.types[column], column in schema.keys))
+    for column in schema.columns_of("integer", "date", "number")
+  ]
+  return empty + invalid, [(column, masks[column][0]) for column in schema.keys]
+
+def find_violations(file_df, file_type, file, limit=None, schema=DEFAULT_SCHEMA):
+  """
+  Checks every row of a file in one columnar pass and returns the total
+  number of violations together with the first `limit` of them, ordered by
+  row position. Positions are taken from the frame index, so a chunk of a
+  larger file reports positions within the whole file.
+  """
+  limit = max_errors() if limit is None else limit
+  checks, keys = schema_checks(file_df, file, schema)
+
+  positions = [np.flatnonzero(check.mask) for check in checks]
+  rows = np.concatenate(positions)
+  check_numbers = np.concatenate([np.full(len(p), number) for number, p in enumerate(positions)])
+  total = len(rows)
+  if not total:
+    return 0, []
+
+  violations = []
+  for selected in np.lexsort((check_numbers, rows))[:limit]:
+    row, check = int(rows[selected]), checks[int(check_numbers[selected])]
+    position = int(file_df.index[row])
+    key = [(column, values.iat[row]) for column, values in keys]
+    value = check.values.iat[row] if check.values is not None else None
+    violations.append(Violation(
+      file_type, position, check.column, check.message(file_type, position, key, value)
+    ))
+  return total, violations
+
+def coerce_types(file_df, schema=DEFAULT_SCHEMA):
+  """
+  Converts the integer and number columns of a validated frame to numbers,
+  for files where pandas could not infer a numeric type on its own.
+  """
+  integers = [column for column in schema.columns_of("integer") if not types.is_integer_dtype(file_df[column])]
+  numbers = [column for column in schema.columns_of("number") if not types.is_numeric_dtype(file_df[column])]
+  if not integers and not numbers:
+    return file_df
+
+  file_df = file_df.copy()
+  for column in integers:
+    file_df[column] = pd.to_numeric(file_df[column].astype(str).str.strip()).astype("int64")
+  for column in numbers:
+    file_df[column] = pd.to_numeric(file_df[column])
+  return file_df
+
+def violation_detail(violations, total):
+  errors = [violation.message for violation in violations]
+  if total > len(violations):
+    errors.append(f"{total - len(violations)} more errors not shown")
+  return {"error": errors}
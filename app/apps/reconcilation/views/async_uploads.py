@@ -0,0 +1,81 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from ..executor import Saturated, admitted, iterate, run
+from ..jobs import enqueue
+from ..metrics import Timings, record
+from ..serializers.jobs import JobSerializers
+from ..serializers.reconcilation import FileSerializers
+from .reconcilation import annotate, outcome, reconciliation_response
+
+def json_response(data, status_code):
+    # The same body DRF's JSONRenderer gives the sync endpoint.
+    return HttpResponse(JSONRenderer().render(data), status=status_code, content_type='application/json')
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncFileUploadView(View):
+    """
+    The upload endpoint as a native async view, for ASGI deployments. The
+    ASGI server receives the request body without blocking the event loop.
+    Parsing it, reconciling and rendering the report all run on the
+    bounded reconciliation executor, so a process can hold many uploads at
+    once while only RECONCILIATION_ASYNC_WORKERS of them use a thread.
+    Requests and responses are those of FileUploadView.
+    """
+    http_method_names = ['post', 'options']
+
+    async def post(self, request):
+      timings = Timings()
+      try:
+        with admitted():
+          data, serializer = await run(self.validated, request, timings)
+      except Saturated:
+        record(timings, 'rejected', status.HTTP_503_SERVICE_UNAVAILABLE)
+        response = json_response({"error": ["Too many reconciliations in progress, try again later"]}, status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = '1'
+        return response
+
+      if serializer.errors:
+        format = str(data.get("format", "")).lower()
+        record(timings, "invalid" if 'format' in serializer.errors else format, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        return self.timed(json_response(serializer.errors, status.HTTP_422_UNPROCESSABLE_ENTITY), timings)
+
+      format = data.get("format").lower()
+      if data.get("mode", "sync").lower() == "async":
+        job = await sync_to_async(enqueue)(serializer.validated_data)
+        record(timings, format, status.HTTP_202_ACCEPTED, mode="async")
+        return self.timed(json_response(JobSerializers(job, context={'request': request}).data, status.HTTP_202_ACCEPTED), timings)
+
+      response = annotate(self.timed(reconciliation_response(serializer.validated_data, format, serializer.probable_matches), timings), serializer)
+      response.streaming_content = self.rendered(response.streaming_content, timings, format, response.status_code, **outcome(serializer))
+      return response
+
+    def validated(self, request, timings):
+      # Runs on the executor: reading the multipart body and the whole
+      # reconciliation block.
+      with timings.phase('upload'):
+        data = request.POST.copy()
+        data.update(request.FILES)
+      for side in ('source', 'target'):
+        if hasattr(data.get(side), 'size'):
+          timings.bytes[side] = data[side].size
+
+      serializer = FileSerializers(data=data, context={'request': request, 'timings': timings})
+      serializer.is_valid()
+      return data, serializer
+
+    def timed(self, response, timings):
+      response['Server-Timing'] = timings.server_timing()
+      return response
+
+    async def rendered(self, content, timings, format, status_code, **fields):
+      try:
+        with timings.phase('render'):
+          async for chunk in iterate(content):
+            yield chunk
+      finally:
+        record(timings, format, status_code, **fields)
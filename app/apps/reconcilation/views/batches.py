@@ -0,0 +1,50 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from django.http import StreamingHttpResponse
+from ..batches import ndjson_lines, reconcile_pairs, zip_archive
+from ..metrics import Timings, record
+from ..serializers.batches import BatchSerializers
+
+class BatchUploadView(APIView):
+    """
+    Reconciles many source and target pairs in one request, on the shared
+    reconciliation executor. The pairs come as a zip archive or as files
+    named source.<name> and target.<name>. The reports come back as one zip
+    archive or one NDJSON line per pair, with the errors of pairs that
+    could not be reconciled in place of their reports.
+    """
+    serializer_class = BatchSerializers
+
+    def post(self, request):
+      timings = Timings()
+      with timings.phase('upload'):
+        data = request.data
+
+      serializer = self.serializer_class(data=data, context={'request': request, 'files': request.FILES})
+      if not serializer.is_valid():
+        format = str(data.get("format", "json")).lower()
+        record(timings, "invalid" if 'format' in serializer.errors else format, status.HTTP_422_UNPROCESSABLE_ENTITY, mode='batch')
+        return Response(serializer.errors, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+      batch = serializer.validated_data
+      outcomes = self.counted(reconcile_pairs(batch['pairs'], batch['options']), timings, batch['format'])
+      if batch['output'] == 'ndjson':
+        return StreamingHttpResponse(ndjson_lines(outcomes), content_type='application/x-ndjson')
+
+      response = StreamingHttpResponse(zip_archive(outcomes, batch['format']), content_type='application/zip')
+      response['Content-Disposition'] = 'attachment; filename="reconciliation.zip"'
+      return response
+
+    def counted(self, outcomes, timings, format):
+      # Pairs are reconciled while the response is sent, so the batch is
+      # logged once the last of them is done.
+      pairs = failed = 0
+      try:
+        with timings.phase('batch'):
+          for outcome in outcomes:
+            pairs += 1
+            failed += outcome.status != status.HTTP_200_OK
+            yield outcome
+      finally:
+        record(timings, format, status.HTTP_200_OK, mode='batch', pairs=pairs, failed=failed)
@@ -0,0 +1,52 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.negotiation import DefaultContentNegotiation
+from django.shortcuts import get_object_or_404
+from ..models import ReconciliationJob
+from ..serializers.jobs import JobSerializers
+from ..columnar import COLUMNAR_FORMATS, arrow_available
+from ..fuzzy import probable_matches
+from ..jobs import load_result
+from ..utils import REPORT_FORMATS
+from .reconcilation import reconciliation_response
+
+class ReportFormatNegotiation(DefaultContentNegotiation):
+    # `?format=` names the report format on the result endpoint, so DRF must
+    # not treat it as a renderer override.
+    def select_renderer(self, request, renderers, format_suffix=None):
+      return super().select_renderer(request, renderers, format_suffix='json')
+
+class JobDetailView(APIView):
+    serializer_class = JobSerializers
+
+    def get(self, request, job_id):
+      job = get_object_or_404(ReconciliationJob, pk=job_id)
+      return Response(self.serializer_class(job, context={'request': request}).data, status=status.HTTP_200_OK)
+
+class JobResultView(APIView):
+    content_negotiation_class = ReportFormatNegotiation
+
+    def get(self, request, job_id):
+      job = get_object_or_404(ReconciliationJob, pk=job_id)
+      format = request.query_params.get("format", job.format).lower()
+
+      if format not in REPORT_FORMATS:
+        return Response({"format": [f'Unsupported return file format. Allowed return file formats are: {", ".join(REPORT_FORMATS)}']}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+      if format in COLUMNAR_FORMATS and not arrow_available():
+        return Response({"format": [f'The {format} format requires the optional pyarrow package']}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+      if format in COLUMNAR_FORMATS and job.fuzzy:
+        return Response({"format": [f'Probable matches cannot be reported in the {format} format']}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+      if job.status == ReconciliationJob.FAILED:
+        return Response(job.errors, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+      if job.status != ReconciliationJob.SUCCEEDED:
+        return Response({"error": [f"job is {job.status}"]}, status=status.HTTP_409_CONFLICT)
+
+      # Probable matches are found again from the stored result, which
+      # holds every unmatched record.
+      result = load_result(job)
+      return reconciliation_response(result, format, probable_matches(result) if job.fuzzy else None)
@@ -0,0 +1,8 @@
+from rest_framework.views import APIView
+from django.http import HttpResponse
+from ..metrics import metrics
+
+class MetricsView(APIView):
+    # Prometheus scrapes this; the body is its text exposition format.
+    def get(self, request):
+      return HttpResponse(metrics().render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -2,26 +2,106 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from ..serializers.reconcilation import FileSerializers
-from django.http import HttpResponse
-from ..utils import convert_to_csv, convert_to_html
+from ..serializers.jobs import JobSerializers
+from django.http import StreamingHttpResponse
+from ..jobs import enqueue
+from ..metrics import Timings, record
+from ..uploads import StreamingCSVUploadHandler
+from ..columnar import convert_to_columnar
+from ..summary import convert_to_summary
+from ..utils import convert_to_csv, convert_to_html, convert_to_json, convert_to_ndjson
+
+def reconciliation_response(reconciliation_data, format, matches=None):
+    # `matches` are the ProbableMatches of a fuzzy matching pass, which the
+    # columnar formats have no room for.
+    if format == "csv":
+      response = StreamingHttpResponse(convert_to_csv(reconciliation_data, matches), content_type='text/csv')
+      response['Content-Disposition'] = 'attachment; filename="reconciliation.csv"'
+      return response
+    elif format == "html":
+      response = StreamingHttpResponse(convert_to_html(reconciliation_data, matches=matches), content_type='text/html')
+      response['Content-Disposition'] = 'attachment; filename="reconciliation.html"'
+      return response
+    elif format == "arrow":
+      response = StreamingHttpResponse(convert_to_columnar(reconciliation_data, format), content_type='application/vnd.apache.arrow.stream')
+      response['Content-Disposition'] = 'attachment; filename="reconciliation.arrows"'
+      return response
+    elif format == "parquet":
+      response = StreamingHttpResponse(convert_to_columnar(reconciliation_data, format), content_type='application/vnd.apache.parquet')
+      response['Content-Disposition'] = 'attachment; filename="reconciliation.parquet"'
+      return response
+    elif format == "ndjson":
+      # One record per line, so clients can start on the first records
+      # while the rest are still arriving.
+      return StreamingHttpResponse(convert_to_ndjson(reconciliation_data, matches), content_type='application/x-ndjson', status=status.HTTP_200_OK)
+    elif format == "summary":
+      return StreamingHttpResponse(convert_to_summary(reconciliation_data, matches), content_type='application/json', status=status.HTTP_200_OK)
+    else:
+      return StreamingHttpResponse(convert_to_json(reconciliation_data, matches), content_type='application/json', status=status.HTTP_200_OK)
+
+def annotate(response, serializer):
+    # Headers telling how the result was produced.
+    if serializer.cache_status:
+      response['X-Reconciliation-Cache'] = serializer.cache_status
+    if serializer.feed_run:
+      response['X-Reconciliation-Feed'] = serializer.feed_run.mode
+      response['X-Reconciliation-Feed-Changed-IDs'] = str(serializer.feed_run.changed_ids)
+    if serializer.run:
+      response['X-Reconciliation-Run'] = serializer.run['id']
+    if serializer.target_reference:
+      response['X-Reconciliation-Reference-Version'] = str(serializer.target_reference['version'])
+    return response
+
+def outcome(serializer):
+    # The fields logged for a reconciled request.
+    return {'cache': serializer.cache_status, 'feed': serializer.feed_run and serializer.feed_run.mode}
 
 class FileUploadView(APIView):
     serializer_class = FileSerializers
 
+    def initial(self, request, *args, **kwargs):
+      # Installed before anything reads the body, so the uploads are parsed
+      # while they arrive.
+      self.timings = Timings()
+      self.upload_handler = StreamingCSVUploadHandler(request)
+      request.upload_handlers.insert(0, self.upload_handler)
+      super().initial(request, *args, **kwargs)
+
     def post(self, request):
-      serializer = self.serializer_class(data=request.data, context={'request': request})
+      timings = self.timings
+      with timings.phase('upload'):
+        data = request.data
+      for side in ('source', 'target'):
+        if hasattr(data.get(side), 'size'):
+          timings.bytes[side] = data[side].size
+
+      serializer = self.serializer_class(data=data, context={'request': request, 'upload_handler': self.upload_handler, 'timings': timings})
       if serializer.is_valid():
-        format = request.data.get("format").lower()
-
-        if format == "csv":
-          response = HttpResponse(convert_to_csv(serializer.validated_data), content_type='text/csv')
-          response['Content-Disposition'] = 'attachment; filename="reconciliation.csv"'
-          return response
-        elif format == "html":
-          response = HttpResponse(convert_to_html(serializer.validated_data), content_type='text/html')
-          response['Content-Disposition'] = 'attachment; filename="reconciliation.html"'
-          return response
-        else:
-          return Response(serializer.validated_data, status=status.HTTP_200_OK)
+        format = data.get("format").lower()
+        mode = data.get("mode", "sync").lower()
+
+        if mode == "async":
+          job = enqueue(serializer.validated_data)
+          record(timings, format, status.HTTP_202_ACCEPTED, mode=mode)
+          return self.timed(Response(JobSerializers(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED))
+
+        response = annotate(self.timed(reconciliation_response(serializer.validated_data, format, serializer.probable_matches)), serializer)
+        # The report is rendered while it is sent, after the headers, so
+        # its time only shows up in the log line and the metrics.
+        response.streaming_content = self.rendered(response.streaming_content, format, response.status_code, **outcome(serializer))
+        return response
       else:
-        return Response(serializer.errors, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        format = str(data.get("format", "")).lower()
+        record(timings, "invalid" if 'format' in serializer.errors else format, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        return self.timed(Response(serializer.errors, status=status.HTTP_422_UNPROCESSABLE_ENTITY))
+
+    def timed(self, response):
+      response['Server-Timing'] = self.timings.server_timing()
+      return response
+
+    def rendered(self, content, format, status_code, **fields):
+      try:
+        with self.timings.phase('render'):
+          yield from content
+      finally:
+        record(self.timings, format, status_code, **fields)
@@ -0,0 +1,31 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from django.http import Http404
+from ..references import current_version, delete_reference, load_reference
+from ..serializers.references import ReferenceSerializers
+
+class ReferenceUploadView(APIView):
+    """
+    Registers a target file under a name, or a new version of it, for
+    uploads to reconcile sources against with `reference=<name>`.
+    """
+
+    def post(self, request):
+      serializer = ReferenceSerializers(data=request.data)
+      if serializer.is_valid():
+        return Response(serializer.validated_data, status=status.HTTP_201_CREATED)
+      return Response(serializer.errors, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+class ReferenceDetailView(APIView):
+    def get(self, request, name):
+      reference = load_reference(name)
+      if reference is None:
+        raise Http404("No such reference")
+      return Response(reference.description, status=status.HTTP_200_OK)
+
+    def delete(self, request, name):
+      if current_version(name) is None:
+        raise Http404("No such reference")
+      delete_reference(name)
+      return Response(status=status.HTTP_204_NO_CONTENT)
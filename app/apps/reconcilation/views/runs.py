@@ -0,0 +1,83 @@
+import json
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.utils.urls import replace_query_param
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from ..results import SECTIONS
+from ..runs import MAX_PAGE_SIZE, decode_cursor, delete_run, encode_cursor, load_run, page_rows, page_size, read_records
+
+def get_run_or_404(run_id):
+    run = load_run(run_id)
+    if run is None:
+      raise Http404("No such run")
+    return run
+
+class RunDetailView(APIView):
+    def get(self, request, run_id):
+      run = get_run_or_404(run_id)
+      records_url = request.build_absolute_uri(reverse('reconcilation:run-records', kwargs={'run_id': run_id}))
+      return Response({**run, 'records_url': records_url}, status=status.HTTP_200_OK)
+
+    def delete(self, request, run_id):
+      get_run_or_404(run_id)
+      delete_run(run_id)
+      return Response(status=status.HTTP_204_NO_CONTENT)
+
+class RunRecordsView(APIView):
+    """
+    Pages through the records of a persisted run, optionally those of one
+    section (`status`) or discrepant in one compared column (`field`).
+    `cursor` carries on after the last record of the previous page, so
+    every page costs the same however deep it is.
+    """
+
+    def get(self, request, run_id):
+      run = get_run_or_404(run_id)
+      params = request.query_params
+      errors = {}
+
+      section = params.get('status')
+      if section is not None and section not in SECTIONS:
+        errors['status'] = [f'Unsupported status. Allowed statuses are: {", ".join(SECTIONS)}']
+
+      fields = run['schema']['compare']
+      field = params.get('field')
+      if field is not None and field not in fields:
+        errors['field'] = [f'Unsupported field. Allowed fields are: {", ".join(fields)}']
+
+      after = -1
+      if params.get('cursor'):
+        try:
+          after = decode_cursor(params['cursor'])
+        except ValueError:
+          errors['cursor'] = ['Invalid cursor']
+
+      limit = page_size()
+      if params.get('limit'):
+        try:
+          limit = int(params['limit'])
+        except ValueError:
+          limit = 0
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+          errors['limit'] = [f'Limit must be a number from 1 to {MAX_PAGE_SIZE}']
+
+      if errors:
+        return Response(errors, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+      rows = page_rows(
+        run,
+        SECTIONS.index(section) if section is not None else None,
+        fields.index(field) if field is not None else None,
+        after,
+        limit,
+      )
+      next_url = None
+      if len(rows) > limit:
+        rows = rows[:limit]
+        next_url = replace_query_param(request.build_absolute_uri(), 'cursor', encode_cursor(int(rows[-1])))
+
+      # The records are sent as they were stored, without decoding them.
+      content = b'{"next":' + json.dumps(next_url).encode() + b',"results":[' + b','.join(read_records(run, rows)) + b']}'
+      return HttpResponse(content, content_type='application/json')
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,7 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
-    # 'app',
+    'app.apps.reconcilation',
 ]
 
 MIDDLEWARE = [
@@ -119,7 +120,152 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files kept for asynchronous reconciliation jobs and their results
+
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Reconciliation
+# Upper bound on the validation errors returned for a single upload.
+
+RECONCILIATION_MAX_VALIDATION_ERRORS = 100
+
+# Uploads whose estimated working set exceeds this many bytes are reconciled
+# out of core, one hash partition at a time, with spill files written to
+# RECONCILIATION_SPILL_DIR (the system temp directory when None).
+
+RECONCILIATION_MEMORY_BUDGET = 256 * 1024 * 1024
+
+RECONCILIATION_SPILL_DIR = None
+
+# Uploads sent with `engine=sorted` must be sorted by their key. One that is
+# not is rejected, or reconciled by the engine chosen for it otherwise when
+# this is True.
+
+RECONCILIATION_SORTED_FALLBACK = False
+
+# Asynchronous jobs still running this many seconds after a worker claimed
+# them are taken to have lost it, and are queued again until they have been
+# claimed RECONCILIATION_JOB_MAX_ATTEMPTS times, then failed.
+
+RECONCILIATION_JOB_TIMEOUT = 60 * 60
+
+RECONCILIATION_JOB_MAX_ATTEMPTS = 2
+
+# The parallel engine spreads matching over this many worker processes (the
+# number of CPUs when None). Uploads that fit in memory are sent to it on
+# their own once they reach RECONCILIATION_PARALLEL_MIN_BYTES, which must stay
+# below the largest uploads that do: an eighth of RECONCILIATION_MEMORY_BUDGET.
+
+RECONCILIATION_WORKERS = None
+
+RECONCILIATION_PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+
+# HTML reports split sections longer than this into pages.
+
+RECONCILIATION_HTML_PAGE_SIZE = 1000
+
+# Results are cached by a hash of both uploads. RECONCILIATION_CACHE_DIR holds
+# the size-bounded disk tier (set it to None to turn the cache off) and the
+# most recently used results are also kept in process memory.
+
+RECONCILIATION_CACHE_DIR = BASE_DIR / 'cache'
+
+RECONCILIATION_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+RECONCILIATION_CACHE_HOT_MAX_BYTES = 64 * 1024 * 1024
+
+# Named feeds keep the state of their last run here, one file per feed.
+
+RECONCILIATION_FEED_DIR = BASE_DIR / 'feeds'
+
+# Uploads sent with `persist=true` store their result here, one directory per
+# run, for GET /api/runs/<id>/records/ to page through RECONCILIATION_RUN_PAGE_SIZE
+# records at a time unless asked for another page size.
+
+RECONCILIATION_RUN_DIR = BASE_DIR / 'runs'
+
+RECONCILIATION_RUN_PAGE_SIZE = 100
+
+# Targets registered through /api/references/ are kept here as prebuilt,
+# memory-mapped arrays, one directory per version of each reference.
+
+RECONCILIATION_REFERENCE_DIR = BASE_DIR / 'references'
+
+# CSV uploads are parsed with pyarrow's multithreaded reader when pyarrow is
+# installed, falling back to pandas for files it may type differently.
+
+RECONCILIATION_ARROW_CSV = True
+
+# Compressed uploads (.csv.gz, .csv.bz2, .csv.xz and single-file .zip) are
+# decompressed while they are parsed and rejected past this many bytes.
+
+RECONCILIATION_MAX_DECOMPRESSED_BYTES = 2 * 1024 * 1024 * 1024
+
+# CSV uploads that fit RECONCILIATION_MEMORY_BUDGET are parsed and validated
+# while the request body is still being received.
+
+RECONCILIATION_STREAM_PARSE = True
+
+# Named schemas an upload can select with `schema=<name>`, each a dict with
+# "keys", "compare" and "types" (see app/apps/reconcilation/schemas.py).
+# Uploads without a schema use ID, Name, Date and Amount.
+
+RECONCILIATION_SCHEMAS = {}
+
+# Uploads sent with `fuzzy=true` also suggest probable matches between the
+# records missing on either side: pairs on the same dates whose text columns
+# have at least this Jaccard similarity of character trigrams, at most
+# RECONCILIATION_FUZZY_CANDIDATES of them per source record.
+
+RECONCILIATION_FUZZY_MIN_SCORE = 0.5
+
+RECONCILIATION_FUZZY_CANDIDATES = 3
+
+# Upload responses in the summary format list this many of the largest
+# amount discrepancies of each number column.
+
+RECONCILIATION_SUMMARY_TOP = 10
+
+# The async upload endpoint (/api/asgi/uploads/) reconciles on a pool of this
+# many threads (one per CPU when None) and answers 503 once this many
+# uploads are waiting for or running on it.
+
+RECONCILIATION_ASYNC_WORKERS = None
+
+RECONCILIATION_ASYNC_MAX_PENDING = 512
+
+# The batch endpoint (/api/batches/) reconciles its pairs on that same pool
+# and rejects batches of more pairs than this.
+
+RECONCILIATION_BATCH_MAX_PAIRS = 1000
+
+# Every reconciliation request logs one JSON line with its phase timings, row
+# counts and input sizes on the app.apps.reconcilation.metrics logger. The
+# lines are only written out when this is True, by default when the
+# RECONCILIATION_REQUEST_LOG environment variable is set to 1.
+
+RECONCILIATION_REQUEST_LOG = os.environ.get('RECONCILIATION_REQUEST_LOG') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'app.apps.reconcilation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+        'app.apps.reconcilation.metrics': {
+            'level': 'INFO' if RECONCILIATION_REQUEST_LOG else 'WARNING',
+        },
+    },
+}
@@ -0,0 +1,85 @@
+"""
+Sends many concurrent uploads to the ASGI application, once to the sync
+upload endpoint and once to the async one, while a probe requests
+/api/metrics/ every 50 ms. Reports how long all uploads take and the worst
+probe latency, which shows whether other requests still get served.
+
+Run from the repository root with `python -m benchmarks.asgi [rows [uploads]]`.
+"""
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+from django.core.asgi import get_asgi_application
+
+application = get_asgi_application()
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from benchmarks.engine import synthetic_pair
+
+# Body bytes per http.request message, as an ASGI server would hand them over.
+MESSAGE_BYTES = 64 * 1024
+
+async def request(method, path, body=b"", content_type=""):
+  """Sends one request straight to the ASGI application and returns its status."""
+  messages = [body[start:start + MESSAGE_BYTES] for start in range(0, len(body), MESSAGE_BYTES)] or [b""]
+  sent = {"status": None}
+
+  async def receive():
+    if messages:
+      chunk = messages.pop(0)
+      return {"type": "http.request", "body": chunk, "more_body": bool(messages)}
+    await asyncio.Event().wait()
+
+  async def send(message):
+    if message["type"] == "http.response.start":
+      sent["status"] = message["status"]
+
+  scope = {
+    "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method, "scheme": "http",
+    "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+    "headers": [(b"host", b"localhost"), (b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())],
+    "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+  }
+  await application(scope, receive, send)
+  return sent["status"]
+
+async def probe(done, latencies):
+  while not done.is_set():
+    started = time.perf_counter()
+    await request("GET", "/api/metrics/")
+    latencies.append(time.perf_counter() - started)
+    await asyncio.sleep(0.05)
+
+async def run(path, body, uploads):
+  done, latencies = asyncio.Event(), []
+  prober = asyncio.create_task(probe(done, latencies))
+  started = time.perf_counter()
+  statuses = await asyncio.gather(*(request("POST", path, body, MULTIPART_CONTENT) for _ in range(uploads)))
+  seconds = time.perf_counter() - started
+  done.set()
+  await prober
+  return seconds, max(latencies), statuses.count(200)
+
+def main(rows, uploads):
+  source_df, target_df = synthetic_pair(rows)
+  body = encode_multipart(BOUNDARY, {
+    "source": SimpleUploadedFile("source.csv", source_df.to_csv(index=False).encode()),
+    "target": SimpleUploadedFile("target.csv", target_df.to_csv(index=False).encode()),
+    "format": "json",
+  })
+  print(f"{'endpoint':>20} {'uploads':>8} {'ok':>5} {'seconds':>8} {'probe max':>10}")
+  with override_settings(RECONCILIATION_CACHE_DIR=None, ALLOWED_HOSTS=["localhost"]):
+    for path in ("/api/uploads/", "/api/asgi/uploads/"):
+      seconds, worst, ok = asyncio.run(run(path, body, uploads))
+      print(f"{path:>20} {uploads:>8} {ok:>5} {seconds:>8.2f} {worst:>10.3f}")
+
+if __name__ == "__main__":
+  rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+  uploads = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+  main(rows, uploads)
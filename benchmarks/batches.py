@@ -0,0 +1,70 @@
+"""
+Reconciles many small synthetic pairs, once with one request per pair to
+the upload endpoint and once with a single request to the batch endpoint,
+and reports how long each way takes.
+
+Run from the repository root with `python -m benchmarks.batches [pairs [rows [workers]]]`.
+"""
+import io
+import os
+import sys
+import time
+import zipfile
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+import django
+
+django.setup()
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment
+from benchmarks.engine import synthetic_pair
+
+def one_by_one(client, pairs):
+  for source, target in pairs:
+    response = client.post("/api/uploads/", {
+      "source": SimpleUploadedFile("source.csv", source),
+      "target": SimpleUploadedFile("target.csv", target),
+      "format": "json",
+    })
+    b"".join(response.streaming_content)
+
+def batched(client, archive, output):
+  response = client.post("/api/batches/", {"archive": SimpleUploadedFile("batch.zip", archive), "output": output})
+  b"".join(response.streaming_content)
+
+def main(count, rows, workers):
+  pairs = []
+  for seed in range(count):
+    source_df, target_df = synthetic_pair(rows, seed=seed)
+    pairs.append((source_df.to_csv(index=False).encode(), target_df.to_csv(index=False).encode()))
+
+  # Sent as an archive, since multipart requests are limited to
+  # DATA_UPLOAD_MAX_NUMBER_FILES files.
+  buffer = io.BytesIO()
+  with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+    for index, (source, target) in enumerate(pairs):
+      archive.writestr(f"{index:04}/source.csv", source)
+      archive.writestr(f"{index:04}/target.csv", target)
+
+  setup_test_environment()
+  client = Client()
+  runs = [
+    ("one request per pair", lambda: one_by_one(client, pairs)),
+    ("batch, zip", lambda: batched(client, buffer.getvalue(), "zip")),
+    ("batch, ndjson", lambda: batched(client, buffer.getvalue(), "ndjson")),
+  ]
+  print(f"{'requests':>22} {'pairs':>6} {'rows':>8} {'seconds':>8}")
+  with override_settings(RECONCILIATION_CACHE_DIR=None, RECONCILIATION_ASYNC_WORKERS=workers):
+    for name, run in runs:
+      started = time.perf_counter()
+      run()
+      print(f"{name:>22} {count:>6} {rows:>8} {time.perf_counter() - started:>8.2f}")
+
+if __name__ == "__main__":
+  count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+  rows = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+  workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+  main(count, rows, workers)
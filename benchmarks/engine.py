@@ -0,0 +1,24 @@
+"""
+Times the reconciliation engine on synthetic source/target pairs.
+
+Run from the repository root with `python -m benchmarks.engine [rows ...]`.
+"""
+import sys
+import time
+from app.apps.reconcilation.engine import reconcile
+from benchmarks.generator import Scenario, generate_pair
+
+def synthetic_pair(rows, seed=0):
+  # 2% of rows only exist on one side and 5% carry a changed amount.
+  return generate_pair(Scenario(rows=rows, seed=seed))
+
+def main(sizes):
+  print(f"{'rows':>10} {'seconds':>10}")
+  for rows in sizes:
+    source_df, target_df = synthetic_pair(rows)
+    started = time.perf_counter()
+    reconcile(source_df, target_df)
+    print(f"{rows:>10} {time.perf_counter() - started:>10.3f}")
+
+if __name__ == "__main__":
+  main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
@@ -0,0 +1,72 @@
+"""
+Times reading one synthetic upload as CSV with pandas, as CSV with pyarrow
+and as Parquet and Arrow IPC files, and writing the result as each report
+format. Needs pyarrow.
+
+Run from the repository root with `python -m benchmarks.formats [rows]`.
+"""
+import io
+import os
+import sys
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+import django
+
+django.setup()
+
+import pyarrow as pa
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from pyarrow import ipc
+from pyarrow import parquet as pq
+from app.apps.reconcilation.columnar import convert_to_columnar, read_upload
+from app.apps.reconcilation.engine import reconcile
+from app.apps.reconcilation.summary import convert_to_summary
+from app.apps.reconcilation.utils import convert_to_csv, convert_to_json, convert_to_ndjson
+from benchmarks.engine import synthetic_pair
+
+def timed(function):
+  started = time.perf_counter()
+  result = function()
+  return result, time.perf_counter() - started
+
+def encoded(file_df):
+  table = pa.Table.from_pandas(file_df, preserve_index=False)
+  parquet, arrow = io.BytesIO(), io.BytesIO()
+  pq.write_table(table, parquet)
+  with ipc.new_file(arrow, table.schema) as writer:
+    writer.write_table(table)
+  return {
+    "source.csv": file_df.to_csv(index=False).encode(),
+    "source.parquet": parquet.getvalue(),
+    "source.arrow": arrow.getvalue(),
+  }
+
+def main(rows):
+  source_df, target_df = synthetic_pair(rows)
+  print(f"{'input':>16} {'MB':>8} {'seconds':>8}")
+  for name, data in encoded(source_df).items():
+    readers = [("csv (pandas)", False), ("csv (arrow)", True)] if name.endswith(".csv") else [(name.rsplit(".", 1)[1], True)]
+    for label, arrow_csv in readers:
+      with override_settings(RECONCILIATION_ARROW_CSV=arrow_csv):
+        seconds = timed(lambda: read_upload(SimpleUploadedFile(name, data), 'source'))[1]
+      print(f"{label:>16} {len(data) / 1e6:>8.1f} {seconds:>8.3f}")
+
+  result = reconcile(source_df, target_df)
+  print(f"\n{'report':>16} {'MB':>8} {'seconds':>8}")
+  reports = [
+    ("csv", lambda: convert_to_csv(result)),
+    ("json", lambda: convert_to_json(result)),
+    ("ndjson", lambda: convert_to_ndjson(result)),
+    ("summary", lambda: convert_to_summary(result)),
+    ("arrow", lambda: convert_to_columnar(result, "arrow")),
+    ("parquet", lambda: convert_to_columnar(result, "parquet")),
+  ]
+  for label, convert in reports:
+    content, seconds = timed(lambda: b"".join(convert()))
+    print(f"{label:>16} {len(content) / 1e6:>8.1f} {seconds:>8.3f}")
+
+if __name__ == "__main__":
+  main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
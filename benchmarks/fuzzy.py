@@ -0,0 +1,61 @@
+"""
+Times the fuzzy matching pass over records whose IDs all differ between the
+two sides, so every record is unmatched.
+
+Run from the repository root with `python -m benchmarks.fuzzy [rows]`.
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+import django
+
+django.setup()
+
+import numpy as np
+from app.apps.reconcilation.engine import reconcile
+from app.apps.reconcilation.fuzzy import probable_matches
+from benchmarks.generator import Scenario, generate_pair
+
+SYLLABLES = np.array(["an", "be", "co", "da", "el", "fi", "go", "ha", "in", "jo", "ka", "lu", "ma", "ne", "or", "pi", "ra", "su", "te", "vo"])
+
+def names(rng, rows):
+  # Two words of two to four syllables each, so names rarely repeat.
+  lengths = rng.integers(2, 5, (rows, 2))
+  syllables = SYLLABLES[rng.integers(0, len(SYLLABLES), (rows, 8))].tolist()
+  return [
+    f"{''.join(parts[:first]).capitalize()} {''.join(parts[4:4 + last]).capitalize()}"
+    for parts, (first, last) in zip(syllables, lengths.tolist())
+  ]
+
+def unmatched_pair(rows, typo_rate=0.3, seed=0):
+  """
+  A pair where every target ID is moved, with `typo_rate` of the target
+  names missing their last letter.
+  """
+  rng = np.random.default_rng(seed)
+  source_df, target_df = generate_pair(Scenario(rows=rows, missing_rate=0, amount_rate=0, seed=seed))
+  source_df["Name"] = names(rng, rows)
+  target_df = source_df.copy()
+  typos = rng.random(rows) < typo_rate
+  target_df.loc[typos, "Name"] = target_df.loc[typos, "Name"].str[:-1]
+  target_df["ID"] += rows
+  return source_df, target_df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+def main(rows):
+  source_df, target_df = unmatched_pair(rows)
+  result = reconcile(source_df, target_df)
+  started = time.perf_counter()
+  matches = probable_matches(result)
+  seconds = time.perf_counter() - started
+
+  # Every source record has its target counterpart among the suggestions.
+  source_ids = result.ids[matches.source]
+  found = np.unique(source_ids[result.ids[matches.target] == source_ids + rows])
+  print(f"{'rows':>10} {'seconds':>10} {'matches':>10} {'recall':>10}")
+  print(f"{rows:>10} {seconds:>10.3f} {len(matches.source):>10} {len(found) / rows:>10.3f}")
+
+if __name__ == "__main__":
+  main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,67 @@
+"""
+Seeded generator of source and target pairs for the benchmarks.
+"""
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+NAMES = np.array(["John Doe", "Jane Doe", "David Doe", "Mary Major", "Richard Roe"])
+
+@dataclass(frozen=True)
+class Scenario:
+  """
+  Shape of a generated pair. Rates are fractions of the source rows:
+  `missing_rate` of the records only exist on one side, each field rate is
+  the share of target rows with that field changed, and `duplicate_rate` of
+  the rows on each side repeat an ID from earlier in the file.
+  """
+  rows: int = 100_000
+  missing_rate: float = 0.02
+  name_rate: float = 0.0
+  date_rate: float = 0.0
+  amount_rate: float = 0.05
+  duplicate_rate: float = 0.0
+  seed: int = 0
+
+  def key(self):
+    return ",".join(f"{name}={value}" for name, value in vars(self).items())
+
+def with_duplicates(ids, rate, rng):
+  # Rows picked for a duplicate take the ID of a random earlier row.
+  ids = ids.copy()
+  rows = np.flatnonzero(rng.random(len(ids)) < rate)
+  rows = rows[rows > 0]
+  ids[rows] = ids[(rng.random(len(rows)) * rows).astype(np.int64)]
+  return ids
+
+def generate_pair(scenario):
+  rng = np.random.default_rng(scenario.seed)
+  rows = scenario.rows
+  dates = pd.date_range("2023-01-01", periods=366).strftime("%Y-%m-%d").to_numpy()
+  name_codes = rng.integers(0, len(NAMES), rows)
+  date_codes = rng.integers(0, len(dates) - 1, rows)
+
+  source_df = pd.DataFrame({
+    "ID": np.arange(1, rows + 1),
+    "Name": NAMES[name_codes],
+    "Date": dates[date_codes],
+    "Amount": rng.integers(1, 100_000, rows) / 100,
+  })
+
+  target_df = source_df.copy()
+  changed = rng.random(rows) < scenario.name_rate
+  target_df.loc[changed, "Name"] = NAMES[(name_codes[changed] + 1) % len(NAMES)]
+  changed = rng.random(rows) < scenario.date_rate
+  target_df.loc[changed, "Date"] = dates[date_codes[changed] + 1]
+  changed = rng.random(rows) < scenario.amount_rate
+  target_df.loc[changed, "Amount"] += 1
+  # A moved ID leaves one record missing in target and adds one missing in
+  # source.
+  target_df.loc[rng.random(rows) < scenario.missing_rate, "ID"] += rows
+
+  source_df["ID"] = with_duplicates(source_df["ID"].to_numpy(), scenario.duplicate_rate, rng)
+  target_df["ID"] = with_duplicates(target_df["ID"].to_numpy(), scenario.duplicate_rate, rng)
+  return source_df, target_df.sample(frac=1, random_state=scenario.seed).reset_index(drop=True)
+
+def csv_bytes(file_df):
+  return file_df.to_csv(index=False).encode()
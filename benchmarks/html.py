@@ -0,0 +1,91 @@
+"""
+Compares the HTML report renderer with the string-concatenating renderer it
+replaced.
+
+Run from the repository root with `python -m benchmarks.html [rows]`.
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+import django
+
+django.setup()
+
+from app.apps.reconcilation.results import ReconciliationResult
+from app.apps.reconcilation.utils import convert_to_html
+
+def discrepancy_report(rows):
+  return {
+    "missing_in_source": [],
+    "missing_in_target": [],
+    "record_discrepancies": [
+      {
+        "record_id": id,
+        "source_data": {"Name": "John Doe", "Date": "2023-01-03", "Amount": 100.5},
+        "target_data": {"Name": "John Doe", "Date": "2023-01-01", "Amount": 100.0},
+        "discrepancy": {
+          "Date": {"source_value": "2023-01-03", "target_name": "2023-01-01"},
+          "Amount": {"source_value": 100.5, "target_name": 100.0},
+        },
+      }
+      for id in range(rows)
+    ],
+  }
+
+def legacy_convert_to_html(reconciliation_data):
+  # The discrepancy loop of the previous renderer, which grew one string
+  # with += for every row.
+  html_content = "<table><tbody>"
+  for record in reconciliation_data['record_discrepancies']:
+    discrepancies = []
+    for field, discrepancy in record['discrepancy'].items():
+      discrepancies.append(f"{field}: {discrepancy['source_value']} vs {discrepancy['target_name']}")
+
+    discrepancy_str = ", ".join(discrepancies)
+
+    html_content += f"""
+        <tr>
+          <td>{record['record_id']}</td>
+          <td>{record['source_data']['Name']}</td>
+          <td>{record['source_data']['Date']}</td>
+          <td>{record['source_data']['Amount']}</td>
+          <td>{record['target_data']['Name']}</td>
+          <td>{record['target_data']['Date']}</td>
+          <td>{record['target_data']['Amount']}</td>
+          <td class="discrepancy">{discrepancy_str}</td>
+        </tr>
+      """
+  html_content += "</tbody></table>"
+  return html_content.encode('utf-8')
+
+def consume(render, data):
+  output = render(data)
+  return len(output) if isinstance(output, bytes) else sum(len(chunk) for chunk in output)
+
+def measure(render, data):
+  started = time.perf_counter()
+  size = consume(render, data)
+  seconds = time.perf_counter() - started
+
+  # Peak memory comes from a second, traced run since tracing slows
+  # allocation-heavy code down several times.
+  tracemalloc.start()
+  consume(render, data)
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  return seconds, size, peak
+
+def main(rows):
+  data = discrepancy_report(rows)
+  result = ReconciliationResult.from_dict(data)
+  print(f"{'renderer':>10} {'seconds':>10} {'output MB':>10} {'peak MB':>10}")
+  for name, render, report in (("legacy", legacy_convert_to_html, data), ("current", convert_to_html, result)):
+    seconds, size, peak = measure(render, report)
+    print(f"{name:>10} {seconds:>10.3f} {size / 1e6:>10.1f} {peak / 1e6:>10.1f}")
+
+if __name__ == "__main__":
+  main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,51 @@
+"""
+Times the parallel engine with 1 to N worker processes on one synthetic
+pair, next to the single-process in-memory engine.
+
+Run from the repository root with `python -m benchmarks.parallel [rows [max workers]]`.
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+import django
+
+django.setup()
+
+from django.test import override_settings
+from app.apps.reconcilation.engine import reconcile
+from app.apps.reconcilation.parallel import reconcile_parallel, worker_pool
+from benchmarks.engine import synthetic_pair
+
+def worker_steps(most):
+  steps, workers = [], 1
+  while workers < most:
+    steps.append(workers)
+    workers *= 2
+  return steps + [most]
+
+def main(rows, most):
+  source_df, target_df = synthetic_pair(rows)
+
+  started = time.perf_counter()
+  reconcile(source_df, target_df)
+  single = time.perf_counter() - started
+  print(f"{'engine':>10} {'workers':>8} {'seconds':>8} {'speedup':>8}")
+  print(f"{'memory':>10} {1:>8} {single:>8.3f} {1:>8.2f}")
+
+  for workers in worker_steps(most):
+    with override_settings(RECONCILIATION_WORKERS=workers):
+      # The first call pays for spawning the pool.
+      worker_pool()
+      reconcile_parallel(source_df, target_df, workers)
+      started = time.perf_counter()
+      reconcile_parallel(source_df, target_df, workers)
+      seconds = time.perf_counter() - started
+    print(f"{'parallel':>10} {workers:>8} {seconds:>8.3f} {single / seconds:>8.2f}")
+
+if __name__ == "__main__":
+  rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+  most = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+  main(rows, most)
@@ -0,0 +1,59 @@
+"""
+Registers the target of one synthetic pair as a reference, then times
+uploads of its source against the uploaded target and against the
+reference, both with the memory engine. Reports are in the summary
+format, so rendering stays small.
+
+Run from the repository root with `python -m benchmarks.references [rows [repeats]]`.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+import django
+
+django.setup()
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment
+from benchmarks.engine import synthetic_pair
+
+def timed(function, repeats=1):
+  started = time.perf_counter()
+  for _ in range(repeats):
+    function()
+  return (time.perf_counter() - started) / repeats
+
+def upload(client, source, **fields):
+  response = client.post("/api/uploads/", {"source": SimpleUploadedFile("source.csv", source), "format": "summary", "engine": "memory", **fields})
+  assert response.status_code == 200
+  b"".join(response.streaming_content)
+
+def main(rows, repeats):
+  source_df, target_df = synthetic_pair(rows)
+  source, target = source_df.to_csv(index=False).encode(), target_df.to_csv(index=False).encode()
+
+  reference_dir = tempfile.mkdtemp()
+  setup_test_environment()
+  client = Client()
+  try:
+    with override_settings(RECONCILIATION_CACHE_DIR=None, RECONCILIATION_REFERENCE_DIR=reference_dir):
+      seconds = timed(lambda: client.post("/api/references/", {"name": "master", "target": SimpleUploadedFile("target.csv", target)}))
+      print(f"registering {rows} target rows: {seconds:.2f} s\n")
+
+      print(f"{'upload':>18} {'seconds':>8}")
+      for name, fields in (("source + target", {"target": lambda: SimpleUploadedFile("target.csv", target)}), ("source + reference", {"reference": lambda: "master"})):
+        seconds = timed(lambda: upload(client, source, **{field: value() for field, value in fields.items()}), repeats)
+        print(f"{name:>18} {seconds:>8.2f}")
+  finally:
+    shutil.rmtree(reference_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+  rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+  repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+  main(rows, repeats)
@@ -0,0 +1,67 @@
+"""
+Persists the result of one synthetic pair as a run, then times fetching a
+page of its records from the start, the middle and the end of the run,
+with and without a field filter, through GET /api/runs/<id>/records/.
+
+Run from the repository root with `python -m benchmarks.runs [rows [limit]]`.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+import django
+
+django.setup()
+
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment
+from app.apps.reconcilation.engine import reconcile
+from app.apps.reconcilation.runs import encode_cursor, save_run
+from app.apps.reconcilation.utils import convert_to_json
+from benchmarks.engine import synthetic_pair
+
+REPEATS = 20
+
+def timed(function, repeats=1):
+  started = time.perf_counter()
+  for _ in range(repeats):
+    result = function()
+  return result, (time.perf_counter() - started) / repeats
+
+def main(rows, limit):
+  result = reconcile(*synthetic_pair(rows))
+  report, seconds = timed(lambda: b"".join(convert_to_json(result)))
+  print(f"whole JSON report: {len(result)} records, {len(report) / 1e6:.1f} MB, {seconds:.3f} s")
+
+  run_dir = tempfile.mkdtemp()
+  setup_test_environment()
+  client = Client()
+  try:
+    with override_settings(RECONCILIATION_RUN_DIR=run_dir):
+      run, seconds = timed(lambda: save_run(result))
+      print(f"persisting the run: {seconds:.3f} s\n")
+
+      url = f"/api/runs/{run['id']}/records/"
+      client.get(url)
+      print(f"{'page':>8} {'field':>8} {'ms':>8}")
+      for field in (None, "Amount"):
+        for name, after in (("first", None), ("middle", len(result) // 2), ("last", len(result) - limit - 1)):
+          params = {"limit": limit}
+          if field:
+            params["field"] = field
+          if after is not None:
+            params["cursor"] = encode_cursor(after)
+          response, seconds = timed(lambda: client.get(url, params), REPEATS)
+          assert response.status_code == 200
+          print(f"{name:>8} {field or '-':>8} {seconds * 1000:>8.2f}")
+  finally:
+    shutil.rmtree(run_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+  rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+  limit = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+  main(rows, limit)
@@ -0,0 +1,59 @@
+"""
+Reconciles one synthetic pair, with both files sorted by ID, with the
+`memory`, `external` and `sorted` engines, and prints the time each of them
+takes to read, validate and match the uploads, and the peak memory traced
+while it does in a second, slower run.
+
+Run from the repository root with `python -m benchmarks.sorted [rows [budget MB]]`.
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+import django
+
+django.setup()
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from app.apps.reconcilation.serializers.reconcilation import FileSerializers
+from benchmarks.generator import csv_bytes
+from benchmarks.engine import synthetic_pair
+
+ENGINES = ["memory", "external", "sorted"]
+
+def run(source, target, engine):
+  # Each engine reads the uploads from the start.
+  for upload in (source, target):
+    upload.seek(0)
+  started = time.perf_counter()
+  FileSerializers().reconcile(source, target, engine)
+  return time.perf_counter() - started
+
+def traced_peak(source, target, engine):
+  tracemalloc.start()
+  try:
+    run(source, target, engine)
+    return tracemalloc.get_traced_memory()[1]
+  finally:
+    tracemalloc.stop()
+
+def main(rows, budget):
+  source_df, target_df = synthetic_pair(rows)
+  source = SimpleUploadedFile("source.csv", csv_bytes(source_df.sort_values("ID", kind="stable")))
+  target = SimpleUploadedFile("target.csv", csv_bytes(target_df.sort_values("ID", kind="stable")))
+  print(f"{rows} rows, {(source.size + target.size) / 1e6:.0f} MB of CSV, {budget} MB budget\n")
+
+  print(f"{'engine':>8} {'seconds':>8} {'peak MB':>8}")
+  with override_settings(RECONCILIATION_MEMORY_BUDGET=budget * 1024 * 1024):
+    for engine in ENGINES:
+      seconds, peak = run(source, target, engine), traced_peak(source, target, engine)
+      print(f"{engine:>8} {seconds:>8.2f} {peak / 1e6:>8.0f}")
+
+if __name__ == "__main__":
+  rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+  budget = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+  main(rows, budget)
@@ -0,0 +1,171 @@
+"""
+Times every stage of the reconciliation pipeline on one generated pair,
+then the serializer and the upload endpoint end to end, and records the
+peak memory each one allocates.
+
+Run from the repository root with `python -m benchmarks.suite [options]`;
+`--help` lists the scenario options. `--save` stores the timings as the
+baseline for the scenario in `--baseline`. Later runs compare against it
+and exit with status 1 when a stage got slower than `--threshold` allows.
+Baselines are only comparable on the machine that saved them.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+import django
+
+django.setup()
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment
+from app.apps.reconcilation.engine import reconcile
+from app.apps.reconcilation.serializers.reconcilation import FileSerializers
+from app.apps.reconcilation.utils import convert_to_csv, convert_to_html, convert_to_json
+from benchmarks.generator import Scenario, csv_bytes, generate_pair
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+def uploads(source, target):
+  return SimpleUploadedFile("source.csv", source), SimpleUploadedFile("target.csv", target)
+
+def stages(source, target):
+  """
+  Returns (name, function) pairs in pipeline order. Each function takes
+  the output of the previous stage it depends on from `state`.
+  """
+  client = Client()
+
+  def read(state):
+    state["frames"] = FileSerializers().load_frames(*uploads(source, target))
+
+  def match(state):
+    state["result"] = reconcile(*state["frames"])
+
+  def render(convert):
+    return lambda state: b"".join(convert(state["result"]))
+
+  def serializer(state):
+    source_file, target_file = uploads(source, target)
+    FileSerializers(data={"source": source_file, "target": target_file, "format": "json"}).is_valid(raise_exception=True)
+
+  def endpoint(state):
+    source_file, target_file = uploads(source, target)
+    response = client.post("/api/uploads/", {"source": source_file, "target": target_file, "format": "json"})
+    b"".join(response.streaming_content)
+
+  return [
+    ("read", read),
+    ("match", match),
+    ("csv", render(convert_to_csv)),
+    ("html", render(convert_to_html)),
+    ("json", render(convert_to_json)),
+    ("serializer", serializer),
+    ("endpoint", endpoint),
+  ]
+
+def measure(source, target, repeat):
+  """
+  Returns {stage: (seconds, peak MB)}. Seconds are the best of `repeat`
+  runs. The peak comes from one more run under tracemalloc, which slows
+  allocations down too much to be timed; it covers numpy and pandas
+  buffers but not memory pyarrow allocates itself.
+  """
+  state, figures = {}, {}
+  for name, run in stages(source, target):
+    seconds = []
+    for _ in range(repeat):
+      started = time.perf_counter()
+      run(state)
+      seconds.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    run(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    figures[name] = (min(seconds), peak / 1e6)
+  return figures
+
+def load_baselines(path):
+  if not os.path.exists(path):
+    return {}
+  with open(path) as baseline_file:
+    return json.load(baseline_file)
+
+def save_baseline(path, scenario, figures):
+  baselines = load_baselines(path)
+  baselines[scenario.key()] = {name: seconds for name, (seconds, _) in figures.items()}
+  with open(path, "w") as baseline_file:
+    json.dump(baselines, baseline_file, indent=2, sort_keys=True)
+
+def report(figures, baseline, threshold):
+  """Prints the figures and returns the stages slower than the threshold allows."""
+  regressions = []
+  print(f"{'stage':>10} {'seconds':>8} {'peak MB':>8} {'baseline':>9} {'change':>8}")
+  for name, (seconds, peak) in figures.items():
+    line = f"{name:>10} {seconds:>8.3f} {peak:>8.1f}"
+    if name in baseline:
+      change = seconds / baseline[name] - 1
+      line += f" {baseline[name]:>9.3f} {change:>+8.0%}"
+      if change > threshold:
+        regressions.append(name)
+        line += "  slower than allowed"
+    print(line)
+  return regressions
+
+def parse_args(argv):
+  defaults = Scenario()
+  parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description=__doc__.strip().splitlines()[0])
+  parser.add_argument("--rows", type=int, default=defaults.rows)
+  parser.add_argument("--missing-rate", type=float, default=defaults.missing_rate)
+  parser.add_argument("--name-rate", type=float, default=defaults.name_rate)
+  parser.add_argument("--date-rate", type=float, default=defaults.date_rate)
+  parser.add_argument("--amount-rate", type=float, default=defaults.amount_rate)
+  parser.add_argument("--duplicate-rate", type=float, default=defaults.duplicate_rate)
+  parser.add_argument("--seed", type=int, default=defaults.seed)
+  parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage, the best is kept")
+  parser.add_argument("--baseline", default=BASELINE, help="baseline file")
+  parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown against the baseline, 0.25 for 25%%")
+  parser.add_argument("--save", action="store_true", help="save these timings as the baseline")
+  return parser.parse_args(argv)
+
+def main(argv):
+  args = parse_args(argv)
+  scenario = Scenario(
+    rows=args.rows,
+    missing_rate=args.missing_rate,
+    name_rate=args.name_rate,
+    date_rate=args.date_rate,
+    amount_rate=args.amount_rate,
+    duplicate_rate=args.duplicate_rate,
+    seed=args.seed,
+  )
+  source_df, target_df = generate_pair(scenario)
+  source, target = csv_bytes(source_df), csv_bytes(target_df)
+  print(f"{scenario.key()}\nsource {len(source) / 1e6:.1f} MB, target {len(target) / 1e6:.1f} MB\n")
+
+  setup_test_environment()
+  # The cache would turn every repeated run into a hit.
+  with override_settings(RECONCILIATION_CACHE_DIR=None):
+    figures = measure(source, target, args.repeat)
+
+  if args.save:
+    report(figures, {}, args.threshold)
+    save_baseline(args.baseline, scenario, figures)
+    print(f"\nsaved baseline to {args.baseline}")
+    return 0
+
+  regressions = report(figures, load_baselines(args.baseline).get(scenario.key(), {}), args.threshold)
+  if regressions:
+    print(f"\n{', '.join(regressions)} slowed down by more than {args.threshold:.0%}")
+    return 1
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,74 @@
+"""
+Times a synchronous upload of one synthetic pair whose request body arrives
+at a fixed rate, with CSV parsing during the transfer turned on and off,
+next to the time the transfer alone takes.
+
+Run from the repository root with `python -m benchmarks.uploads [rows [MB/s]]`.
+"""
+import io
+import os
+import sys
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+import django
+
+django.setup()
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.wsgi import LimitedStream
+from django.test import RequestFactory, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from app.apps.reconcilation.external import EXPANSION
+from app.apps.reconcilation.views.reconcilation import FileUploadView
+from benchmarks.engine import synthetic_pair
+
+class Throttled(io.RawIOBase):
+  """Request body that hands out its bytes no faster than `rate` bytes a second."""
+
+  def __init__(self, data, rate):
+    self.data = io.BytesIO(data)
+    self.rate = rate
+    self.started = None
+
+  def readable(self):
+    return True
+
+  def readinto(self, buffer):
+    self.started = self.started or time.perf_counter()
+    count = self.data.readinto(buffer)
+    due = self.started + self.data.tell() / self.rate
+    time.sleep(max(0, due - time.perf_counter()))
+    return count
+
+def upload_request(source, target, rate):
+  body = encode_multipart(BOUNDARY, {
+    "source": SimpleUploadedFile("source.csv", source),
+    "target": SimpleUploadedFile("target.csv", target),
+    "format": "json",
+  })
+  request = RequestFactory().generic("POST", "/api/uploads/", CONTENT_TYPE=MULTIPART_CONTENT, CONTENT_LENGTH=str(len(body)))
+  request._stream = LimitedStream(Throttled(body, rate), len(body))
+  return request, len(body)
+
+def main(rows, megabytes):
+  source_df, target_df = synthetic_pair(rows)
+  source = source_df.to_csv(index=False).encode()
+  target = target_df.to_csv(index=False).encode()
+  view = FileUploadView.as_view()
+  print(f"{'parse':>10} {'MB':>8} {'transfer':>9} {'total':>8}")
+  for streamed in [False, True]:
+    request, size = upload_request(source, target, megabytes * 1e6)
+    # The budget is raised so the pair is reconciled in memory either way.
+    with override_settings(RECONCILIATION_STREAM_PARSE=streamed, RECONCILIATION_CACHE_DIR=None, RECONCILIATION_MEMORY_BUDGET=size * EXPANSION):
+      started = time.perf_counter()
+      response = view(request)
+      b"".join(response.streaming_content)
+      total = time.perf_counter() - started
+    print(f"{'streamed' if streamed else 'after':>10} {size / 1e6:>8.1f} {size / (megabytes * 1e6):>9.2f} {total:>8.2f}")
+
+if __name__ == "__main__":
+  rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+  megabytes = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+  main(rows, megabytes)